@@ -2,6 +2,7 @@
 
 import sys
 import logging
+from typing import List, Tuple
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
 
@@ -38,6 +39,7 @@ class VideoSource:
         self.is_series = is_series
         self.media_id = media_id
         self.iframe_src = None
+        self.episode_id = None
 
     def get_iframe(self, episode_id: int) -> None:
         """
@@ -47,6 +49,7 @@ class VideoSource:
             episode_id (int): Unique identifier for episode
         """
         params = {}
+        self.episode_id = episode_id
 
         if self.is_series:
             params = {
@@ -111,12 +114,16 @@ class VideoSource:
             logging.error(f"Error getting content: {e}")
             raise
 
-    def get_playlist(self) -> str:
+    def _build_playlist_url(self, url: str, keep_query: bool = False) -> str:
         """
-        Generate authenticated playlist URL.
+        Add quality and authentication parameters to a playlist URL.
+
+        Args:
+            url (str): Playlist URL from the player page
+            keep_query (bool): Keep every parameter of the original query (e.g. the server of a mirror)
 
         Returns:
-            str: Fully constructed playlist URL with authentication parameters
+            str: Playlist URL with authentication parameters
         """
         params = {}
 
@@ -125,11 +132,14 @@ class VideoSource:
             params['h'] = 1
 
         # Parse the original URL
-        parsed_url = urlparse(self.window_parameter.url)
+        parsed_url = urlparse(url)
         query_params = parse_qs(parsed_url.query)
 
+        if keep_query:
+            params.update({key: values[0] for key, values in query_params.items()})
+
         # Check specifically for 'b=1' in the query parameters
-        if 'b' in query_params and query_params['b'] == ['1']:
+        elif 'b' in query_params and query_params['b'] == ['1']:
             params['b'] = 1
 
         # Add authentication parameters (token and expiration)
@@ -138,11 +148,48 @@ class VideoSource:
             "expires": self.window_parameter.expires
         })
 
-        # Build the updated query string
-        query_string = urlencode(params)
-
         # Construct the new URL with updated query parameters
-        return urlunparse(parsed_url._replace(query=query_string))
+        return urlunparse(parsed_url._replace(query=urlencode(params)))
+
+    def get_playlist(self) -> str:
+        """
+        Generate authenticated playlist URL.
+
+        Returns:
+            str: Fully constructed playlist URL with authentication parameters
+        """
+        return self._build_playlist_url(self.window_parameter.url)
+
+    def get_mirror_playlists(self) -> List[str]:
+        """
+        Generate the authenticated playlist URLs of the other servers listed in `window.streams`.
+
+        Returns:
+            List[str]: Playlist URLs serving the same content as `get_playlist`
+        """
+        primary = self.get_playlist()
+        mirrors = []
+
+        for stream in self.window_streams.get_streams():
+            if not stream.url:
+                continue
+
+            mirror_url = self._build_playlist_url(stream.url, keep_query=True)
+            if mirror_url != primary and mirror_url not in mirrors:
+                mirrors.append(mirror_url)
+
+        return mirrors
+
+    def refresh_playlist(self) -> Tuple[str, List[str]]:
+        """
+        Sign again the playlist of the last requested episode, for downloads outliving the token.
+
+        Returns:
+            Tuple[str, List[str]]: New playlist URL and mirror playlist URLs
+        """
+        self.get_iframe(self.episode_id)
+        self.get_content()
+        return self.get_playlist(), self.get_mirror_playlists()
 
 
 class VideoSourceAnime(VideoSource):
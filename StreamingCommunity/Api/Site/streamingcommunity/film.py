@@ -69,7 +69,9 @@ def download_film(select_title: MediaItem) -> str:
     # Download the film using the m3u8 playlist, and output filename
     r_proc = HLS_Downloader(
         m3u8_url=master_playlist,
-        output_path=os.path.join(mp4_path, title_name)
+        output_path=os.path.join(mp4_path, title_name),
+        mirrors=video_source.get_mirror_playlists(),
+        refresh_playlist=video_source.refresh_playlist
     ).start()
 
     if site_constant.TELEGRAM_BOT:
@@ -83,7 +83,9 @@ def download_video(index_season_selected: int, index_episode_selected: int, scra
     # Download the episode
     r_proc = HLS_Downloader(
         m3u8_url=master_playlist,
-        output_path=os.path.join(mp4_path, mp4_name)
+        output_path=os.path.join(mp4_path, mp4_name),
+        mirrors=video_source.get_mirror_playlists(),
+        refresh_playlist=video_source.refresh_playlist
     ).start()
 
     if r_proc['error'] is not None:
@@ -0,0 +1,86 @@
+# 18.10.26
+
+import time
+import threading
+from typing import Optional
+
+
+class ReorderWindow:
+    def __init__(self, max_segments: int, max_bytes: int):
+        """
+        Bounds the segments downloaded ahead of the writer (queued or waiting in the reorder buffer).
+
+        Parameters:
+            - max_segments (int): Maximum number of pending segments, 0 means unlimited.
+            - max_bytes (int): Maximum size in bytes of the pending segments, 0 means unlimited.
+        """
+        self.max_segments = max_segments
+        self.max_bytes = max_bytes
+        self.expected_index = 0
+        self.pending_segments = 0
+        self.pending_bytes = 0
+        self.peak_bytes = 0
+        self.condition = threading.Condition()
+
+    def _fits(self, index: int, size: int) -> bool:
+        """The segment the writer is waiting for is always admitted, otherwise both caps must hold."""
+        if index <= self.expected_index:
+            return True
+
+        if self.max_segments > 0 and self.pending_segments >= self.max_segments:
+            return False
+
+        if self.max_bytes > 0 and self.pending_bytes + size > self.max_bytes:
+            return False
+
+        return True
+
+    def reserve(self, index: int, size: int, block: bool = True, cancel: Optional[threading.Event] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Reserve room for a segment before handing it to the writer.
+
+        Parameters:
+            - index (int): Index of the segment.
+            - size (int): Size in bytes of the segment.
+            - block (bool): Wait until there is room instead of returning immediately.
+            - cancel (threading.Event): Stop waiting as soon as this event is set.
+            - timeout (float): Stop waiting after this many seconds.
+
+        Returns:
+            bool: True if the room has been reserved.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self.condition:
+            while not self._fits(index, size):
+                if not block or (cancel is not None and cancel.is_set()):
+                    return False
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+
+                self.condition.wait(timeout=0.5)
+
+            self.pending_segments += 1
+            self.pending_bytes += size
+            self.peak_bytes = max(self.peak_bytes, self.pending_bytes)
+            return True
+
+    def release(self, size: int) -> None:
+        """Free the room of a segment written to disk."""
+        with self.condition:
+            self.pending_segments -= 1
+            self.pending_bytes -= size
+            self.condition.notify_all()
+
+    def shrink(self, size: int) -> None:
+        """Give back part of a reservation, e.g. the padding removed by decryption."""
+        with self.condition:
+            self.pending_bytes -= size
+            self.condition.notify_all()
+
+    def advance(self, expected_index: int) -> None:
+        """Update the index the writer is waiting for."""
+        with self.condition:
+            self.expected_index = expected_index
+            self.condition.notify_all()
@@ -0,0 +1,195 @@
+# 18.10.26
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+
+# Costant
+LATENCY_TOLERANCE = 2.0         # Latency above baseline * tolerance means requests are queueing at the CDN
+LATENCY_DECREASE = 0.8          # Multiplicative decrease on latency growth
+THROTTLE_DECREASE = 0.5         # Multiplicative decrease on 429/503, timeouts and connection errors
+EWMA_ALPHA = 0.2
+BASELINE_DRIFT = 1.002          # Let the baseline follow slow changes of the network
+
+
+class AdaptiveConcurrency:
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1, adaptive: bool = True):
+        """
+        AIMD limit on the number of segment requests in flight.
+
+        The limit grows by one every window of `limit` successful requests while latency stays near
+        its baseline and throughput does not drop, and it is cut multiplicatively when the CDN
+        throttles (429/503, timeouts) or latency grows.
+
+        Parameters:
+            - initial (int): Starting limit.
+            - max_limit (int): Upper bound of the limit.
+            - min_limit (int): Lower bound of the limit.
+            - adaptive (bool): If False the limit stays at `initial`.
+        """
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.adaptive = adaptive
+        self.in_flight = 0
+
+        # Measures
+        self.latency_ewma: Optional[float] = None
+        self.latency_baseline: Optional[float] = None
+        self.best_throughput = 0.0
+        self.window_successes = 0
+        self.window_bytes = 0
+        self.window_start = time.monotonic()
+        self.last_decrease = 0.0
+        self.n_decrease = 0
+        self.n_increase = 0
+
+        # Sync
+        self.condition = threading.Condition()
+        self.async_condition: Optional[asyncio.Condition] = None
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free."""
+        with self.condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Block until a slot is free.
+
+        Parameters:
+            - cancel (threading.Event): Stop waiting as soon as this event is set.
+
+        Returns:
+            bool: True if the slot has been taken.
+        """
+        with self.condition:
+            while self.in_flight >= self.limit:
+                if cancel is not None and cancel.is_set():
+                    return False
+                self.condition.wait(timeout=0.5)
+
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        """Give back a slot."""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def acquire_async(self, cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Wait for a free slot without blocking the event loop.
+
+        Parameters:
+            - cancel (threading.Event): Stop waiting as soon as this event is set.
+
+        Returns:
+            bool: True if the slot has been taken.
+        """
+        if self.async_condition is None:
+            self.async_condition = asyncio.Condition()
+
+        async with self.async_condition:
+            while not self.try_acquire():
+                if cancel is not None and cancel.is_set():
+                    return False
+
+                # The event is set by a signal handler, nothing notifies the condition
+                try:
+                    await asyncio.wait_for(self.async_condition.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+
+            return True
+
+    async def release_async(self) -> None:
+        """Give back a slot and wake up as many waiting tasks as there are free slots."""
+        self.release()
+        async with self.async_condition:
+            self.async_condition.notify(max(1, self.limit - self.in_flight))
+
+    def _set_limit(self, limit: int) -> None:
+        """Apply a new limit, must be called with the condition held."""
+        limit = max(self.min_limit, min(limit, self.max_limit))
+        if limit != self.limit:
+            logging.info(f"Concurrency limit: {self.limit} -> {limit}")
+            self.limit = limit
+            self.condition.notify_all()
+
+    def _decrease(self, factor: float) -> None:
+        """Multiplicative decrease, at most once per baseline latency so one burst of errors counts once."""
+        now = time.monotonic()
+        cooldown = max(1.0, self.latency_ewma or 0)
+        if now - self.last_decrease < cooldown:
+            return
+
+        self.last_decrease = now
+        self.n_decrease += 1
+        self._set_limit(int(self.limit * factor))
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self.window_successes = 0
+        self.window_bytes = 0
+        self.window_start = time.monotonic()
+
+    def on_success(self, latency: float, size: int) -> None:
+        """
+        Record a successful request.
+
+        Parameters:
+            - latency (float): Seconds spent on the request.
+            - size (int): Bytes received.
+        """
+        if not self.adaptive:
+            return
+
+        with self.condition:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+                self.latency_baseline = latency
+            else:
+                self.latency_ewma += EWMA_ALPHA * (latency - self.latency_ewma)
+                self.latency_baseline = min(self.latency_baseline * BASELINE_DRIFT, self.latency_ewma)
+
+            self.window_successes += 1
+            self.window_bytes += size
+            if self.window_successes < self.limit:
+                return
+
+            # One full window at the current limit
+            elapsed = max(time.monotonic() - self.window_start, 1e-6)
+            throughput = self.window_bytes / elapsed
+
+            if self.latency_ewma > self.latency_baseline * LATENCY_TOLERANCE:
+                self._decrease(LATENCY_DECREASE)
+
+            else:
+                if throughput >= self.best_throughput * 0.95:
+                    self.n_increase += 1
+                    self._set_limit(self.limit + 1)
+
+                self._reset_window()
+
+            self.best_throughput = max(self.best_throughput * 0.99, throughput)
+
+    def on_failure(self, throttled: bool) -> None:
+        """
+        Record a failed request.
+
+        Parameters:
+            - throttled (bool): The failure is a congestion signal (429/503, timeout, connection error).
+        """
+        if not self.adaptive or not throttled:
+            return
+
+        with self.condition:
+            self._decrease(THROTTLE_DECREASE)
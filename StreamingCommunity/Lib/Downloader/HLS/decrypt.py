@@ -0,0 +1,62 @@
+# 18.10.26
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class DecryptionStage:
+    def __init__(self, workers: int, backlog: int):
+        """
+        Pipeline stage running the decryption of the downloaded segments on its own threads.
+        The AES calls release the GIL, so the throughput grows with the number of cores.
+
+        Parameters:
+            - workers (int): Number of decryption threads.
+            - backlog (int): Segments waiting for a decryption thread, the downloaders block above it.
+        """
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="decrypt")
+        self.slots = threading.BoundedSemaphore(max(1, backlog))
+        self.pending = 0
+        self.condition = threading.Condition()
+
+    def submit(self, fn: Callable, *args, cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Queue `fn(*args)` on the decryption threads, waiting while the backlog is full.
+
+        Returns:
+            bool: False if `cancel` has been set while waiting.
+        """
+        while not self.slots.acquire(timeout=0.5):
+            if cancel is not None and cancel.is_set():
+                return False
+
+        with self.condition:
+            self.pending += 1
+
+        self.pool.submit(self._run, fn, args)
+        return True
+
+    def _run(self, fn: Callable, args: tuple) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            logging.error(f"Error in decryption thread: {str(e)}")
+
+        finally:
+            self.slots.release()
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify_all()
+
+    def drain(self, cancel: Optional[threading.Event] = None) -> None:
+        """Wait until every queued segment has been decrypted and handed over."""
+        with self.condition:
+            while self.pending > 0:
+                if cancel is not None and cancel.is_set():
+                    return
+                self.condition.wait(timeout=0.5)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
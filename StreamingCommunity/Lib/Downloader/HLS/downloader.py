@@ -3,9 +3,12 @@
 import os
 import re
 import time
+import signal
 import logging
 import shutil
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 # External libraries
@@ -25,11 +28,15 @@ from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance
 from ...FFmpeg import (
     print_duration_table,
     join_video,
-    join_audios,
-    join_subtitle
+    join_all
 )
 from ...M3U8 import M3U8_Parser, M3U8_UrlFix
 from .segments import M3U8_Segments
+from .mirrors import REFRESH_MIN_INTERVAL
+from .journal import SegmentJournal
+from .concurrency import AdaptiveConcurrency
+from .metrics import MetricsRegistry
+from .remux import StreamRemuxer
 
 
 # Config
@@ -40,6 +47,10 @@ DOWNLOAD_SPECIFIC_SUBTITLE = config_manager.get_list('M3U8_DOWNLOAD', 'specific_
 MERGE_AUDIO = config_manager.get_bool('M3U8_DOWNLOAD', 'merge_audio')
 MERGE_SUBTITLE = config_manager.get_bool('M3U8_DOWNLOAD', 'merge_subs')
 CLEANUP_TMP = config_manager.get_bool('M3U8_DOWNLOAD', 'cleanup_tmp_folder')
+PARALLEL_TRACKS = config_manager.get_bool('M3U8_DOWNLOAD', 'parallel_tracks')
+MAX_CONCURRENT_REQUESTS = config_manager.get_int('M3U8_DOWNLOAD', 'max_concurrent_requests')
+STREAM_REMUX = config_manager.get_bool('M3U8_DOWNLOAD', 'stream_remux')
+USE_MIRRORS = config_manager.get_bool('M3U8_DOWNLOAD', 'use_mirrors')
 FILTER_CUSTOM_REOLUTION = str(config_manager.get('M3U8_PARSER', 'force_resolution')).strip().lower()
 GET_ONLY_LINK = config_manager.get_bool('M3U8_PARSER', 'get_only_link')
 RETRY_LIMIT = config_manager.get_int('REQUESTS', 'max_retry')
@@ -126,13 +137,19 @@ class PathManager:
 
 class M3U8Manager:
     """Handles M3U8 playlist parsing and stream selection."""
-    def __init__(self, m3u8_url: str, client: HLSClient):
+    def __init__(self, m3u8_url: str, client: HLSClient, mirrors: Optional[List[str]] = None, refresh_playlist: Optional[Callable[[], Tuple[str, List[str]]]] = None):
         self.m3u8_url = m3u8_url
         self.client = client
+        self.mirrors = mirrors if USE_MIRRORS and mirrors else []
+        self.video_mirrors = []
+        self.refresh_playlist = refresh_playlist
+        self.refresh_lock = threading.Lock()
+        self.last_refresh = None
         self.parser = M3U8_Parser()
         self.url_fixer = M3U8_UrlFix()
         self.video_url = None
         self.video_res = None
+        self.video_bandwidth = None
         self.audio_streams = []
         self.sub_streams = []
         self.is_master = False
@@ -171,6 +188,8 @@ class M3U8Manager:
                 logging.error("Resolution not recognized.")
                 self.video_url, self.video_res = self.parser._video.get_best_uri()
 
+            self.video_bandwidth = next((v['bandwidth'] for v in self.parser.video_playlist if v['uri'] == self.video_url), None)
+
             self.audio_streams = []
             if ENABLE_AUDIO:
                 self.audio_streams = [
@@ -185,6 +204,109 @@ class M3U8Manager:
                     if s.get('language') in DOWNLOAD_SPECIFIC_SUBTITLE
                 ]
 
+    def resolve_mirrors(self):
+        """
+        Find the selected video and audio playlists on every mirror master playlist.
+        A mirror is skipped for a track it doesn't serve with the same resolution or language.
+        """
+        self.video_mirrors = []
+        for audio in self.audio_streams:
+            audio['mirrors'] = []
+
+        for mirror_url in self.mirrors:
+            content = self.client.request(mirror_url)
+            if not content:
+                logging.warning(f"Skip mirror {mirror_url}: no playlist")
+                continue
+
+            parser = M3U8_Parser()
+            try:
+                parser.parse_data(uri=mirror_url, raw_content=content)
+            except Exception as e:
+                logging.warning(f"Skip mirror {mirror_url}: {e}")
+                continue
+
+            url_fixer = M3U8_UrlFix(mirror_url)
+
+            if not parser.is_master_playlist:
+                if not self.is_master:
+                    self.video_mirrors.append(mirror_url)
+                continue
+
+            if self.is_master and self.video_res:
+                video_uri, _ = parser._video.get_custom_uri(self.video_res[1])
+                if video_uri:
+                    self.video_mirrors.append(url_fixer.generate_full_url(video_uri))
+
+            mirror_audios = {a.get('language'): a for a in (parser._audio.get_all_uris_and_names() or [])}
+            for audio in self.audio_streams:
+                mirror_audio = mirror_audios.get(audio.get('language'))
+                if mirror_audio:
+                    audio['mirrors'].append(url_fixer.generate_full_url(mirror_audio['uri']))
+
+        if self.mirrors:
+            logging.info(f"Video mirrors: {self.video_mirrors}")
+
+    def refresh(self) -> bool:
+        """
+        Get a newly signed master playlist from the player and select the same streams on it.
+        A refresh done by another track in the last `REFRESH_MIN_INTERVAL` seconds is reused.
+
+        Returns:
+            bool: True if the track URLs are fresh.
+        """
+        if self.refresh_playlist is None:
+            return False
+
+        with self.refresh_lock:
+            if self.last_refresh is not None and time.monotonic() - self.last_refresh < REFRESH_MIN_INTERVAL:
+                return True
+
+            try:
+                m3u8_url, mirrors = self.refresh_playlist()
+                self.m3u8_url = m3u8_url
+                self.mirrors = mirrors if USE_MIRRORS and mirrors else []
+                self.parser = M3U8_Parser()
+                self.parse()
+
+                if not self.is_master:
+                    self.video_url = self.m3u8_url
+                else:
+                    video_url, _ = self.parser._video.get_custom_uri(self.video_res[1])
+                    if video_url is None:
+                        raise ValueError(f"Resolution {self.video_res} missing from the refreshed playlist")
+                    self.video_url = video_url
+
+                    # Same dicts, the remuxer and the merge keep their references
+                    new_audios = {a.get('language'): a for a in (self.parser._audio.get_all_uris_and_names() or [])}
+                    for audio in self.audio_streams:
+                        if audio.get('language') in new_audios:
+                            audio['uri'] = new_audios[audio['language']]['uri']
+
+                self.resolve_mirrors()
+
+            except Exception as e:
+                logging.error(f"Failed to refresh the playlist: {e}")
+                return False
+
+            self.last_refresh = time.monotonic()
+            return True
+
+    def refresh_track(self, audio: Optional[Dict] = None) -> Optional[List[str]]:
+        """
+        Newly signed URLs of a track, primary playlist first and then its mirrors.
+
+        Args:
+            audio: Audio track to refresh, the video one if None
+        """
+        if not self.refresh():
+            return None
+
+        if audio is None:
+            return [self.url_fixer.generate_full_url(self.video_url)] + self.video_mirrors
+
+        return [self.url_fixer.generate_full_url(audio['uri'])] + audio.get('mirrors', [])
+
     def log_selection(self):
         tuple_available_resolution = self.parser._video.get_list_resolution()
         list_available_resolution = [f"{r[0]}x{r[1]}" for r in tuple_available_resolution]
@@ -233,26 +355,50 @@ class M3U8Manager:
 
 class DownloadManager:
     """Manages downloading of video, audio, and subtitle streams."""
-    def __init__(self, temp_dir: str, client: HLSClient, url_fixer: M3U8_UrlFix):
+    def __init__(self, temp_dir: str, client: HLSClient, url_fixer: M3U8_UrlFix, video_mirrors: Optional[List[str]] = None, refresh_track: Optional[Callable[[Optional[Dict]], Optional[List[str]]]] = None, video_bandwidth: Optional[int] = None):
         """
         Args:
             temp_dir: Directory for storing temporary files
             client: HLSClient instance for making requests
             url_fixer: URL fixer instance for generating complete URLs
+            video_mirrors: Video playlist on the other servers of the same content
+            refresh_track: Returns newly signed URLs of a track (None for the video) once the token expires
+            video_bandwidth: BANDWIDTH of the selected variant, used to preallocate the video file
         """
         self.temp_dir = temp_dir
         self.client = client
         self.url_fixer = url_fixer
+        self.video_mirrors = video_mirrors or []
+        self.refresh_track = refresh_track
+        self.video_bandwidth = video_bandwidth
         self.missing_segments = []
         self.stopped = False
 
-    def download_video(self, video_url: str):
-        """Downloads video segments from the M3U8 playlist."""
-        video_full_url = self.url_fixer.generate_full_url(video_url)
-        video_tmp_dir = os.path.join(self.temp_dir, 'video')
+        # Requests in flight shared by all the tracks
+        self.budget = AdaptiveConcurrency(MAX_CONCURRENT_REQUESTS, MAX_CONCURRENT_REQUESTS, adaptive=False)
+        self.metrics_registry = MetricsRegistry()
+        self.active_downloaders: List[M3U8_Segments] = []
+        self.handle_signals = True
+        self.remuxer: Optional[StreamRemuxer] = None
+
+    def _download_stream(self, url: str, tmp_dir: str, description: str, stream_type: str, position: Optional[int], sink_path: Optional[str] = None, mirror_urls: Optional[List[str]] = None, audio: Optional[Dict] = None, bandwidth: Optional[int] = None) -> bool:
+        """Downloads the segments of one media playlist (video or audio track)."""
+        refresh_urls = (lambda: self.refresh_track(audio)) if self.refresh_track else None
+        downloader = M3U8_Segments(
+            url=url,
+            tmp_folder=tmp_dir,
+            budget=self.budget,
+            handle_signals=self.handle_signals,
+            progress_position=position,
+            sink_path=sink_path,
+            mirror_urls=mirror_urls,
+            refresh_urls=refresh_urls,
+            bandwidth=bandwidth,
+            metrics_registry=self.metrics_registry
+        )
+        self.active_downloaders.append(downloader)
 
-        downloader = M3U8_Segments(url=video_full_url, tmp_folder=video_tmp_dir)
-        result = downloader.download_streams("Video", "video")
+        result = downloader.download_streams(description, stream_type)
         self.missing_segments.append(result)
 
         if result.get('stopped', False):
@@ -260,27 +406,22 @@ class DownloadManager:
         
         return self.stopped
 
-    def download_audio(self, audio: Dict):
-        """Downloads audio segments for a specific language track."""
-        #if self.stopped:
-        #    return True
+    def download_video(self, video_url: str, position: Optional[int] = None):
+        """Downloads video segments from the M3U8 playlist."""
+        video_full_url = self.url_fixer.generate_full_url(video_url)
+        video_tmp_dir = os.path.join(self.temp_dir, 'video')
+        sink_path = self.remuxer.video_fifo() if self.remuxer else None
+        return self._download_stream(video_full_url, video_tmp_dir, "Video", "video", position, sink_path, self.video_mirrors, bandwidth=self.video_bandwidth)
 
+    def download_audio(self, audio: Dict, position: Optional[int] = None):
+        """Downloads audio segments for a specific language track."""
         audio_full_url = self.url_fixer.generate_full_url(audio['uri'])
         audio_tmp_dir = os.path.join(self.temp_dir, 'audio', audio['language'])
+        sink_path = self.remuxer.audio_fifo(audio) if self.remuxer and audio in self.remuxer.audio_streams else None
+        return self._download_stream(audio_full_url, audio_tmp_dir, f"Audio {audio['language']}", "audio", position, sink_path, audio.get('mirrors'), audio)
 
-        downloader = M3U8_Segments(url=audio_full_url, tmp_folder=audio_tmp_dir)
-        result = downloader.download_streams(f"Audio {audio['language']}", "audio")
-        self.missing_segments.append(result)
-
-        if result.get('stopped', False):
-            self.stopped = True
-        return self.stopped
-
-    def download_subtitle(self, sub: Dict):
+    def download_subtitle(self, sub: Dict, position: Optional[int] = None):
         """Downloads and saves subtitle file for a specific language."""
-        #if self.stopped:
-        #    return True
-
         raw_content = self.client.request(sub['uri'])
         if raw_content:
             sub_path = os.path.join(self.temp_dir, 'subs', f"{sub['language']}.vtt")
@@ -295,55 +436,138 @@ class DownloadManager:
 
         return self.stopped
 
-    def download_all(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict]):
+    def _use_stream_remux(self, audio_streams: List[Dict]) -> bool:
         """
-        Downloads all selected streams (video, audio, subtitles).
+        Streaming remux needs named pipes, every remuxed track downloaded at the same time
+        and nothing on disk from a previous run, which is resumed from the files instead.
         """
-        return_stopped = False
-
-        video_file = os.path.join(self.temp_dir, 'video', '0.ts')
-        if not os.path.exists(video_file):
-            if self.download_video(video_url):
-                if not return_stopped:
-                    return_stopped = True
+        if not STREAM_REMUX or not StreamRemuxer.is_supported():
+            return False
 
-        for audio in audio_streams:
-            #if self.stopped:
-            #    break
+        if MERGE_AUDIO and audio_streams and not PARALLEL_TRACKS:
+            return False
 
-            audio_file = os.path.join(self.temp_dir, 'audio', audio['language'], '0.ts')
-            if not os.path.exists(audio_file):
-                if self.download_audio(audio):
-                    if not return_stopped:
-                        return_stopped = True
+        track_dirs = [os.path.join(self.temp_dir, 'video')] + [os.path.join(self.temp_dir, 'audio', a['language']) for a in audio_streams]
+        return not any(os.path.exists(os.path.join(track_dir, '0.ts')) for track_dir in track_dirs)
 
+    def _start_stream_remux(self, audio_streams: List[Dict], sub_streams: List[Dict]) -> None:
+        """Downloads the subtitles, FFmpeg needs them complete, then starts remuxing from the pipes."""
         for sub in sub_streams:
-            #if self.stopped:
-            #    break
+            self.download_subtitle(sub)
+
+        self.remuxer = StreamRemuxer(
+            temp_dir=self.temp_dir,
+            audio_streams=audio_streams if MERGE_AUDIO else [],
+            sub_streams=sub_streams if MERGE_SUBTITLE else []
+        )
+        self.remuxer.start()
+        self.remuxer.watch(on_exit=self._abort_stream_remux)
+
+    def _abort_stream_remux(self) -> None:
+        """FFmpeg failed: stop every track, the error is raised by `StreamRemuxer.wait`."""
+        for downloader in list(self.active_downloaders):
+            downloader.interrupt_flag.set()
+        self.remuxer.abort()
+
+    def _get_pending_jobs(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict]) -> List[Tuple[Callable, Any]]:
+        """Returns the download calls for the tracks not already completed in the temp folder."""
+        jobs = []
+
+        if not SegmentJournal.is_complete(os.path.join(self.temp_dir, 'video')):
+            jobs.append((self.download_video, video_url))
+
+        for audio in audio_streams:
+            if not SegmentJournal.is_complete(os.path.join(self.temp_dir, 'audio', audio['language'])):
+                jobs.append((self.download_audio, audio))
 
+        for sub in sub_streams:
             sub_file = os.path.join(self.temp_dir, 'subs', f"{sub['language']}.vtt")
             if not os.path.exists(sub_file):
-                if self.download_subtitle(sub):
-                    if not return_stopped:
+                jobs.append((self.download_subtitle, sub))
+
+        return jobs
+
+    def _interrupt_handler(self, signum, frame):
+        """Forwards Ctrl+C from the main thread to every track being downloaded."""
+        for i, downloader in enumerate(list(self.active_downloaders)):
+            downloader.handle_interrupt(quiet=i > 0)
+
+    def download_all(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict]):
+        """
+        Downloads all selected streams (video, audio, subtitles).
+        With `parallel_tracks` every track is downloaded at the same time, sharing `max_concurrent_requests`.
+        With `stream_remux` the tracks are remuxed by FFmpeg while downloading.
+        """
+        if self._use_stream_remux(audio_streams):
+            self._start_stream_remux(audio_streams, sub_streams)
+            sub_streams = []
+
+        jobs = self._get_pending_jobs(video_url, audio_streams, sub_streams)
+        return_stopped = False
+
+        if not PARALLEL_TRACKS or len(jobs) <= 1:
+            try:
+                for job, arg in jobs:
+                    if job(arg):
                         return_stopped = True
 
+            except Exception:
+                if self.remuxer is not None:
+                    self._abort_stream_remux()
+                raise
+
+            return return_stopped
+
+        # Signals are delivered to the main thread only
+        original_handler = None
+        if threading.current_thread() is threading.main_thread():
+            self.handle_signals = False
+            original_handler = signal.signal(signal.SIGINT, self._interrupt_handler)
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = [executor.submit(job, arg, position) for position, (job, arg) in enumerate(jobs)]
+
+                first_error = None
+                for future in futures:
+                    try:
+                        if future.result():
+                            return_stopped = True
+
+                    except Exception as e:
+                        logging.error(f"Error in track download: {str(e)}")
+                        first_error = first_error or e
+
+                        # Unblock the other tracks waiting on FFmpeg
+                        if self.remuxer is not None:
+                            self._abort_stream_remux()
+
+                if first_error is not None:
+                    raise first_error
+
+        finally:
+            if original_handler is not None:
+                signal.signal(signal.SIGINT, original_handler)
+
         return return_stopped
 
 
 class MergeManager:
     """Handles merging of video, audio, and subtitle streams."""
-    def __init__(self, temp_dir: str, parser: M3U8_Parser, audio_streams: List[Dict], sub_streams: List[Dict]):
+    def __init__(self, temp_dir: str, parser: M3U8_Parser, audio_streams: List[Dict], sub_streams: List[Dict], remuxer: Optional[StreamRemuxer] = None):
         """
         Args:
             temp_dir: Directory containing temporary files
             parser: M3U8 parser instance with codec information
             audio_streams: List of audio streams to merge
             sub_streams: List of subtitle streams to merge
+            remuxer: Streaming remux already fed by the download, if any
         """
         self.temp_dir = temp_dir
         self.parser = parser
         self.audio_streams = audio_streams
         self.sub_streams = sub_streams
+        self.remuxer = remuxer
 
     def merge(self) -> str:
         """
@@ -352,13 +576,29 @@ class MergeManager:
 
         Process:
         1. If no audio/subs, just process video
-        2. If audio exists, merge with video
-        3. If subtitles exist, add them to the video
+        2. Otherwise merge audio and subtitles with the video in a single FFmpeg pass
+        With streaming remux FFmpeg has already written the file, only wait for it.
         """
-        video_file = os.path.join(self.temp_dir, 'video', '0.ts')
-        merged_file = video_file
+        if self.remuxer is not None:
+            return self.remuxer.wait()
 
-        if not self.audio_streams and not self.sub_streams:
+        video_file = os.path.join(self.temp_dir, 'video', '0.ts')
+        audio_tracks = []
+        sub_tracks = []
+
+        if MERGE_AUDIO and self.audio_streams:
+            audio_tracks = [{
+                'path': os.path.join(self.temp_dir, 'audio', a['language'], '0.ts'),
+                'name': a['language']
+            } for a in self.audio_streams]
+
+        if MERGE_SUBTITLE and self.sub_streams:
+            sub_tracks = [{
+                'path': os.path.join(self.temp_dir, 'subs', f"{s['language']}.vtt"),
+                'language': s['language']
+            } for s in self.sub_streams]
+
+        if not audio_tracks and not sub_tracks:
             merged_file = join_video(
                 video_path=video_file,
                 out_path=os.path.join(self.temp_dir, 'video.mp4'),
@@ -366,46 +606,52 @@ class MergeManager:
             )
 
         else:
-            if MERGE_AUDIO and self.audio_streams:
-                audio_tracks = [{
-                    'path': os.path.join(self.temp_dir, 'audio', a['language'], '0.ts'),
-                    'name': a['language']
-                } for a in self.audio_streams]
-
-                merged_audio_path = os.path.join(self.temp_dir, 'merged_audio.mp4')
-                merged_file = join_audios(
-                    video_path=video_file,
-                    audio_tracks=audio_tracks,
-                    out_path=merged_audio_path,
-                    codec=self.parser.codec
-                )
-
-            if MERGE_SUBTITLE and self.sub_streams:
-                sub_tracks = [{
-                    'path': os.path.join(self.temp_dir, 'subs', f"{s['language']}.vtt"),
-                    'language': s['language']
-                } for s in self.sub_streams]
-
-                merged_subs_path = os.path.join(self.temp_dir, 'final.mp4')
-                merged_file = join_subtitle(
-                    video_path=merged_file,
-                    subtitles_list=sub_tracks,
-                    out_path=merged_subs_path
-                )
+            # One pass for every track, the file is copied once
+            merged_file = join_all(
+                video_path=video_file,
+                audio_tracks=audio_tracks,
+                subtitles_list=sub_tracks,
+                out_path=os.path.join(self.temp_dir, 'final.mp4'),
+                codec=self.parser.codec
+            )
 
         return merged_file
 
 
 class HLS_Downloader:
     """Main class for HLS video download and processing."""
-    def __init__(self, m3u8_url: str, output_path: Optional[str] = None):
+    def __init__(self, m3u8_url: str, output_path: Optional[str] = None, mirrors: Optional[List[str]] = None, refresh_playlist: Optional[Callable[[], Tuple[str, List[str]]]] = None):
+        """
+        Args:
+            m3u8_url: Master or media playlist to download
+            output_path: Path of the final file
+            mirrors: Playlists of the same content on other servers, segments are spread across all of them
+            refresh_playlist: Returns a newly signed `(m3u8_url, mirrors)` when the token of the URLs expires
+        """
         self.m3u8_url = m3u8_url
         self.path_manager = PathManager(m3u8_url, output_path)
         self.client = HLSClient()
-        self.m3u8_manager = M3U8Manager(m3u8_url, self.client)
+        self.m3u8_manager = M3U8Manager(m3u8_url, self.client, mirrors, refresh_playlist)
         self.download_manager: Optional[DownloadManager] = None
         self.merge_manager: Optional[MergeManager] = None
 
+        # Seconds spent in each phase of `start`
+        self.timings: Dict[str, float] = {}
+        self.phase_start = None
+
+    def _end_phase(self, phase: str) -> None:
+        """Store the time elapsed since the previous phase ended."""
+        now = time.monotonic()
+        self.timings[phase] = round(now - self.phase_start, 3)
+        self.phase_start = now
+
+    def _get_metrics(self) -> List[Dict]:
+        """Telemetry summary of each downloaded track."""
+        if self.download_manager is None:
+            return []
+
+        return [result['metrics'] for result in self.download_manager.missing_segments if result.get('metrics')]
+
     def start(self) -> Dict[str, Any]:
         """
         Main execution flow with handling for both index and playlist M3U8s.
@@ -415,6 +661,8 @@ class HLS_Downloader:
                 - path: Output file path
                 - url: Original M3U8 URL
                 - is_master: Whether the M3U8 was a master playlist
+                - timings: Seconds spent to parse, download, merge and move
+                - metrics: Request telemetry of each track (per host latency, bytes, errors)
             Or raises an exception if there's an error
         """
         console.print(f"[cyan]You can safely stop the download with [bold]Ctrl+c[bold] [cyan] \n")
@@ -431,7 +679,9 @@ class HLS_Downloader:
                     'is_master': False,
                     'msg': 'File already exists',
                     'error': None,
-                    'stopped': False
+                    'stopped': False,
+                    'timings': None,
+                    'metrics': None
                 }
                 if TELEGRAM_BOT:
                     bot.send_message(f"Contenuto già scaricato!", None)
@@ -445,21 +695,29 @@ class HLS_Downloader:
                     'is_master': getattr(self.m3u8_manager, 'is_master', None),
                     'msg': None,
                     'error': None,
-                    'stopped': True
+                    'stopped': True,
+                    'timings': None,
+                    'metrics': None
                 }
 
 
+            self.phase_start = time.monotonic()
             self.path_manager.setup_directories()
 
             # Parse M3U8 and determine if it's a master playlist
             self.m3u8_manager.parse()
             self.m3u8_manager.select_streams()
+            self.m3u8_manager.resolve_mirrors()
             self.m3u8_manager.log_selection()
+            self._end_phase('parse')
 
             self.download_manager = DownloadManager(
                 temp_dir=self.path_manager.temp_dir,
                 client=self.client,
-                url_fixer=self.m3u8_manager.url_fixer
+                url_fixer=self.m3u8_manager.url_fixer,
+                video_mirrors=self.m3u8_manager.video_mirrors,
+                refresh_track=self.m3u8_manager.refresh_track if self.m3u8_manager.refresh_playlist else None,
+                video_bandwidth=self.m3u8_manager.video_bandwidth
             )
 
             # Check if download was stopped
@@ -468,16 +726,21 @@ class HLS_Downloader:
                 audio_streams=self.m3u8_manager.audio_streams,
                 sub_streams=self.m3u8_manager.sub_streams
             )
+            self._end_phase('download')
 
             self.merge_manager = MergeManager(
                 temp_dir=self.path_manager.temp_dir,
                 parser=self.m3u8_manager.parser,
                 audio_streams=self.m3u8_manager.audio_streams,
-                sub_streams=self.m3u8_manager.sub_streams
+                sub_streams=self.m3u8_manager.sub_streams,
+                remuxer=self.download_manager.remuxer
             )
 
             final_file = self.merge_manager.merge()
+            self._end_phase('merge')
             self.path_manager.move_final_file(final_file)
+            self._end_phase('move')
+            logging.info(f"HLS phase timings: {self.timings}")
             self._print_summary()
             self.path_manager.cleanup()
 
@@ -487,7 +750,9 @@ class HLS_Downloader:
                 'is_master': self.m3u8_manager.is_master,
                 'msg': None,
                 'error': None,
-                'stopped': download_stopped
+                'stopped': download_stopped,
+                'timings': self.timings,
+                'metrics': self._get_metrics()
             }
 
         except Exception as e:
@@ -501,7 +766,9 @@ class HLS_Downloader:
                 'is_master': getattr(self.m3u8_manager, 'is_master', None),
                 'msg': None,
                 'error': error_msg,
-                'stopped': False
+                'stopped': False,
+                'timings': self.timings,
+                'metrics': self._get_metrics()
             }
 
     def _print_summary(self):
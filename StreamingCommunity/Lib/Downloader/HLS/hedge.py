@@ -0,0 +1,52 @@
+# 18.10.26
+
+import threading
+from collections import deque
+from typing import Optional
+
+
+class HedgePolicy:
+    def __init__(self, max_ratio: float, percentile: float = 0.95, min_samples: int = 20, window: int = 200):
+        """
+        Decide when a slow segment request deserves a duplicate (hedge) and cap how many are sent.
+
+        Parameters:
+            - max_ratio (float): Maximum hedges per completed request, e.g. 0.05 for 5%.
+            - percentile (float): Latency percentile after which a request is late.
+            - min_samples (int): Completed requests needed before hedging starts.
+            - window (int): Number of recent latencies considered.
+        """
+        self.max_ratio = max_ratio
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a completed request."""
+        with self.lock:
+            self.latencies.append(latency)
+            self.requests += 1
+
+    def threshold(self) -> Optional[float]:
+        """
+        Returns:
+            Optional[float]: Seconds after which a request is hedged, None until enough samples are collected.
+        """
+        with self.lock:
+            if self.requests < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+    def allow(self) -> bool:
+        """Take one hedge from the budget, False once the cap is reached."""
+        with self.lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+
+            self.hedges += 1
+            return True
@@ -0,0 +1,130 @@
+# 18.10.26
+
+import os
+import json
+import logging
+from typing import List, Tuple
+
+
+JOURNAL_NAME = "journal.log"
+COMPLETE_MARKER = "done"
+
+
+class SegmentJournal:
+    def __init__(self, tmp_folder: str):
+        """
+        Append-only record of the segments written to `0.ts`, one line `index offset length` per segment.
+
+        Parameters:
+            - tmp_folder (str): The temporary folder of the stream.
+        """
+        self.path = os.path.join(tmp_folder, JOURNAL_NAME)
+        self.file = None
+
+    @staticmethod
+    def is_complete(tmp_folder: str) -> bool:
+        """
+        Check if the stream in `tmp_folder` has been fully downloaded.
+        Folders written before the journal existed are considered complete if `0.ts` is present.
+        """
+        journal_path = os.path.join(tmp_folder, JOURNAL_NAME)
+        if not os.path.exists(journal_path):
+            return os.path.exists(os.path.join(tmp_folder, "0.ts"))
+
+        try:
+            with open(journal_path, 'r') as f:
+                lines = f.read().splitlines()
+            return bool(lines) and lines[-1] == COMPLETE_MARKER
+
+        except OSError as e:
+            logging.error(f"Can't read journal {journal_path}: {e}")
+            return False
+
+    def load(self, playlist_id: str, data_path: str) -> Tuple[int, int]:
+        """
+        Read the journal of a previous run of the same playlist.
+
+        Parameters:
+            - playlist_id (str): Identifier of the playlist, a different one discards the journal.
+            - data_path (str): Path of the concatenated segments file.
+
+        Returns:
+            Tuple[int, int]: Index of the first segment to download and byte offset where to resume writing.
+        """
+        if not os.path.exists(self.path) or not os.path.exists(data_path):
+            return 0, 0
+
+        data_size = os.path.getsize(data_path)
+        next_index, next_offset = 0, 0
+
+        try:
+            with open(self.path, 'r') as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get('playlist') != playlist_id:
+                    logging.info("Journal belongs to a different playlist, starting from scratch")
+                    return 0, 0
+
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 3:
+                        break
+
+                    index, offset, length = (int(p) for p in parts)
+
+                    # Stop at the first gap or at data that never reached the disk (preallocated files
+                    # are full size from the start, their segments are journaled only once synced)
+                    if index != next_index or offset != next_offset or offset + length > data_size:
+                        break
+
+                    next_index, next_offset = index + 1, offset + length
+
+        except (OSError, ValueError) as e:
+            logging.error(f"Invalid journal {self.path}, starting from scratch: {e}")
+            return 0, 0
+
+        return next_index, next_offset
+
+    def open(self, playlist_id: str, resume_index: int) -> None:
+        """
+        Open the journal for writing, keeping only the entries before `resume_index`.
+
+        Parameters:
+            - playlist_id (str): Identifier of the playlist.
+            - resume_index (int): Index of the first segment that is going to be downloaded.
+        """
+        entries = []
+        if resume_index > 0:
+            with open(self.path, 'r') as f:
+                f.readline()
+                entries = [next(f) for _ in range(resume_index)]
+
+        self.file = open(self.path, 'w')
+        self.file.write(json.dumps({'playlist': playlist_id}) + "\n")
+        self.file.writelines(entries)
+        self.file.flush()
+
+    def record(self, index: int, offset: int, length: int) -> None:
+        """Append the position of a segment already flushed to the data file."""
+        self.file.write(f"{index} {offset} {length}\n")
+        self.file.flush()
+
+    def record_many(self, entries: List[Tuple[int, int, int]]) -> None:
+        """Append the positions `(index, offset, length)` of a batch of segments already written to the data file."""
+        self.file.writelines(f"{index} {offset} {length}\n" for index, offset, length in entries)
+        self.file.flush()
+
+    def close(self, complete: bool = False) -> None:
+        """
+        Close the journal.
+
+        Parameters:
+            - complete (bool): Mark the stream as fully downloaded.
+        """
+        if self.file is None:
+            return
+
+        if complete:
+            self.file.write(COMPLETE_MARKER + "\n")
+
+        self.file.close()
+        self.file = None
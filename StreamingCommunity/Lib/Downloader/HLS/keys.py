@@ -0,0 +1,74 @@
+# 18.10.26
+
+import time
+import threading
+from typing import Callable, Dict, Tuple
+
+
+# Costant
+KEY_CACHE_TTL = 600             # Seconds a key is reused before being fetched again
+
+
+class KeyCache:
+    def __init__(self, ttl: float):
+        """
+        HLS keys shared by every track of the process, keyed by absolute URI.
+        Concurrent requests for the same key wait for a single fetch.
+
+        Parameters:
+            - ttl (float): Seconds after which a key is evicted.
+        """
+        self.ttl = ttl
+        self.entries: Dict[str, Tuple[float, bytes]] = {}
+        self.fetch_locks: Dict[str, threading.Lock] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self, now: float) -> None:
+        for uri in [uri for uri, (expires_at, _) in self.entries.items() if expires_at <= now]:
+            del self.entries[uri]
+            self.fetch_locks.pop(uri, None)
+
+    def _lookup(self, uri: str) -> bytes:
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            entry = self.entries.get(uri)
+            return entry[1] if entry is not None else None
+
+    def get(self, uri: str, fetch: Callable[[str], bytes]) -> bytes:
+        """
+        Return the key at `uri`, calling `fetch(uri)` only if it is not cached.
+
+        Parameters:
+            - uri (str): Absolute URI of the key.
+            - fetch (Callable): Downloads the key, its exceptions are propagated.
+        """
+        key = self._lookup(uri)
+        if key is not None:
+            self.hits += 1
+            return key
+
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(uri, threading.Lock())
+
+        with fetch_lock:
+            key = self._lookup(uri)
+            if key is not None:
+                self.hits += 1
+                return key
+
+            key = fetch(uri)
+            self.misses += 1
+            with self.lock:
+                self.entries[uri] = (time.monotonic() + self.ttl, key)
+            return key
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.fetch_locks.clear()
+
+
+key_cache = KeyCache(KEY_CACHE_TTL)
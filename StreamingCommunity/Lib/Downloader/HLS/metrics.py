@@ -0,0 +1,247 @@
+# 18.10.26
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from typing import Dict, List, Optional
+
+
+# Costant
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+EXPORT_INTERVAL = 5             # Seconds between two writes of the metrics file during a download
+
+# Variable
+_export_lock = threading.Lock()
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        """Latency histogram with the fixed `LATENCY_BUCKETS`, the last count is the +Inf bucket."""
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the `q` quantile, None without observations."""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return float('inf')
+
+
+class HostStats:
+    __slots__ = ('requests', 'errors', 'bytes', 'latency', 'ttfb', 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = Histogram()
+        self.ttfb = Histogram()
+        self.statuses: Dict[int, int] = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Streams of one download, its tracks are exported together in the Prometheus file."""
+        self.streams: List["SegmentMetrics"] = []
+        self.lock = threading.Lock()
+
+    def add(self, metrics: "SegmentMetrics") -> None:
+        with self.lock:
+            self.streams.append(metrics)
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Write the metrics of every stream of the download in the Prometheus text format,
+        streams with the same name are summed.
+        """
+        requests, errors, sizes = {}, {}, {}
+        latency: Dict[tuple, Histogram] = {}
+        ttfb: Dict[tuple, Histogram] = {}
+
+        with self.lock:
+            streams = list(self.streams)
+
+        for metrics in streams:
+            with metrics.lock:
+                for host, stats in metrics.hosts.items():
+                    labels = (metrics.stream, host)
+                    for status, count in stats.statuses.items():
+                        requests[labels + (str(status),)] = requests.get(labels + (str(status),), 0) + count
+                    errors[labels] = errors.get(labels, 0) + stats.errors
+                    sizes[labels] = sizes.get(labels, 0) + stats.bytes
+                    latency.setdefault(labels, Histogram()).merge(stats.latency)
+                    ttfb.setdefault(labels, Histogram()).merge(stats.ttfb)
+
+        def label_text(values: tuple, names: tuple = ('stream', 'host', 'status')) -> str:
+            return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+        lines = ["# TYPE hls_segment_requests_total counter"]
+        lines += [f"hls_segment_requests_total{{{label_text(k)}}} {v}" for k, v in requests.items()]
+        lines.append("# TYPE hls_segment_errors_total counter")
+        lines += [f"hls_segment_errors_total{{{label_text(k)}}} {v}" for k, v in errors.items()]
+        lines.append("# TYPE hls_segment_bytes_total counter")
+        lines += [f"hls_segment_bytes_total{{{label_text(k)}}} {v}" for k, v in sizes.items()]
+
+        for name, histograms in (("hls_segment_latency_seconds", latency), ("hls_segment_ttfb_seconds", ttfb)):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in histograms.items():
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float('inf') else str(bound)
+                    lines.append(f'{name}_bucket{{{label_text(labels)},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label_text(labels)}}} {histogram.total:.6f}")
+                lines.append(f"{name}_count{{{label_text(labels)}}} {histogram.count}")
+
+        # Scrapers must never read a half written file
+        tmp_path = f"{path}.tmp"
+        with _export_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, path)
+
+
+class SegmentMetrics:
+    def __init__(self, stream: str, export_path: Optional[str] = None, registry: Optional[MetricsRegistry] = None):
+        """
+        Per-request telemetry of one stream: counters and latency histograms for each CDN host.
+
+        Parameters:
+            - stream (str): Name of the stream, e.g. "Video" or "Audio ita".
+            - export_path (str): File written during the download, Prometheus text format if it ends
+              with `.prom`, JSON lines with one record per request otherwise.
+            - registry (MetricsRegistry): Other tracks of the same download, written in the same Prometheus file.
+        """
+        self.stream = stream
+        self.export_path = export_path or None
+        self.prometheus = bool(self.export_path) and self.export_path.endswith('.prom')
+        self.hosts: Dict[str, HostStats] = {}
+        self.retries = 0
+        self.pending: List[str] = []
+        self.last_export = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.registry = registry or MetricsRegistry()
+        self.registry.add(self)
+
+    def record(self, index: int, host: str, size: int, ttfb: Optional[float], latency: float, retries: int, status: int) -> None:
+        """
+        Record a finished request.
+
+        Parameters:
+            - index (int): First segment of the request.
+            - host (str): Host that served it.
+            - size (int): Bytes received, 0 on failure.
+            - ttfb (float): Seconds until the response headers, None if none arrived.
+            - latency (float): Seconds until the body was read or the request failed.
+            - retries (int): Attempts already failed for this segment.
+            - status (int): HTTP status, 0 on network errors.
+        """
+        with self.lock:
+            stats = self.hosts.get(host)
+            if stats is None:
+                stats = self.hosts[host] = HostStats()
+
+            stats.requests += 1
+            stats.bytes += size
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.latency.observe(latency)
+            if ttfb is not None:
+                stats.ttfb.observe(ttfb)
+            if not 200 <= status < 300:
+                stats.errors += 1
+            if retries:
+                self.retries += 1
+
+            if self.export_path and not self.prometheus:
+                self.pending.append(json.dumps({
+                    'ts': round(time.time(), 3), 'stream': self.stream, 'segment': index, 'host': host,
+                    'bytes': size, 'ttfb': None if ttfb is None else round(ttfb, 4), 'latency': round(latency, 4),
+                    'retries': retries, 'status': status
+                }))
+
+        if self.export_path and time.monotonic() - self.last_export >= EXPORT_INTERVAL:
+            self.export()
+
+    def export(self) -> None:
+        """Append the pending JSON lines or rewrite the Prometheus file."""
+        if not self.export_path:
+            return
+
+        self.last_export = time.monotonic()
+        try:
+            if self.prometheus:
+                self.registry.write_prometheus(self.export_path)
+                return
+
+            with self.lock:
+                lines, self.pending = self.pending, []
+            if lines:
+                with _export_lock, open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write("\n".join(lines) + "\n")
+
+        except OSError as e:
+            logging.error(f"Can't write metrics to {self.export_path}: {e}")
+
+    def close(self) -> None:
+        self.export()
+
+    def summary(self) -> Dict:
+        """Totals of the stream and of each host, latencies are bucket upper bounds in seconds."""
+        with self.lock:
+            hosts = {
+                host: {
+                    'requests': stats.requests,
+                    'errors': stats.errors,
+                    'bytes': stats.bytes,
+                    'ttfb_p50': stats.ttfb.quantile(0.5),
+                    'latency_p50': stats.latency.quantile(0.5),
+                    'latency_p99': stats.latency.quantile(0.99),
+                    'statuses': dict(stats.statuses)
+                }
+                for host, stats in self.hosts.items()
+            }
+
+            latency = Histogram()
+            for stats in self.hosts.values():
+                latency.merge(stats.latency)
+
+        return {
+            'stream': self.stream,
+            'requests': sum(h['requests'] for h in hosts.values()),
+            'errors': sum(h['errors'] for h in hosts.values()),
+            'bytes': sum(h['bytes'] for h in hosts.values()),
+            'retried_requests': self.retries,
+            'latency_p50': latency.quantile(0.5),
+            'latency_p99': latency.quantile(0.99),
+            'hosts': hosts
+        }
+
+    def log_summary(self) -> None:
+        for host, stats in self.summary()['hosts'].items():
+            logging.info(f"{self.stream} from {host}: {stats['requests']} req, {stats['errors']} errors, {stats['bytes'] / 1024 / 1024:.1f} MB, p50 {stats['latency_p50']}s, p99 {stats['latency_p99']}s")
+
@@ -0,0 +1,267 @@
+# 18.10.26
+
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+from typing import Callable, List, Optional, Tuple
+
+
+# External libraries
+import httpx
+
+
+# Logic class
+from ...M3U8 import CompiledPlaylist
+
+
+# Costant
+EWMA_ALPHA = 0.2
+FAILURE_PENALTY = 0.5           # Share cut of a mirror on each error
+THROTTLE_PENALTY = 0.25         # Share cut of a mirror answering 429/503 or timing out
+RECOVERY = 1.1                  # Share given back on each success
+MIN_PENALTY = 0.02              # A penalized mirror still gets a few requests to notice its recovery
+REFRESH_MIN_INTERVAL = 30       # Seconds between two refreshes of the signed playlist, a 403 right after one is a real error
+EXPIRY_MARGIN = 30              # Seconds before `expires` the playlist is refreshed without waiting for a 403
+
+
+def get_expiry(url: str) -> Optional[float]:
+    """Unix time of the `expires` parameter of a signed URL, None if unsigned."""
+    try:
+        return float(parse_qs(urlparse(url).query)['expires'][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def is_expired(error: Exception) -> bool:
+    """Check if a failure means the signature of the URL is no longer valid."""
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (401, 403, 410)
+
+
+def is_throttled(error: Exception) -> bool:
+    """Check if a failure means the CDN is overloaded (429/503, timeout, connection error)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in (429, 503)
+
+    return isinstance(error, (httpx.TimeoutException, httpx.NetworkError))
+
+
+class MirrorSelector:
+    def __init__(self, count: int):
+        """
+        Spread segment requests across equivalent origins in proportion to their measured throughput.
+
+        Parameters:
+            - count (int): Number of origins, index 0 is the primary one.
+        """
+        self.count = count
+        self.throughput: List[Optional[float]] = [None] * count
+        self.penalty = [1.0] * count
+        self.requests = [0] * count
+        self.lock = threading.Lock()
+
+    def weights(self) -> List[float]:
+        """Share of each origin: throughput (the average one while unmeasured) times its error penalty."""
+        with self.lock:
+            measured = [t for t in self.throughput if t is not None]
+            default = sum(measured) / len(measured) if measured else 1.0
+            return [(t if t is not None else default) * p for t, p in zip(self.throughput, self.penalty)]
+
+    def pick(self, exclude: Optional[int] = None) -> int:
+        """
+        Choose the origin of the next request.
+
+        Parameters:
+            - exclude (int): Origin to avoid if possible, e.g. the one a hedged request is already waiting on.
+        """
+        weights = self.weights()
+        if exclude is not None and self.count > 1:
+            weights[exclude] = 0
+        if sum(weights) <= 0:
+            weights = [1.0] * self.count
+
+        origin = random.choices(range(self.count), weights=weights)[0]
+        with self.lock:
+            self.requests[origin] += 1
+        return origin
+
+    def on_success(self, origin: int, latency: float, size: int) -> None:
+        """Record a completed request of `size` bytes in `latency` seconds."""
+        throughput = size / max(latency, 1e-3)
+        with self.lock:
+            if origin >= self.count:
+                return
+
+            current = self.throughput[origin]
+            self.throughput[origin] = throughput if current is None else current + EWMA_ALPHA * (throughput - current)
+            self.penalty[origin] = min(1.0, self.penalty[origin] * RECOVERY)
+
+    def on_failure(self, origin: int, throttled: bool) -> None:
+        """Move part of the share of a failing origin to the others."""
+        with self.lock:
+            if origin >= self.count:
+                return
+
+            factor = THROTTLE_PENALTY if throttled else FAILURE_PENALTY
+            self.penalty[origin] = max(MIN_PENALTY, self.penalty[origin] * factor)
+
+    def summary(self) -> str:
+        with self.lock:
+            return ", ".join(
+                f"#{i}: {n} req, {(t or 0) / 1024 / 1024:.1f} MB/s"
+                for i, (n, t) in enumerate(zip(self.requests, self.throughput))
+            )
+
+    def log_summary(self) -> None:
+        logging.info(f"Mirror usage: {self.summary()}")
+
+
+class OriginPool:
+    def __init__(self, url: str, fetch_playlist: Callable[[str], CompiledPlaylist], refresh_urls: Callable[[], Optional[List[str]]] = None):
+        """
+        Segments of a media playlist on each origin serving it: where every request goes, and new URLs once their signature expires.
+        Both download engines go through it, so a refresh or a failing mirror is seen by every request.
+
+        Parameters:
+            - url (str): The URL of the primary media playlist.
+            - fetch_playlist (Callable): Downloads a media playlist and returns its segments.
+            - refresh_urls (Callable): Returns newly signed URLs of the playlist and its mirrors (default None).
+        """
+        self.url = url
+        self.fetch_playlist = fetch_playlist
+        self.refresh_urls = refresh_urls
+
+        # origins[0] are the segments of `url`, the others the same segments on each mirror
+        self.origins: List[CompiledPlaylist] = []
+        self.selector: Optional[MirrorSelector] = None
+
+        # A request failing with a stale `generation` retries on the URLs of a refresh done meanwhile
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.last_refresh = None
+        self.expires_at = get_expiry(url)
+
+    @property
+    def primary(self) -> CompiledPlaylist:
+        return self.origins[0]
+
+    def set_primary(self, segments: CompiledPlaylist) -> None:
+        """Use `segments` alone, until `add_mirrors`."""
+        self.origins = [segments]
+        self.selector = None
+
+    def add_mirrors(self, mirror_urls: List[str]) -> None:
+        """Fetch the playlists of the mirrors, keeping those with the same segments as the primary one."""
+        self.origins = [self.primary] + self._fetch_mirrors(mirror_urls)
+
+        if len(self.origins) > 1:
+            logging.info(f"Spreading segments across {len(self.origins)} origins")
+            self.selector = MirrorSelector(len(self.origins))
+
+    def _fetch_mirrors(self, mirror_urls: List[str]) -> List[CompiledPlaylist]:
+        """Segments of each mirror, skipping the unreachable ones and those not matching the primary playlist."""
+        origins = []
+
+        for mirror_url in mirror_urls:
+            try:
+                mirror_segments = self.fetch_playlist(mirror_url)
+            except Exception as e:
+                logging.warning(f"Skip mirror {mirror_url}: {e}")
+                continue
+
+            if len(mirror_segments) != len(self.primary):
+                logging.warning(f"Skip mirror {mirror_url}: {len(mirror_segments)} segments instead of {len(self.primary)}")
+                continue
+
+            origins.append(mirror_segments)
+
+        return origins
+
+    def select(self, index: int, exclude: Optional[int] = None) -> Tuple[int, str]:
+        """
+        Choose where to download a segment from.
+
+        Parameters:
+            - exclude (int): Origin to avoid if possible, e.g. the one a hedged request is already waiting on.
+
+        Returns:
+            Tuple[int, str]: Origin index and URL of the segment on that origin.
+        """
+        selector, origins = self.selector, self.origins
+        if selector is None:
+            return 0, origins[0][index]
+
+        # The mirrors may change with a refresh
+        origin = selector.pick(exclude)
+        if origin >= len(origins):
+            origin = 0
+        return origin, origins[origin][index]
+
+    def on_success(self, origin: int, latency: float, size: int) -> None:
+        selector = self.selector
+        if selector is not None:
+            selector.on_success(origin, latency, size)
+
+    def on_failure(self, origin: int, error: Exception) -> None:
+        selector = self.selector
+        if selector is not None:
+            selector.on_failure(origin, is_throttled(error))
+
+    def expiring(self) -> bool:
+        """Check if the signature of the URLs is about to expire and can be refreshed."""
+        return (
+            self.refresh_urls is not None and self.expires_at is not None
+            and time.time() > self.expires_at - EXPIRY_MARGIN
+        )
+
+    def refresh(self, generation: int) -> bool:
+        """
+        Ask the player for a newly signed playlist and remap the URLs of every segment.
+
+        Parameters:
+            - generation (int): `generation` seen by the failed request.
+
+        Returns:
+            bool: True if the URLs are newer than those of the failed request.
+        """
+        with self.lock:
+            if self.generation != generation:
+                return True
+
+            if self.refresh_urls is None or (self.last_refresh is not None and time.monotonic() - self.last_refresh < REFRESH_MIN_INTERVAL):
+                return False
+            self.last_refresh = time.monotonic()
+
+            try:
+                urls = self.refresh_urls()
+                if not urls:
+                    return False
+
+                segments = self.fetch_playlist(urls[0])
+
+            except Exception as e:
+                logging.error(f"Playlist refresh failed: {e}")
+                return False
+
+            if len(segments) != len(self.primary):
+                logging.error(f"Refreshed playlist has {len(segments)} segments instead of {len(self.primary)}")
+                return False
+
+            origins = [segments] + self._fetch_mirrors(urls[1:])
+            selector = self.selector
+            if len(origins) != len(self.origins):
+                selector = MirrorSelector(len(origins)) if len(origins) > 1 else None
+                self.selector = None
+
+            logging.info(f"Playlist signature refreshed, {len(origins)} origins")
+            self.url = urls[0]
+            self.expires_at = get_expiry(urls[0])
+            self.origins = origins
+            self.selector = selector
+            self.generation += 1
+            return True
+
+    def log_summary(self) -> None:
+        if self.selector is not None:
+            self.selector.log_summary()
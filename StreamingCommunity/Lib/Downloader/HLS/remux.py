@@ -0,0 +1,120 @@
+# 18.10.26
+
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+
+
+# Logic class
+from ...FFmpeg import start_stream_remux
+
+
+# Variable
+FIFO_NAME = "stream.fifo"
+
+
+class StreamRemuxer:
+    def __init__(self, temp_dir: str, audio_streams: List[Dict], sub_streams: List[Dict]):
+        """
+        Runs FFmpeg on named pipes fed by the segment writers, so the final file is written while downloading.
+
+        Parameters:
+            - temp_dir (str): Directory for storing temporary files.
+            - audio_streams (List[Dict]): Audio tracks remuxed with the video.
+            - sub_streams (List[Dict]): Subtitle tracks, already downloaded in `temp_dir/subs`.
+        """
+        self.temp_dir = temp_dir
+        self.audio_streams = audio_streams
+        self.sub_streams = sub_streams
+        self.out_path = os.path.join(temp_dir, 'final.mp4')
+        self.log_path = os.path.join(temp_dir, 'ffmpeg.log')
+        self.process = None
+        self.fifos: List[str] = []
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Named pipes are available on POSIX systems only."""
+        return hasattr(os, 'mkfifo')
+
+    def video_fifo(self) -> str:
+        return os.path.join(self.temp_dir, 'video', FIFO_NAME)
+
+    def audio_fifo(self, audio: Dict) -> str:
+        return os.path.join(self.temp_dir, 'audio', audio['language'], FIFO_NAME)
+
+    def _make_fifo(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+        os.mkfifo(path)
+        self.fifos.append(path)
+        return path
+
+    def start(self) -> None:
+        """Create the pipes and start FFmpeg, which blocks on each pipe until its writer opens it."""
+        video_path = self._make_fifo(self.video_fifo())
+        audio_tracks = [{'path': self._make_fifo(self.audio_fifo(a))} for a in self.audio_streams]
+
+        sub_tracks = [{
+            'path': os.path.join(self.temp_dir, 'subs', f"{s['language']}.vtt"),
+            'language': s['language']
+        } for s in self.sub_streams]
+
+        self.process = start_stream_remux(video_path, audio_tracks, sub_tracks, self.out_path, self.log_path)
+
+    def abort(self) -> None:
+        """
+        Stop FFmpeg and release writers still waiting for it to open their pipe, their next write fails.
+        Writers opening later find no pipe and write a plain file that is discarded with the temp folder.
+        """
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+        for path in self.fifos:
+            try:
+                os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+
+        self._remove_fifos()
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """
+        Wait for FFmpeg to finalize the output, all the writers must have closed their pipe.
+
+        Returns:
+            str: Path of the remuxed file.
+        """
+        return_code = self.process.wait(timeout=timeout)
+        self._remove_fifos()
+
+        if return_code != 0:
+            with open(self.log_path, 'r', errors='replace') as f:
+                log_tail = f.read()[-1000:]
+            logging.error(f"FFmpeg stream remux failed: {log_tail}")
+            raise RuntimeError(f"FFmpeg stream remux exited with code {return_code}")
+
+        return self.out_path
+
+    def _remove_fifos(self) -> None:
+        for path in self.fifos:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.fifos = []
+
+    def watch(self, on_exit) -> threading.Thread:
+        """
+        Call `on_exit` if FFmpeg terminates with an error while the tracks are still downloading.
+        """
+        def watcher():
+            if self.process.wait() != 0:
+                on_exit()
+
+        thread = threading.Thread(target=watcher, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,173 @@
+# 18.10.26
+
+import time
+import heapq
+import logging
+import threading
+from typing import Callable, List, Optional, Set, Tuple
+
+
+class SegmentScheduler:
+    def __init__(self, target: Callable[[int, int, bool], None], workers: int):
+        """
+        Runs `target(index, attempt, hedge)` on a pool of worker threads, lowest index first.
+        A failed attempt is parked in a delay heap until its backoff expires, no worker sleeps on it.
+
+        Parameters:
+            - target (Callable): Download of one attempt of a segment, or of a hedge of a late one.
+            - workers (int): Number of worker threads.
+        """
+        self.target = target
+        self.workers = max(1, workers)
+        self.ready: List[Tuple[int, int, bool]] = []
+        self.delayed: List[Tuple[float, int, int]] = []
+        self.outstanding = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, index: int, attempt: int = 0, hedge: bool = False) -> None:
+        """Queue an attempt, or a hedge of the request in flight for `index`, to run as soon as a worker is free."""
+        with self.condition:
+            self.outstanding += 1
+            heapq.heappush(self.ready, (index, attempt, hedge))
+            self.condition.notify()
+
+    def schedule(self, index: int, attempt: int, delay: float) -> None:
+        """Queue an attempt to run after `delay` seconds."""
+        with self.condition:
+            self.outstanding += 1
+            heapq.heappush(self.delayed, (time.monotonic() + delay, index, attempt))
+            self.condition.notify()
+
+    def waiting_retries(self) -> int:
+        """Number of attempts waiting for their backoff."""
+        with self.condition:
+            return len(self.delayed)
+
+    def _next(self) -> Optional[Tuple[int, int, bool]]:
+        """Wait for the next attempt to run, None once closed."""
+        with self.condition:
+            while not self.closed:
+                now = time.monotonic()
+                while self.delayed and self.delayed[0][0] <= now:
+                    _, index, attempt = heapq.heappop(self.delayed)
+                    heapq.heappush(self.ready, (index, attempt, False))
+
+                if self.ready:
+                    return heapq.heappop(self.ready)
+
+                self.condition.wait(self.delayed[0][0] - now if self.delayed else None)
+
+            return None
+
+    def _worker(self) -> None:
+        while True:
+            item = self._next()
+            if item is None:
+                return
+
+            try:
+                self.target(*item)
+            except Exception as e:
+                logging.error(f"Error in download thread: {str(e)}")
+
+            # A retry scheduled by the target is already counted, outstanding can't drop to zero early
+            finally:
+                with self.condition:
+                    self.outstanding -= 1
+                    self.condition.notify_all()
+
+    def join(self, cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Wait until every attempt, retries included, has completed.
+
+        Returns:
+            bool: False if `cancel` has been set while waiting.
+        """
+        with self.condition:
+            while self.outstanding > 0:
+                if cancel is not None and cancel.is_set():
+                    return False
+                self.condition.wait(timeout=0.5)
+
+            return True
+
+    def close(self) -> None:
+        """Drop the attempts not started yet and stop the workers once their current attempt ends."""
+        with self.condition:
+            self.closed = True
+            self.outstanding -= len(self.ready) + len(self.delayed)
+            self.ready.clear()
+            self.delayed.clear()
+            self.condition.notify_all()
+
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
+class RetryTracker:
+    def __init__(self, max_retry: int, backoff_factor: float = 1.1):
+        """
+        Attempts of the segments of a stream, shared by both download engines.
+        A segment is settled once, by its first successful request or by giving up on it, so a hedge or a retry
+        completing later never reaches the writer twice.
+
+        Parameters:
+            - max_retry (int): Attempts of a segment before it is marked as failed.
+            - backoff_factor (float): Seconds before the first retry, doubled on each one (default 1.1).
+        """
+        self.max_retry = max_retry
+        self.backoff_factor = backoff_factor
+        self.settled_segments: Set[int] = set()
+        self.failed_segments: Set[int] = set()
+        self.max_attempts = 0
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def claim(self, index: int) -> bool:
+        """
+        Settle a segment.
+
+        Returns:
+            bool: False if the segment has already been settled.
+        """
+        with self.lock:
+            if index in self.settled_segments:
+                return False
+
+            self.settled_segments.add(index)
+            return True
+
+    def settled(self, index: int, end: int) -> bool:
+        """Check if every segment from `index` to `end - 1` (one merged request) has been settled."""
+        return all(sub_index in self.settled_segments for sub_index in range(index, end))
+
+    def on_failure(self, index: int, end: int, attempt: int) -> Optional[List[int]]:
+        """
+        Count a failed attempt of the request for the segments `index` to `end - 1`.
+
+        Returns:
+            List[int]: None if another attempt is due, else the segments given up on, apart from those settled meanwhile.
+        """
+        with self.lock:
+            self.max_attempts = max(self.max_attempts, attempt + 1)
+            self.retries += 1
+            if attempt + 1 < self.max_retry:
+                return None
+
+            failed = [sub_index for sub_index in range(index, end) if sub_index not in self.settled_segments]
+            self.settled_segments.update(failed)
+            self.failed_segments.update(failed)
+            return failed
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retrying after `attempt` failed."""
+        return self.backoff_factor * (2 ** attempt)
@@ -4,14 +4,16 @@ import os
 import sys
 import time
 import queue
+import shutil
+import asyncio
 import signal
 import logging
 import binascii
 import threading
+import importlib.util
 from queue import PriorityQueue
 from urllib.parse import urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 
 # External libraries
@@ -24,6 +26,7 @@ from rich.console import Console
 from StreamingCommunity.Util.color import Colors
 from StreamingCommunity.Util.headers import get_userAgent
 from StreamingCommunity.Util.config_json import config_manager
+from StreamingCommunity.Util.os import compute_sha1_hash
 
 
 # Logic class
@@ -31,8 +34,18 @@ from ...M3U8 import (
     M3U8_Decryption,
     M3U8_Ts_Estimator,
     M3U8_Parser,
-    M3U8_UrlFix
+    CompiledPlaylist
 )
+from .buffer import ReorderWindow
+from .journal import SegmentJournal
+from .concurrency import AdaptiveConcurrency
+from .scheduler import SegmentScheduler, RetryTracker
+from .hedge import HedgePolicy
+from .mirrors import OriginPool, is_expired, is_throttled
+from .decrypt import DecryptionStage
+from .keys import key_cache
+from .metrics import MetricsRegistry, SegmentMetrics
+from .writer import SegmentWriter, FLUSH_INTERVAL
 
 # Config
 TQDM_DELAY_WORKER = config_manager.get_float('M3U8_DOWNLOAD', 'tqdm_delay')
@@ -42,15 +55,38 @@ DEFAULT_VIDEO_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'default_video_w
 DEFAULT_AUDIO_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'default_audio_workser')
 MAX_TIMEOOUT = config_manager.get_int("REQUESTS", "timeout")
 SEGMENT_MAX_TIMEOUT = config_manager.get_int("M3U8_DOWNLOAD", "segment_timeout")
+CONNECTION_POOL_SIZE = config_manager.get_int('M3U8_DOWNLOAD', 'connection_pool_size')
+HTTP2_HOSTS = config_manager.get_list('M3U8_DOWNLOAD', 'http2_hosts')
+DOWNLOAD_MODE = config_manager.get('M3U8_DOWNLOAD', 'download_mode').strip().lower()
+ASYNC_MAX_CONCURRENCY = config_manager.get_int('M3U8_DOWNLOAD', 'async_max_concurrency')
+REORDER_WINDOW_SEGMENTS = config_manager.get_int('M3U8_DOWNLOAD', 'reorder_window_segments')
+REORDER_WINDOW_MB = config_manager.get_int('M3U8_DOWNLOAD', 'reorder_window_mb')
+REORDER_SPILL = config_manager.get_bool('M3U8_DOWNLOAD', 'reorder_spill')
+ADAPTIVE_WORKERS = config_manager.get_bool('M3U8_DOWNLOAD', 'adaptive_workers')
+ADAPTIVE_MAX_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'adaptive_max_workers')
+HEDGE_REQUESTS = config_manager.get_bool('M3U8_DOWNLOAD', 'hedge_requests')
+HEDGE_MAX_RATIO = config_manager.get_float('M3U8_DOWNLOAD', 'hedge_max_ratio')
+BYTERANGE_MAX_SPAN_MB = config_manager.get_int('M3U8_DOWNLOAD', 'byterange_max_span_mb')
+RECORD_LIVE = config_manager.get_bool('M3U8_DOWNLOAD', 'record_live')
+LIVE_RECORD_MINUTES = config_manager.get_int('M3U8_DOWNLOAD', 'live_record_minutes')
+METRICS_FILE = config_manager.get('M3U8_DOWNLOAD', 'metrics_file')
+WRITE_COMBINE_MB = config_manager.get_int('M3U8_DOWNLOAD', 'write_combine_mb')
+PREALLOCATE_OUTPUT = config_manager.get_bool('M3U8_DOWNLOAD', 'preallocate_output')
 TELEGRAM_BOT = config_manager.get_bool('DEFAULT', 'telegram_bot')
 MAX_INTERRUPT_COUNT = 3
+ADMIT_TIMEOUT = 10              # Seconds a worker waits for room in the reorder window before spilling
+HEDGE_POLL = 0.1                # Seconds between two scans of the requests in flight
+DECRYPT_WORKERS = os.cpu_count() or 1
+DECRYPT_BACKLOG = 2 * DECRYPT_WORKERS   # Downloaded segments waiting for a decryption thread
+LIVE_IDLE_POLLS = 6             # Polls without new segments before a live playlist is considered over
 
 # Variable
 console = Console()
+http2_installed = importlib.util.find_spec("h2") is not None
 
 
 class M3U8_Segments:
-    def __init__(self, url: str, tmp_folder: str, is_index_url: bool = True):
+    def __init__(self, url: str, tmp_folder: str, is_index_url: bool = True, budget: AdaptiveConcurrency = None, handle_signals: bool = True, progress_position: int = None, sink_path: str = None, mirror_urls: List[str] = None, refresh_urls: Callable[[], Optional[List[str]]] = None, bandwidth: int = None, metrics_registry: MetricsRegistry = None):
         """
         Initializes the M3U8_Segments object.
 
@@ -58,23 +94,47 @@ class M3U8_Segments:
             - url (str): The URL of the M3U8 playlist.
             - tmp_folder (str): The temporary folder to store downloaded segments.
             - is_index_url (bool): Flag indicating if `m3u8_index` is a URL (default True).
+            - budget (AdaptiveConcurrency): Limit on requests in flight shared with the other tracks (default None).
+            - handle_signals (bool): Install the Ctrl+C handler, False when the caller forwards interrupts (default True).
+            - progress_position (int): Line of the progress bar when several tracks are downloaded together.
+            - sink_path (str): Write the ordered segments here instead of `0.ts`, e.g. a pipe read by FFmpeg (no resume).
+            - mirror_urls (List[str]): Equivalent media playlists on other servers, segment requests are spread across them.
+            - refresh_urls (Callable): Returns newly signed URLs of this playlist and its mirrors once the signature expires.
+            - bandwidth (int): BANDWIDTH of the variant in bits/s, used to preallocate the data file.
+            - metrics_registry (MetricsRegistry): Telemetry of the other tracks of the same download (default None).
         """
-        self.url = url
         self.tmp_folder = tmp_folder
         self.is_index_url = is_index_url
+        self.budget = budget
+        self.handle_signals = handle_signals
+        self.progress_position = progress_position
+        self.mirror_urls = mirror_urls or []
+        self.bandwidth = bandwidth
+        self.metrics_registry = metrics_registry
         self.expected_real_time = None
-        self.tmp_file_path = os.path.join(self.tmp_folder, "0.ts")
+        self.tmp_file_path = sink_path or os.path.join(self.tmp_folder, "0.ts")
+        self.streaming = sink_path is not None
         os.makedirs(self.tmp_folder, exist_ok=True)
 
         # Util class
-        self.decryption: M3U8_Decryption = None 
+        self.key_list: List[Dict] = []
+        self.decryptions: Dict[int, M3U8_Decryption] = {}
+        self.decryptions_lock = threading.Lock()
+        self.decrypt_stage: Optional[DecryptionStage] = None
+        self.media_sequence = 0
         self.class_ts_estimator = M3U8_Ts_Estimator(0, self) 
-        self.class_url_fixer = M3U8_UrlFix(url)
 
         # Sync
         self.queue = PriorityQueue()
         self.buffer = {}
         self.expected_index = 0 
+        self.reorder_window = ReorderWindow(REORDER_WINDOW_SEGMENTS, REORDER_WINDOW_MB * 1024 * 1024)
+
+        # Resume
+        self.journal = SegmentJournal(self.tmp_folder)
+        self.resume_index = 0
+        self.resume_offset = 0
+        self.written_segments = set()
 
         self.stop_event = threading.Event()
         self.downloaded_segments = set()
@@ -89,26 +149,47 @@ class M3U8_Segments:
         self.interrupt_lock = threading.Lock()
 
         # OTHER INFO
-        self.info_maxRetry = 0
-        self.info_nRetry = 0
-        self.info_nFailed = 0
-        self.active_retries = 0 
-        self.active_retries_lock = threading.Lock()
+        self.retries = RetryTracker(REQUEST_MAX_RETRY)
+        self.concurrency: AdaptiveConcurrency = None
+        self.metrics: Optional[SegmentMetrics] = None
+
+        # Hedging: a second request for late segments, the first response wins
+        self.hedger = HedgePolicy(HEDGE_MAX_RATIO) if HEDGE_REQUESTS else None
+        self.in_flight: Dict[int, float] = {}
+        self.in_flight_origin: Dict[int, int] = {}
+        self.hedged_segments = set()
+
+        # Byte range playlists: first segment of a merged request -> index after its last segment
+        self.unit_end: Dict[int, int] = {}
+
+        # Mirrors and signed URLs, remapped to a fresh playlist when the token expires
+        self.origin_pool = OriginPool(url, self._fetch_playlist, refresh_urls)
 
-    def __get_key__(self, m3u8_parser: M3U8_Parser) -> bytes:
+        # Live and EVENT playlists: re-polled while they grow, `next_sequence` is the first media sequence not seen yet
+        self.live = False
+        self.target_duration = 0
+        self.next_sequence = 0
+        self.skipped_segments = set()
+
+        # Connection pools, one per CDN host
+        self.http_clients: Dict[str, httpx.Client] = {}
+        self.http_clients_lock = threading.Lock()
+        self.async_http_clients: Dict[str, httpx.AsyncClient] = {}
+
+    def __get_key__(self, key_info: Dict) -> bytes:
         """
-        Fetches the encryption key from the M3U8 playlist.
+        Fetches an encryption key of the M3U8 playlist, once per process thanks to the shared key cache.
 
         Args:
-            m3u8_parser (M3U8_Parser): An instance of M3U8_Parser containing parsed M3U8 data.
+            key_info (Dict): Key entry of the parser ('uri', 'iv', 'method').
 
         Returns:
             bytes: The decryption key in byte format.
         """
-        key_uri = urljoin(self.url, m3u8_parser.keys.get('uri'))
-        parsed_url = urlparse(key_uri)
-        self.key_base_url = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-        
+        key_uri = urljoin(self.url, key_info.get('uri'))
+        return key_cache.get(key_uri, self._fetch_key)
+
+    def _fetch_key(self, key_uri: str) -> bytes:
         try:
             client_params = {'headers': {'User-Agent': get_userAgent()}, 'timeout': MAX_TIMEOOUT}
             response = httpx.get(url=key_uri, **client_params)
@@ -119,6 +200,18 @@ class M3U8_Segments:
             
         except Exception as e:
             raise Exception(f"Failed to fetch key: {e}")
+
+    def _get_decryption(self, key_index: int) -> M3U8_Decryption:
+        """Decryption of the segments using the key `key_index`, rotated keys are fetched on first use."""
+        with self.decryptions_lock:
+            decryption = self.decryptions.get(key_index)
+        if decryption is not None:
+            return decryption
+
+        key_info = self.key_list[key_index]
+        decryption = M3U8_Decryption(self.__get_key__(key_info), key_info.get('iv'), key_info.get('method'))
+        with self.decryptions_lock:
+            return self.decryptions.setdefault(key_index, decryption)
     
     def parse_data(self, m3u8_content: str) -> None:
         """
@@ -131,21 +224,21 @@ class M3U8_Segments:
         m3u8_parser.parse_data(uri=self.url, raw_content=m3u8_content)
 
         self.expected_real_time_s = m3u8_parser.duration
+        self.media_sequence = m3u8_parser.media_sequence
 
-        if m3u8_parser.keys:
-            key = self.__get_key__(m3u8_parser)    
-            self.decryption = M3U8_Decryption(
-                key, 
-                m3u8_parser.keys.get('iv'), 
-                m3u8_parser.keys.get('method')
-            )
+        self.key_list = m3u8_parser.key_list
+        if self.key_list:
+            self._get_decryption(0)
+            logging.info(f"Encrypted playlist, {len(self.key_list)} keys")
 
-        self.segments = [
-            self.class_url_fixer.generate_full_url(seg)
-            if "http" not in seg else seg
-            for seg in m3u8_parser.segments
-        ]
+        # URLs are resolved when a segment is requested
+        self.origin_pool.set_primary(m3u8_parser.playlist)
         self.class_ts_estimator.total_segments = len(self.segments)
+        self.class_ts_estimator.total_duration = self.expected_real_time_s
+
+        self.target_duration = m3u8_parser.target_duration
+        self.next_sequence = self.media_sequence + len(self.segments)
+        self.live = RECORD_LIVE and self.is_index_url and m3u8_parser.is_live
 
     def get_info(self) -> None:
         """
@@ -168,147 +261,778 @@ class M3U8_Segments:
                     
             except Exception as e:
                 raise RuntimeError(f"M3U8 info retrieval failed: {e}")
-    
-    def setup_interrupt_handler(self):
+
+            self._load_mirrors()
+
+    @property
+    def url(self) -> str:
+        return self.origin_pool.url
+
+    @property
+    def segments(self) -> CompiledPlaylist:
+        """Segments of the primary playlist, replaced when its signature is refreshed."""
+        return self.origin_pool.primary
+
+    def _load_mirrors(self) -> None:
         """
-        Set up a signal handler for graceful interruption.
+        Fetch the playlists of the mirrors, keeping those with the same segments as the primary one.
         """
-        def interrupt_handler(signum, frame):
-            with self.interrupt_lock:
-                self.interrupt_count += 1
-                if self.interrupt_count >= MAX_INTERRUPT_COUNT:
-                    self.force_stop = True
-                    
-            if self.force_stop:
+        # Live windows of different servers don't line up, a recording uses the primary one only
+        if not self.live:
+            self.origin_pool.add_mirrors(self.mirror_urls)
+
+    def _fetch_playlist(self, playlist_url: str) -> CompiledPlaylist:
+        """
+        Download a media playlist and return its segments, indexing them gives the full URL.
+        """
+        client_params = {'headers': {'User-Agent': get_userAgent()}, 'timeout': MAX_TIMEOOUT}
+        response = httpx.get(playlist_url, **client_params, follow_redirects=True)
+        response.raise_for_status()
+
+        parser = M3U8_Parser()
+        parser.parse_data(uri=playlist_url, raw_content=response.text)
+        return parser.playlist
+
+    def handle_interrupt(self, quiet: bool = False) -> None:
+        """
+        Register a Ctrl+C: stop gracefully, or immediately after `MAX_INTERRUPT_COUNT` presses.
+
+        Parameters:
+            - quiet (bool): Don't print messages, used when another track already did.
+        """
+        with self.interrupt_lock:
+            self.interrupt_count += 1
+            if self.interrupt_count >= MAX_INTERRUPT_COUNT:
+                self.force_stop = True
+                
+        if self.force_stop:
+            if not quiet:
                 console.print("\n[red]Force stop triggered! Exiting immediately.")
 
-            else:
-                if not self.interrupt_flag.is_set():
-                    remaining = MAX_INTERRUPT_COUNT - self.interrupt_count
+        else:
+            if not self.interrupt_flag.is_set():
+                remaining = MAX_INTERRUPT_COUNT - self.interrupt_count
+                if not quiet:
                     console.print(f"\n[red]- Stopping gracefully... (Ctrl+C {remaining}x to force)")
-                    self.download_interrupted = True
+                self.download_interrupted = True
 
-                    if remaining == 1:
-                        self.interrupt_flag.set()
+                if remaining == 1:
+                    self.interrupt_flag.set()
 
+    def setup_interrupt_handler(self):
+        """
+        Set up a signal handler for graceful interruption.
+        """
+        def interrupt_handler(signum, frame):
+            self.handle_interrupt()
                     
         if threading.current_thread() is threading.main_thread():
             signal.signal(signal.SIGINT, interrupt_handler)
         else:
             print("Signal handler must be set in the main thread")
 
-    def _get_http_client(self):
-        client_params = {
+    def _use_http2(self, host: str) -> bool:
+        """
+        Check if HTTP/2 is enabled in config for the given host (exact match or subdomain).
+        """
+        host = host.split(':')[0]
+        enabled = any(host == h or host.endswith(f".{h}") for h in HTTP2_HOSTS if h)
+
+        if enabled and not http2_installed:
+            logging.warning(f"HTTP/2 requested for {host} but 'h2' is not installed, using HTTP/1.1")
+            return False
+        
+        return enabled
+
+    @staticmethod
+    def _mark_first_byte(response: httpx.Response) -> None:
+        """Response hook, httpx runs it once the headers arrived and before reading the body."""
+        response.extensions['first_byte_at'] = time.monotonic()
+
+    @staticmethod
+    async def _mark_first_byte_async(response: httpx.Response) -> None:
+        response.extensions['first_byte_at'] = time.monotonic()
+
+    def _get_client_params(self, host: str, pool_size: int) -> Dict:
+        """
+        Build the keyword arguments shared by the sync and async segment clients.
+        """
+        return {
             'headers': {'User-Agent': get_userAgent()},
             'timeout': SEGMENT_MAX_TIMEOUT,
             'follow_redirects': True,
-            'http2': False
+            'http2': self._use_http2(host),
+            'limits': httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            )
         }
-        return httpx.Client(**client_params)
-                            
-    def download_segment(self, ts_url: str, index: int, progress_bar: tqdm, backoff_factor: float = 1.1) -> None:
+
+    def _get_http_client(self, url: str) -> httpx.Client:
+        """
+        Return the keep-alive client for the host of `url`, shared by all workers of this stream.
+
+        Parameters:
+            - url (str): The URL that is going to be requested.
+        """
+        host = urlparse(url).netloc
+
+        with self.http_clients_lock:
+            client = self.http_clients.get(host)
+
+            if client is None:
+                client = httpx.Client(**self._get_client_params(host, CONNECTION_POOL_SIZE), event_hooks={'response': [self._mark_first_byte]})
+                self.http_clients[host] = client
+
+        return client
+
+    def _get_async_http_client(self, url: str) -> httpx.AsyncClient:
+        """
+        Return the async client for the host of `url`, pool is sized on the async concurrency.
+
+        Parameters:
+            - url (str): The URL that is going to be requested.
+        """
+        host = urlparse(url).netloc
+        client = self.async_http_clients.get(host)
+
+        if client is None:
+            client = httpx.AsyncClient(**self._get_client_params(host, ASYNC_MAX_CONCURRENCY), event_hooks={'response': [self._mark_first_byte_async]})
+            self.async_http_clients[host] = client
+
+        return client
+
+    def _close_http_clients(self) -> None:
+        """Close every pooled connection opened for this stream."""
+        with self.http_clients_lock:
+            for client in self.http_clients.values():
+                try:
+                    client.close()
+                except Exception as e:
+                    logging.error(f"Error closing http client: {str(e)}")
+
+            self.http_clients = {}
+
+    def _decrypt_segment(self, index: int, segment_content: bytes) -> Optional[bytes]:
+        """
+        Decrypt a downloaded segment if the playlist is encrypted.
+
+        Returns:
+            bytes: The clear content, None if decryption failed and the whole download has been stopped.
+        """
+        key_index = self.segments.key_index(index)
+        if key_index is None:
+            return segment_content
+
+        try:
+            return self._get_decryption(key_index).decrypt(segment_content, self.media_sequence + index)
+            
+        except Exception as e:
+            logging.error(f"Decryption failed for segment {index}: {str(e)}")
+            self.interrupt_flag.set()   # Interrupt the download process
+            self.stop_event.set()       # Trigger the stopping event for all threads
+            return None
+
+    def _process_segment(self, index: int, segment_content: bytes, progress_bar: tqdm, reserved: Optional[bool] = None) -> None:
+        """
+        Decrypt a downloaded segment and hand it over to the writer, run by the decryption stage if any.
+
+        Parameters:
+            - reserved (bool): Room already reserved in the reorder window (True) or refused (False, spill it), None to admit it here.
+        """
+        clear_content = self._decrypt_segment(index, segment_content)
+        if clear_content is None:
+            return
+
+        if reserved is None:
+            item = self._admit_segment(index, clear_content)
+        elif reserved:
+            self.reorder_window.shrink(len(segment_content) - len(clear_content))
+            item = clear_content
+        else:
+            item = self._spill_segment(index, clear_content) if not self.interrupt_flag.is_set() else None
+
+        if item is not None:
+            self._queue_segment(index, item, len(segment_content), progress_bar)
+
+    def _spill_segment(self, index: int, segment_content: bytes) -> str:
+        """
+        Park an out-of-order segment on disk while the reorder window is full.
+
+        Returns:
+            str: Path of the spilled segment, read back by the writer.
+        """
+        spill_folder = os.path.join(self.tmp_folder, "spill")
+        os.makedirs(spill_folder, exist_ok=True)
+
+        spill_path = os.path.join(spill_folder, f"{index}.ts")
+        with open(spill_path, 'wb') as f:
+            f.write(segment_content)
+
+        return spill_path
+
+    def _admit_segment(self, index: int, segment_content: bytes, block: bool = True) -> Union[bytes, str, None]:
         """
-        Downloads a TS segment and adds it to the segment queue with retry logic.
+        Reserve room for the segment in the reorder window, spilling it to disk when configured.
+
+        Parameters:
+            - index (int): The index of the segment.
+            - segment_content (bytes): The clear content of the segment.
+            - block (bool): Wait for room in the window (ignored when spilling is enabled), at most `ADMIT_TIMEOUT`.
+
+        Returns:
+            bytes | str | None: Content or spill path to queue, None if the window refused it.
+        """
+        block = block and not REORDER_SPILL
+        if self.reorder_window.reserve(index, len(segment_content), block, self.interrupt_flag, ADMIT_TIMEOUT):
+            return segment_content
+
+        # After a timed out wait spill anyway: the retry of the segment the writer needs may be waiting for this worker
+        if (REORDER_SPILL or block) and not self.interrupt_flag.is_set():
+            return self._spill_segment(index, segment_content)
+
+        return None
+
+    def _queue_segment(self, index: int, item: Union[bytes, str], content_size: int, progress_bar: tqdm) -> None:
+        """
+        Hand over an admitted segment (content or spill path) to the writer.
+        """
+        self.class_ts_estimator.update_progress_bar(content_size, progress_bar, self.segments.durations[index])
+        self.queue.put((index, item))
+        self.downloaded_segments.add(index)  
+        progress_bar.update(1)
+
+    def _acquire_slot(self) -> bool:
+        """
+        Wait for a slot of this stream and then of the budget shared with the other tracks.
+
+        Returns:
+            bool: False if the download was interrupted while waiting.
+        """
+        if not self.concurrency.acquire(self.interrupt_flag):
+            return False
+
+        if self.budget is not None and not self.budget.acquire(self.interrupt_flag):
+            self.concurrency.release()
+            return False
+
+        return True
+
+    def _release_slot(self) -> None:
+        """Give back the slots taken by `_acquire_slot`."""
+        if self.budget is not None:
+            self.budget.release()
+        self.concurrency.release()
+
+    async def _acquire_slot_async(self) -> bool:
+        """
+        Async version of `_acquire_slot`, the shared budget lives across event loops so it is polled.
+
+        Returns:
+            bool: False if the download was interrupted while waiting, no slot is held then.
+        """
+        if not await self.concurrency.acquire_async(self.interrupt_flag):
+            return False
+
+        if self.budget is not None:
+            while not self.budget.try_acquire():
+                if self.interrupt_flag.is_set():
+                    await self.concurrency.release_async()
+                    return False
+                await asyncio.sleep(0.02)
+
+        # Interrupted while the slot was being granted
+        if self.interrupt_flag.is_set():
+            await self._release_slot_async()
+            return False
+
+        return True
+
+    async def _sleep_async(self, seconds: float) -> None:
+        """Sleep between two attempts, waking up early on interrupt."""
+        deadline = time.monotonic() + seconds
+        while not self.interrupt_flag.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.1, deadline - time.monotonic()))
+
+    async def _release_slot_async(self) -> None:
+        """Give back the slots taken by `_acquire_slot_async`."""
+        if self.budget is not None:
+            self.budget.release()
+        await self.concurrency.release_async()
+
+    def _on_attempt_failed(self, ts_url: str, index: int, end: int, attempt: int, error: Exception, progress_bar: tqdm) -> Optional[float]:
+        """
+        Update retry statistics and the concurrency controller after a failed attempt, shared by both engines.
+        Segments given up on are queued as failed for the writer.
+
+        Parameters:
+            - end (int): Index after the last segment of a merged byte range request.
+
+        Returns:
+            float: Seconds before the next attempt, None if there is none.
+        """
+        # A hedge may have delivered the segments meanwhile
+        if self.retries.settled(index, end):
+            return None
+
+        logging.info(f"Attempt {attempt + 1} failed for segment {index} - '{ts_url}': {error}")
+        self.concurrency.on_failure(is_throttled(error))
+
+        failed_indexes = self.retries.on_failure(index, end, attempt)
+        if failed_indexes is None:
+            sleep_time = self.retries.backoff(attempt)
+            logging.info(f"Retrying segment {index} in {sleep_time} seconds...")
+            return sleep_time
+
+        for failed_index in failed_indexes:
+            console.log(f"[red]Final retry failed for segment: {failed_index}")
+            self.queue.put((failed_index, None))  # Marker for failed segment
+            progress_bar.update(1)
+        return None
+
+    def _plan_units(self, start: int) -> List[int]:
+        """
+        First segment of each request to send from `start`.
+        Adjacent byte ranges of the same resource are merged, up to `byterange_max_span_mb` per request.
+        """
+        self.unit_end = {}
+        total = len(self.segments)
+        max_span = BYTERANGE_MAX_SPAN_MB * 1024 * 1024
+        if max_span <= 0 or max(self.segments.range_lengths, default=-1) < 0:
+            return list(range(start, total))
+
+        leaders = []
+        index = start
+        while index < total:
+            leaders.append(index)
+            end = index + 1
+
+            byte_range = self.segments.byte_range(index)
+            if byte_range is not None:
+                span_start, next_offset = byte_range[0], byte_range[0] + byte_range[1]
+
+                while end < total and self.segments.paths[end] == self.segments.paths[index]:
+                    next_range = self.segments.byte_range(end)
+                    if next_range is None or next_range[0] != next_offset or next_offset + next_range[1] - span_start > max_span:
+                        break
+
+                    next_offset += next_range[1]
+                    end += 1
+
+            if end - index > 1:
+                self.unit_end[index] = end
+            index = end
+
+        if self.unit_end:
+            logging.info(f"Byte ranges merged: {len(leaders)} requests for {total - start} segments")
+        return leaders
+
+    def _range_headers(self, index: int, end: int) -> Optional[Dict[str, str]]:
+        """Range header covering the segments `index` to `end - 1`, None if they are whole files."""
+        first = self.segments.byte_range(index)
+        if first is None:
+            return None
+
+        last = self.segments.byte_range(end - 1)
+        return {'Range': f"bytes={first[0]}-{last[0] + last[1] - 1}"}
+
+    def _split_response(self, index: int, end: int, response: httpx.Response) -> List[Tuple[int, Union[bytes, memoryview]]]:
+        """
+        Cut the body of a (merged) request into its segments, as views of the body instead of copies.
+
+        Returns:
+            List[Tuple[int, bytes | memoryview]]: Index and content of each segment.
+        """
+        first = self.segments.byte_range(index)
+        if first is None:
+            return [(index, response.content)]
+
+        # A server ignoring the Range header answers 200 with the whole resource
+        content = memoryview(response.content)
+        base = first[0] if response.status_code == 206 else 0
+
+        parts = []
+        for sub_index in range(index, end):
+            offset, length = self.segments.byte_range(sub_index)
+            part = content[offset - base:offset - base + length] if end - index > 1 or base == 0 else content
+            if len(part) != length:
+                raise ValueError(f"Byte range of segment {sub_index} is {len(part)} bytes instead of {length}")
+            parts.append((sub_index, part))
+
+        return parts
+
+    def _deliver_segment(self, index: int, segment_content: bytes, progress_bar: tqdm) -> None:
+        """
+        Hand a downloaded segment over to the decryption stage or straight to the writer.
+        """
+        # The other request of a hedged pair already won
+        if not self.retries.claim(index):
+            return
+
+        if self.decrypt_stage is None:
+            self._process_segment(index, segment_content, progress_bar)
+
+        # Room is reserved here, so the decryption threads never wait for the writer; then the worker goes back to the network
+        elif self.reorder_window.reserve(index, len(segment_content), not REORDER_SPILL, self.interrupt_flag, ADMIT_TIMEOUT):
+            self.decrypt_stage.submit(self._process_segment, index, segment_content, progress_bar, True, cancel=self.interrupt_flag)
+        else:
+            self._process_segment(index, segment_content, progress_bar, False)
+
+    def download_segment(self, ts_url: str, index: int, progress_bar: tqdm, attempt: int = 0, hedge: bool = False) -> None:
+        """
+        Downloads a TS segment and adds it to the segment queue.
+        A failed attempt is handed back to the scheduler, retried after its backoff without holding the worker.
 
         Parameters:
             - ts_url (str): The URL of the TS segment.
             - index (int): The index of the segment.
             - progress_bar (tqdm): Progress counter for tracking download progress.
-            - backoff_factor (float): The backoff factor for exponential backoff (default is 1.5 seconds).
+            - attempt (int): Number of attempts already failed.
+            - hedge (bool): Duplicate of a late request, it is never retried.
         """
-        for attempt in range(REQUEST_MAX_RETRY):
-            if self.interrupt_flag.is_set():
+        # With merged byte ranges one request covers the segments `index` to `end - 1`
+        end = self.unit_end.get(index, index + 1)
+        if self.interrupt_flag.is_set() or self.retries.settled(index, end):
+            return
+        
+        if self.origin_pool.expiring():
+            self.origin_pool.refresh(self.origin_pool.generation)
+
+        # A hedge avoids the mirror the late request is waiting on
+        generation = self.origin_pool.generation
+        origin, ts_url = self.origin_pool.select(index, self.in_flight_origin.get(index) if hedge else None)
+
+        try:
+            if not self._acquire_slot():
                 return
-            
+
             try:
-                with self._get_http_client() as client:
-                    response = client.get(ts_url)
-        
-                    # Validate response and content
+                # The late request may have completed while the hedge waited for its slot
+                if hedge and self.retries.settled(index, end):
+                    return
+
+                start_time = time.monotonic()
+                if not hedge:
+                    self.in_flight[index] = start_time
+                    self.in_flight_origin[index] = origin
+
+                try:
+                    response = self._get_http_client(ts_url).get(ts_url, headers=self._range_headers(index, end))
                     response.raise_for_status()
-                    segment_content = response.content
-                    content_size = len(segment_content)
-
-                    # Decrypt if needed and verify decrypted content
-                    if self.decryption is not None:
-                        try:
-                            segment_content = self.decryption.decrypt(segment_content)
-                            
-                        except Exception as e:
-                            logging.error(f"Decryption failed for segment {index}: {str(e)}")
-                            self.interrupt_flag.set()   # Interrupt the download process
-                            self.stop_event.set()       # Trigger the stopping event for all threads
-                            break                       # Stop the current task immediately
-
-                    self.class_ts_estimator.update_progress_bar(content_size, progress_bar)
-                    self.queue.put((index, segment_content))
-                    self.downloaded_segments.add(index)  
-                    progress_bar.update(1)
+                except Exception as e:
+                    self._record_failure(index, origin, ts_url, start_time, attempt, e)
+                    raise
+
+                latency = self._record_success(index, origin, ts_url, start_time, attempt, response)
+                parts = self._split_response(index, end, response)
+                if not hedge:
+                    self.concurrency.on_success(latency, len(response.content))
+
+            finally:
+                if not hedge:
+                    self.in_flight.pop(index, None)
+                    self.in_flight_origin.pop(index, None)
+                self._release_slot()
+
+            for sub_index, segment_content in parts:
+                self._deliver_segment(sub_index, segment_content, progress_bar)
+
+        except Exception as e:
+            if hedge:
+                logging.info(f"Hedged request failed for segment {index}: {e}")
+                return
+
+            # Expired signature: retry on the new URLs without spending an attempt
+            if is_expired(e) and not self.retries.settled(index, end) and self.origin_pool.refresh(generation):
+                self.scheduler.submit(index, attempt)
+                return
+
+            sleep_time = self._on_attempt_failed(ts_url, index, end, attempt, e, progress_bar)
+            if sleep_time is not None:
+                self.scheduler.schedule(index, attempt + 1, sleep_time)
+
+    def _record_request(self, index: int, ts_url: str, start_time: float, attempt: int, response: Optional[httpx.Response] = None, error: Optional[Exception] = None) -> None:
+        """
+        Add a finished request to the telemetry of the stream.
+
+        Parameters:
+            - index (int): First segment of the request.
+            - start_time (float): `time.monotonic()` when the request was sent.
+            - attempt (int): Attempts already failed for the segment.
+            - response (httpx.Response): The successful response.
+            - error (Exception): The failure, an HTTP error still has a status and a time to first byte.
+        """
+        if self.metrics is None:
+            return
+
+        now = time.monotonic()
+        if response is None and isinstance(error, httpx.HTTPStatusError):
+            response = error.response
+
+        first_byte_at = response.extensions.get('first_byte_at') if response is not None else None
+        self.metrics.record(
+            index=index,
+            host=urlparse(ts_url).netloc,
+            size=len(response.content) if error is None else 0,
+            ttfb=first_byte_at - start_time if first_byte_at else None,
+            latency=now - start_time,
+            retries=attempt,
+            status=response.status_code if response is not None else 0
+        )
+
+    def _record_success(self, index: int, origin: int, ts_url: str, start_time: float, attempt: int, response: httpx.Response) -> float:
+        """
+        Feed a completed request to the telemetry, the hedging and the mirror statistics.
+
+        Returns:
+            float: Latency of the request in seconds.
+        """
+        latency = time.monotonic() - start_time
+        self._record_request(index, ts_url, start_time, attempt, response)
+
+        if self.hedger is not None:
+            self.hedger.record(latency)
+        self.origin_pool.on_success(origin, latency, len(response.content))
+        return latency
+
+    def _record_failure(self, index: int, origin: int, ts_url: str, start_time: float, attempt: int, error: Exception) -> None:
+        """Feed a failed request to the telemetry and the mirror statistics."""
+        self._record_request(index, ts_url, start_time, attempt, error=error)
+        self.origin_pool.on_failure(origin, error)
+
+    def _hedge_late_requests(self, stop: threading.Event) -> None:
+        """
+        Watch the requests in flight of the thread engine and queue a hedge for those slower than the p95 latency.
+        Hedges run on the scheduler workers and take a slot like any other request.
+        """
+        while not stop.wait(HEDGE_POLL):
+            threshold = self.hedger.threshold()
+            if threshold is None:
+                continue
+
+            now = time.monotonic()
+            for index, start_time in list(self.in_flight.items()):
+                if now - start_time <= threshold or index in self.hedged_segments:
+                    continue
+
+                if not self.hedger.allow():
+                    break
+
+                self.hedged_segments.add(index)
+                logging.info(f"Hedging segment {index} after {now - start_time:.2f}s (p95 {threshold:.2f}s)")
+                self.scheduler.submit(index, hedge=True)
+
+    async def _fetch_async(self, index: int, attempt: int, origin: int, ts_url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Request a segment from one origin, updating the mirror statistics and the telemetry."""
+        start_time = time.monotonic()
+
+        try:
+            response = await self._get_async_http_client(ts_url).get(ts_url, headers=headers)
+            response.raise_for_status()
+
+        except Exception as e:
+            self._record_failure(index, origin, ts_url, start_time, attempt, e)
+            raise
+
+        self._record_success(index, origin, ts_url, start_time, attempt, response)
+        return response
+
+    async def _fetch_hedged_async(self, index: int, attempt: int, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Fetch a segment, adding a second request if the first one is slower than the p95 latency.
+        The first successful response wins and the other request is cancelled.
+        """
+        origin, ts_url = self.origin_pool.select(index)
+        primary = asyncio.ensure_future(self._fetch_async(index, attempt, origin, ts_url, headers))
+        pending = {primary}
+
+        # Also cancels the requests of a task cancelled on interrupt
+        try:
+            threshold = self.hedger.threshold() if self.hedger is not None else None
+            if threshold is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done or not self.hedger.allow():
+                return await primary
+
+            logging.info(f"Hedging segment {index} after {threshold:.2f}s")
+            self.hedged_segments.add(index)
+            pending.add(asyncio.ensure_future(self._fetch_async(index, attempt, *self.origin_pool.select(index, exclude=origin), headers)))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+
+            # Both failed, report the first request
+            return primary.result()
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def download_segment_async(self, ts_url: str, index: int, progress_bar: tqdm) -> None:
+        """
+        Asyncio version of `download_segment`, a concurrency slot is held only while the request is in flight.
+
+        Parameters:
+            - ts_url (str): The URL of the TS segment.
+            - index (int): The index of the segment.
+            - progress_bar (tqdm): Progress counter for tracking download progress.
+        """
+        loop = asyncio.get_running_loop()
+        end = self.unit_end.get(index, index + 1)
+        attempt = 0
+
+        while not self.interrupt_flag.is_set() and not self.retries.settled(index, end):
+
+            # Refreshing fetches the new playlists, keep it off the event loop
+            if self.origin_pool.expiring():
+                await loop.run_in_executor(None, self.origin_pool.refresh, self.origin_pool.generation)
+            generation = self.origin_pool.generation
+
+            try:
+                if not await self._acquire_slot_async():
                     return
 
+                try:
+                    start_time = time.monotonic()
+                    response = await self._fetch_hedged_async(index, attempt, self._range_headers(index, end))
+                    parts = self._split_response(index, end, response)
+                    self.concurrency.on_success(time.monotonic() - start_time, len(response.content))
+
+                finally:
+                    await self._release_slot_async()
+
+                for sub_index, encrypted_content in parts:
+                    if not self.retries.claim(sub_index):
+                        continue
+
+                    if self.decrypt_stage is not None:
+                        segment_content = await loop.run_in_executor(self.decrypt_stage.pool, self._decrypt_segment, sub_index, encrypted_content)
+                    else:
+                        segment_content = self._decrypt_segment(sub_index, encrypted_content)
+                    if segment_content is None:
+                        return
+
+                    # Never block the event loop while the reorder window is full
+                    item = self._admit_segment(sub_index, segment_content, block=False)
+                    while item is None and not self.interrupt_flag.is_set():
+                        await asyncio.sleep(0.05)
+                        item = self._admit_segment(sub_index, segment_content, block=False)
+
+                    if item is not None:
+                        self._queue_segment(sub_index, item, len(encrypted_content), progress_bar)
+                return
+
             except Exception as e:
-                logging.info(f"Attempt {attempt + 1} failed for segment {index} - '{ts_url}': {e}")
-                
-                if attempt > self.info_maxRetry:
-                    self.info_maxRetry = ( attempt + 1 )
-                self.info_nRetry += 1
-
-                if attempt + 1 == REQUEST_MAX_RETRY:
-                    console.log(f"[red]Final retry failed for segment: {index}")
-                    self.queue.put((index, None))  # Marker for failed segment
-                    progress_bar.update(1)
-                    self.info_nFailed += 1
+                if is_expired(e) and not self.retries.settled(index, end) and await loop.run_in_executor(None, self.origin_pool.refresh, generation):
+                    continue
+
+                sleep_time = self._on_attempt_failed(ts_url, index, end, attempt, e, progress_bar)
+                if sleep_time is None:
                     return
-                
-                with self.active_retries_lock:
-                    self.active_retries += 1
-                
-                sleep_time = backoff_factor * (2 ** attempt)
-                logging.info(f"Retrying segment {index} in {sleep_time} seconds...")
-                time.sleep(sleep_time)
-                
-                with self.active_retries_lock:
-                    self.active_retries -= 1
+
+                await self._sleep_async(sleep_time)
+                attempt += 1
+
+    def _load_segment(self, item: Union[bytes, str, None]) -> Optional[bytes]:
+        """
+        Return the content of a buffered item and free its room in the reorder window.
+        """
+        if item is None:
+            return None
+
+        if isinstance(item, str):
+            with open(item, 'rb') as f:
+                segment_content = f.read()
+            os.remove(item)
+            return segment_content
+
+        self.reorder_window.release(len(item))
+        return item
+
+    def _expected_size(self) -> int:
+        """
+        Bytes expected in the data file, to preallocate it: exact for byte range playlists,
+        BANDWIDTH x duration of the variant otherwise, 0 when unknown (live, audio renditions, pipes).
+        """
+        if not PREALLOCATE_OUTPUT or self.streaming or self.live:
+            return 0
+
+        lengths = self.segments.range_lengths
+        if lengths and min(lengths) >= 0:
+            return sum(lengths)
+
+        if self.bandwidth:
+            return int(self.bandwidth / 8 * self.class_ts_estimator.total_duration)
+
+        return 0
+
+    def _on_segments_written(self, entries: List[Tuple[int, int, int]]) -> None:
+        """Count a batch written by the writer, and journal it unless it went to a pipe."""
+        if not self.streaming:
+            self.journal.record_many(entries)
+        self.written_segments.update(index for index, _, _ in entries)
+
+    def _is_fully_written(self, writer_thread: threading.Thread) -> bool:
+        """Every segment reached the data file, apart from the ones a live playlist dropped before they were fetched."""
+        return (
+            not self.interrupt_flag.is_set()
+            and not writer_thread.is_alive()
+            and not self.retries.failed_segments
+            and self.resume_index + len(self.written_segments) + len(self.skipped_segments) >= len(self.segments)
+        )
 
     def write_segments_to_file(self):
         """
-        Writes segments to file with additional verification.
+        Writes segments to file in order, out-of-order segments wait in the bounded reorder buffer.
+        Consecutive segments are gathered by the write-combining writer and written together.
         """
-        with open(self.tmp_file_path, 'wb') as f:
+        writer = SegmentWriter(self.tmp_file_path, self.resume_offset, WRITE_COMBINE_MB * 1024 * 1024, self._on_segments_written)
+        writer.open(self._expected_size())
+
+        try:
             while not self.stop_event.is_set() or not self.queue.empty():
                 if self.interrupt_flag.is_set():
                     break
                 
+                index = None
                 try:
-                    index, segment_content = self.queue.get(timeout=self.current_timeout)
+                    # A pending batch waits at most FLUSH_INTERVAL for the next segments
+                    if writer.is_due():
+                        writer.flush()
+
+                    index, item = self.queue.get(timeout=min(self.current_timeout, FLUSH_INTERVAL) if writer.pending else self.current_timeout)
 
                     # Successful queue retrieval: reduce timeout
                     self.current_timeout = max(self.base_timeout, self.current_timeout / 2)
 
-                    # Handle failed segments
-                    if segment_content is None:
-                        if index == self.expected_index:
-                            self.expected_index += 1
-                        continue
+                    # Failed segments (None) are buffered too, so they never stall the writer
+                    self.buffer[index] = item
+
+                    # Hand over any buffered segments that are now in order
+                    while self.expected_index in self.buffer:
+                        segment_content = self._load_segment(self.buffer.pop(self.expected_index))
+
+                        if segment_content is not None:
+                            writer.add(self.expected_index, segment_content)
 
-                    # Write segment if it's the next expected one
-                    if index == self.expected_index:
-                        f.write(segment_content)
-                        f.flush()
                         self.expected_index += 1
 
-                        # Write any buffered segments that are now in order
-                        while self.expected_index in self.buffer:
-                            next_segment = self.buffer.pop(self.expected_index)
+                    self.reorder_window.advance(self.expected_index)
 
-                            if next_segment is not None:
-                                f.write(next_segment)
-                                f.flush()
+                except BrokenPipeError:
+                    logging.error(f"Stream reader closed the pipe at segment {index}, stopping the download")
+                    self.interrupt_flag.set()
+                    break
 
-                            self.expected_index += 1
-                    
-                    else:
-                        self.buffer[index] = segment_content
+                except OSError as e:
+                    logging.error(f"Can't write segments to {self.tmp_file_path}: {str(e)}")
+                    self.interrupt_flag.set()
+                    break
 
                 except queue.Empty:
                     self.current_timeout = min(MAX_TIMEOOUT, self.current_timeout * 1.1)
@@ -319,6 +1043,14 @@ class M3U8_Segments:
 
                 except Exception as e:
                     logging.error(f"Error writing segment {index}: {str(e)}")
+
+        finally:
+            try:
+                writer.close()
+                logging.info(f"Wrote {writer.offset - self.resume_offset} bytes to {self.tmp_file_path} in {writer.writes} writes")
+
+            except OSError as e:
+                logging.error(f"Can't write segments to {self.tmp_file_path}: {str(e)}")
     
     def download_streams(self, description: str, type: str):
         """
@@ -334,10 +1066,17 @@ class M3U8_Segments:
           console.log("####")
           
         self.get_info()
-        self.setup_interrupt_handler()
+        self.metrics = SegmentMetrics(description, METRICS_FILE, self.metrics_registry)
+        if self.key_list:
+            self.decrypt_stage = DecryptionStage(DECRYPT_WORKERS, DECRYPT_BACKLOG)
+        if self.handle_signals:
+            self.setup_interrupt_handler()
+        self._prepare_resume()
 
         progress_bar = tqdm(
             total=len(self.segments), 
+            initial=self.resume_index,
+            position=self.progress_position,
             unit='s',
             ascii='░▒█',
             bar_format=self._get_bar_format(description),
@@ -351,57 +1090,270 @@ class M3U8_Segments:
             writer_thread.daemon = True
             writer_thread.start()
 
-            # Configure workers and delay
-            max_workers = self._get_worker_count(type)
-            
-            # Download segments with completion verification
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for index, segment_url in enumerate(self.segments):
+            if self.live and DOWNLOAD_MODE == "async":
+                logging.info("Live playlist, recording with the threaded engine")
 
-                    # Check for interrupt before submitting each task
-                    if self.interrupt_flag.is_set():
-                        break
+            if DOWNLOAD_MODE == "async" and not self.live:
+                self.concurrency = self._get_concurrency(type, ASYNC_MAX_CONCURRENCY)
+                asyncio.run(self._download_async(progress_bar))
+            else:
+                self.concurrency = self._get_concurrency(type, ADAPTIVE_MAX_WORKERS)
+                self._download_threaded(progress_bar, self.concurrency.max_limit)
 
-                    time.sleep(TQDM_DELAY_WORKER)
-                    futures.append(executor.submit(self.download_segment, segment_url, index, progress_bar))
+        finally:
+            fully_written = self._cleanup_resources(writer_thread, progress_bar)
 
-                # Wait for futures with interrupt handling
-                for future in as_completed(futures):
-                    if self.interrupt_flag.is_set():
-                        break
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logging.error(f"Error in download thread: {str(e)}")
-
-                # Interrupt handling for missing segments
-                if not self.interrupt_flag.is_set():
-                    total_segments = len(self.segments)
-                    completed_segments = len(self.downloaded_segments)
-                    
-                    if completed_segments < total_segments:
-                        missing_segments = set(range(total_segments)) - self.downloaded_segments
-                        logging.warning(f"Missing segments: {sorted(missing_segments)}")
-                        
-                        # Retry missing segments with interrupt check
-                        for index in missing_segments:
-                            if self.interrupt_flag.is_set():
-                                break
-
-                            try:
-                                self.download_segment(self.segments[index], index, progress_bar)
-                                
-                            except Exception as e:
-                                logging.error(f"Failed to retry segment {index}: {str(e)}")
+        if not self.interrupt_flag.is_set() and not self.live:
+            self._verify_download_completion(writer_thread, fully_written)
 
+        return self._generate_results(type)
+
+    def _prepare_resume(self) -> None:
+        """
+        Skip the segments already written by an interrupted run of the same playlist.
+        """
+        if self.streaming:
+            return
+
+        # Query strings hold expiring tokens, only paths identify the playlist
+        playlist_id = compute_sha1_hash("\n".join(urlparse(url).path for url in self.segments))
+
+        # The window of a live playlist has moved on since the previous run, record from its current edge
+        if self.live:
+            self.journal.open(playlist_id, 0)
+            return
+
+        self.resume_index, self.resume_offset = self.journal.load(playlist_id, self.tmp_file_path)
+        self.journal.open(playlist_id, self.resume_index)
+
+        if self.resume_index > 0:
+            console.print(f"[cyan]Resuming from segment [green]{self.resume_index}[cyan]/[green]{len(self.segments)}")
+            self.expected_index = self.resume_index
+            self.reorder_window.advance(self.resume_index)
+            self.downloaded_segments.update(range(self.resume_index))
+            self.class_ts_estimator.add_resumed(self.resume_offset, sum(self.segments.durations[:self.resume_index]), self.resume_index)
+
+    def _get_missing_segments(self) -> List[int]:
+        """Return the indexes never handed over to the writer, empty if interrupted."""
+        if self.interrupt_flag.is_set():
+            return []
+
+        total_segments = len(self.segments)
+        if len(self.downloaded_segments) >= total_segments:
+            return []
+
+        missing_segments = sorted(set(range(total_segments)) - self.downloaded_segments - self.skipped_segments)
+        if not missing_segments:
+            return []
+
+        logging.warning(f"Missing segments: {missing_segments}")
+        return missing_segments
+
+    def _download_threaded(self, progress_bar: tqdm, max_workers: int) -> None:
+        """
+        Download every segment with a pool of worker threads, retries wait in the scheduler.
+
+        Parameters:
+            - progress_bar (tqdm): Progress counter for tracking download progress.
+            - max_workers (int): Number of worker threads.
+        """
+        self.scheduler = SegmentScheduler(
+            target=lambda index, attempt, hedge: self.download_segment(self.segments[index], index, progress_bar, attempt, hedge=hedge),
+            workers=max_workers
+        )
+        self.scheduler.start()
+
+        stop_hedging = threading.Event()
+        hedge_thread = None
+        if self.hedger is not None:
+            hedge_thread = threading.Thread(target=self._hedge_late_requests, args=(stop_hedging,), daemon=True)
+            hedge_thread.start()
+
+        try:
+            for index in self._plan_units(self.resume_index):
+
+                # Check for interrupt before submitting each task
+                if self.interrupt_flag.is_set():
+                    break
+
+                time.sleep(TQDM_DELAY_WORKER)
+                self.scheduler.submit(index)
+
+            # New segments of a live playlist join the same pool until it ends
+            if self.live:
+                self._record_live(progress_bar)
+
+            # Retry missing segments concurrently with interrupt check
+            if self.scheduler.join(self.interrupt_flag):
+                if self.decrypt_stage is not None:
+                    self.decrypt_stage.drain(self.interrupt_flag)
+
+                # Missing segments are retried one by one
+                self.unit_end = {}
+                for index in self._get_missing_segments():
+                    self.scheduler.submit(index)
+                self.scheduler.join(self.interrupt_flag)
+
+        # Closing the scheduler waits for the hedges in flight, before the HTTP clients are closed
         finally:
-            self._cleanup_resources(writer_thread, progress_bar)
+            stop_hedging.set()
+            if hedge_thread is not None:
+                hedge_thread.join()
+            self.scheduler.close()
 
-        if not self.interrupt_flag.is_set():
-            self._verify_download_completion()
+    def _record_live(self, progress_bar: tqdm) -> None:
+        """
+        Re-poll a live or EVENT playlist about every target duration and submit the segments it adds,
+        until EXT-X-ENDLIST, `live_record_minutes` or Ctrl+C.
 
-        return self._generate_results(type)
+        Parameters:
+            - progress_bar (tqdm): Progress counter, its total grows with the playlist.
+        """
+        stop_at = time.monotonic() + LIVE_RECORD_MINUTES * 60 if LIVE_RECORD_MINUTES > 0 else None
+        target_duration = self.target_duration or 6
+        console.print(f"[cyan]Live playlist, recording {f'for {LIVE_RECORD_MINUTES} min' if stop_at else 'until it ends'}")
+
+        interval = target_duration
+        idle_polls = 0
+        while not self.interrupt_flag.wait(interval):
+            if stop_at is not None and time.monotonic() >= stop_at:
+                logging.info("Live recording: stop time reached")
+                break
+
+            try:
+                m3u8_parser = self._poll_playlist()
+            except Exception as e:
+                logging.warning(f"Live playlist poll failed: {e}")
+                m3u8_parser = None
+
+            added = self._append_live_segments(m3u8_parser, progress_bar) if m3u8_parser is not None else 0
+            if m3u8_parser is not None and m3u8_parser.is_endlist:
+                logging.info(f"Live recording: playlist ended after {len(self.segments)} segments")
+                break
+
+            # An unchanged playlist is polled again after half the target duration (RFC 8216, 6.3.4)
+            if added:
+                idle_polls = 0
+                interval = target_duration
+            else:
+                idle_polls += 1
+                interval = target_duration / 2
+
+                if idle_polls >= LIVE_IDLE_POLLS:
+                    logging.warning(f"Live recording: no new segments after {idle_polls} polls, stopping")
+                    break
+
+    def _poll_playlist(self) -> M3U8_Parser:
+        """Download and parse the current version of the live playlist."""
+        client_params = {'headers': {'User-Agent': get_userAgent()}, 'timeout': MAX_TIMEOOUT}
+        response = httpx.get(self.url, **client_params, follow_redirects=True)
+        response.raise_for_status()
+
+        m3u8_parser = M3U8_Parser()
+        m3u8_parser.parse_data(uri=self.url, raw_content=response.text)
+        return m3u8_parser
+
+    def _append_live_segments(self, m3u8_parser: M3U8_Parser, progress_bar: tqdm) -> int:
+        """
+        Append the segments of a polled playlist with a media sequence not seen yet and submit them.
+        Only `next_sequence` is kept to tell them apart, so memory doesn't grow with the polls.
+
+        Returns:
+            int: Number of new segments.
+        """
+        first_new = len(self.segments)
+        playlist = m3u8_parser.playlist
+
+        # The window slid past segments never listed to us: they are lost, the writer skips them
+        lost = 0
+        if m3u8_parser.media_sequence > self.next_sequence:
+            lost = m3u8_parser.media_sequence - self.next_sequence
+            logging.warning(f"Live recording: {lost} segments left the playlist before being fetched")
+
+            for _ in range(lost):
+                index = len(self.segments)
+                self.segments.append("")
+                self.skipped_segments.add(index)
+                self.retries.claim(index)
+                self.queue.put((index, None))
+            self.next_sequence = m3u8_parser.media_sequence
+
+        start = self.next_sequence - m3u8_parser.media_sequence
+        for position in range(start, len(playlist)):
+            key_index = playlist.key_index(position)
+            if key_index is not None:
+                key_info = m3u8_parser.key_list[key_index]
+                if key_info not in self.key_list:
+                    self.key_list.append(key_info)
+                key_index = self.key_list.index(key_info)
+
+            self.segments.append(playlist.paths[position], playlist.durations[position], playlist.byte_range(position), key_index)
+
+        added = max(0, len(playlist) - start)
+        self.next_sequence += added
+        if len(self.segments) == first_new:
+            return 0
+
+        self.expected_real_time_s += sum(self.segments.durations[first_new:])
+        self.class_ts_estimator.total_segments = len(self.segments)
+        self.class_ts_estimator.total_duration = self.expected_real_time_s
+        progress_bar.total = len(self.segments)
+        progress_bar.update(lost)
+        progress_bar.refresh()
+
+        for index in range(first_new, len(self.segments)):
+            if index not in self.skipped_segments:
+                self.scheduler.submit(index)
+
+        return added
+
+    async def _gather_interruptible(self, tasks: List[asyncio.Task]) -> List:
+        """
+        Wait for the download tasks, cancelling the ones still queued or in flight as soon as the download is interrupted.
+        """
+        gathered = asyncio.gather(*tasks, return_exceptions=True)
+        while not gathered.done():
+            if self.interrupt_flag.is_set():
+                for task in tasks:
+                    task.cancel()
+                break
+
+            await asyncio.wait([gathered], timeout=0.1)
+
+        return await gathered
+
+    async def _download_async(self, progress_bar: tqdm) -> None:
+        """
+        Download every segment as asyncio tasks, at most `async_max_concurrency` requests in flight.
+
+        Parameters:
+            - progress_bar (tqdm): Progress counter for tracking download progress.
+        """
+        self.async_http_clients = {}
+
+        try:
+            tasks = [
+                asyncio.ensure_future(self.download_segment_async(self.segments[index], index, progress_bar))
+                for index in self._plan_units(self.resume_index)
+            ]
+            for result in await self._gather_interruptible(tasks):
+                if isinstance(result, Exception):
+                    logging.error(f"Error in download task: {str(result)}")
+
+            # Retry missing segments one by one, with interrupt check
+            self.unit_end = {}
+            tasks = [
+                asyncio.ensure_future(self.download_segment_async(self.segments[index], index, progress_bar))
+                for index in self._get_missing_segments()
+            ]
+            for result in await self._gather_interruptible(tasks):
+                if isinstance(result, Exception):
+                    logging.error(f"Failed to retry segment: {str(result)}")
+
+        finally:
+            for client in self.async_http_clients.values():
+                await client.aclose()
+            self.async_http_clients = {}
     
     def _get_bar_format(self, description: str) -> str:
         """
@@ -411,7 +1363,7 @@ class M3U8_Segments:
             f"{Colors.YELLOW}[HLS] {Colors.WHITE}({Colors.CYAN}{description}{Colors.WHITE}): "
             f"{Colors.RED}{{percentage:.2f}}% "
             f"{Colors.MAGENTA}{{bar}} "
-            f"{Colors.YELLOW}{{elapsed}}{Colors.WHITE} < {Colors.CYAN}{{remaining}}{Colors.WHITE}{{postfix}}{Colors.WHITE}"
+            f"{Colors.YELLOW}{{elapsed}}{Colors.WHITE}{{postfix}}{Colors.WHITE}"
         )
     
     def _get_worker_count(self, stream_type: str) -> int:
@@ -424,43 +1376,92 @@ class M3U8_Segments:
         }.get(stream_type.lower(), 1)
 
         return base_workers
+
+    def _get_concurrency(self, stream_type: str, max_limit: int) -> AdaptiveConcurrency:
+        """
+        Build the concurrency controller, starting from the configured worker count.
+
+        Parameters:
+            - stream_type (str): Type of download: 'video' or 'audio'.
+            - max_limit (int): Upper bound reachable by the adaptive controller.
+        """
+        if not ADAPTIVE_WORKERS:
+            return AdaptiveConcurrency(max_limit, max_limit, adaptive=False)
+
+        return AdaptiveConcurrency(self._get_worker_count(stream_type), max_limit)
     
     def _generate_results(self, stream_type: str) -> Dict:
         """Package final download results."""
         return {
             'type': stream_type,
-            'nFailed': self.info_nFailed,
-            'stopped': self.download_interrupted
+            'nFailed': len(self.retries.failed_segments),
+            'stopped': self.download_interrupted,
+            'metrics': self.metrics.summary() if self.metrics is not None else None
         }
     
-    def _verify_download_completion(self) -> None:
-        """Validate final download integrity."""
-        total = len(self.segments)
-        if len(self.downloaded_segments) / total < 0.999:
-            missing = sorted(set(range(total)) - self.downloaded_segments)
-            raise RuntimeError(f"Download incomplete ({len(self.downloaded_segments)/total:.1%}). Missing segments: {missing}")
+    def _verify_download_completion(self, writer_thread: threading.Thread, fully_written: bool) -> None:
+        """
+        Validate final download integrity against the segments the writer reported, not the ones queued for it.
+        Only segments that failed for good may be missing, reported in `nFailed`, and at most 0.1% of them.
+        """
+        if fully_written:
+            return
+
+        if writer_thread.is_alive():
+            raise RuntimeError(f"Download incomplete: {self.tmp_file_path} is still being written")
+
+        total = len(self.segments) - len(self.skipped_segments)
+        missing = sorted(set(range(self.resume_index, len(self.segments))) - self.written_segments - self.skipped_segments)
+        lost = [index for index in missing if index not in self.retries.failed_segments]
+
+        if lost or (total - len(missing)) / total < 0.999:
+            raise RuntimeError(f"Download incomplete ({(total - len(missing)) / total:.1%}). Missing segments: {missing}")
         
-    def _cleanup_resources(self, writer_thread: threading.Thread, progress_bar: tqdm) -> None:
-        """Ensure resource cleanup and final reporting."""
+    def _cleanup_resources(self, writer_thread: threading.Thread, progress_bar: tqdm) -> bool:
+        """
+        Ensure resource cleanup and final reporting.
+
+        Returns:
+            bool: True if every segment reached the data file.
+        """
+        if self.decrypt_stage is not None:
+            self.decrypt_stage.close()
         self.stop_event.set()
-        writer_thread.join(timeout=30)
+
+        # A pipe drains only as fast as FFmpeg reads the other tracks
+        writer_thread.join(timeout=None if self.streaming else 30)
         progress_bar.close()
+        self._close_http_clients()
+        if self.hedger is not None:
+            logging.info(f"Hedged requests: {self.hedger.hedges} for {len(self.segments)} segments")
+        self.origin_pool.log_summary()
+        self.metrics.close()
+        self.metrics.log_summary()
+
+        # A failed segment leaves a hole, the next run must download it again instead of merging the file
+        fully_written = self._is_fully_written(writer_thread)
+        self.journal.close(complete=fully_written)
         
         #if self.download_interrupted:
         #    console.print("\n[red]Download terminated by user")
             
-        if self.info_nFailed > 0:
+        if self.retries.failed_segments:
             self._display_error_summary()
 
         self.buffer = {}
         self.expected_index = 0
+        shutil.rmtree(os.path.join(self.tmp_folder, "spill"), ignore_errors=True)
+        return fully_written
 
     def _display_error_summary(self) -> None:
         """Generate final error report."""
         console.print(f"\n[cyan]Retry Summary: "
-                     f"[white]Max retries: [green]{self.info_maxRetry} "
-                     f"[white]Total retries: [green]{self.info_nRetry} "
-                     f"[white]Failed segments: [red]{self.info_nFailed}")
+                     f"[white]Max retries: [green]{self.retries.max_attempts} "
+                     f"[white]Total retries: [green]{self.retries.retries} "
+                     f"[white]Failed segments: [red]{len(self.retries.failed_segments)}")
         
-        if self.info_nRetry > len(self.segments) * 0.3:
-            console.print("[yellow]Warning: High retry count detected. Consider reducing worker count in config.")
\ No newline at end of file
+        if self.retries.retries > len(self.segments) * 0.3:
+            if ADAPTIVE_WORKERS:
+                console.print(f"[yellow]Warning: High retry count detected, concurrency lowered to {self.concurrency.limit}.")
+            else:
+                console.print("[yellow]Warning: High retry count detected. Consider reducing worker count in config.")
\ No newline at end of file
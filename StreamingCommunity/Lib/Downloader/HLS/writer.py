@@ -0,0 +1,158 @@
+# 18.10.26
+
+import os
+import stat
+import time
+import logging
+from typing import Callable, List, Optional, Tuple, Union
+
+
+# Costant
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') and 'SC_IOV_MAX' in os.sysconf_names else 1024
+FLUSH_INTERVAL = 1.0            # Seconds a batch waits for the next segments before it is written anyway
+SYNC_INTERVAL = 5.0             # Seconds between two syncs of a preallocated file, its journal entries wait for them
+
+
+class SegmentWriter:
+    def __init__(self, path: str, offset: int = 0, combine_bytes: int = 0, on_written: Optional[Callable[[List[Tuple[int, int, int]]], None]] = None):
+        """
+        Write-combining writer of the ordered segments: consecutive segments are gathered and written
+        with one vectored write on the raw file descriptor, without copying them into a single buffer.
+
+        Parameters:
+            - path (str): Data file or pipe.
+            - offset (int): Byte where writing resumes, the file is truncated there (0 = new file).
+            - combine_bytes (int): Size of a batch before it is written, 0 writes every segment on its own.
+            - on_written (Callable): Called with `(index, offset, length)` of the segments written. For a preallocated
+              file only once they are synced to disk, since its size no longer tells the journal what was written.
+        """
+        self.path = path
+        self.offset = offset
+        self.combine_bytes = combine_bytes
+        self.on_written = on_written
+        self.fd = None
+        self.regular = False
+        self.preallocated = False
+
+        # Segments written to a preallocated file but not synced yet
+        self.unsynced: List[Tuple[int, int, int]] = []
+        self.last_sync = time.monotonic()
+
+        # Batch: bytes, bytearray or memoryview slices of a merged byte range response
+        self.pending: List[Tuple[int, Union[bytes, bytearray, memoryview]]] = []
+        self.pending_bytes = 0
+        self.batch_started = 0.0
+        self.writes = 0
+
+    def open(self, expected_size: int = 0) -> None:
+        """
+        Open the data file and reserve `expected_size` bytes on disk, so it does not grow one segment at a time.
+        Pipes are opened as they are.
+        """
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        self.fd = os.open(self.path, flags if self.offset else flags | os.O_TRUNC)
+        self.regular = stat.S_ISREG(os.fstat(self.fd).st_mode)
+
+        if not self.regular:
+            return
+
+        os.ftruncate(self.fd, self.offset)
+        os.lseek(self.fd, self.offset, os.SEEK_SET)
+
+        if expected_size > self.offset and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self.fd, self.offset, expected_size - self.offset)
+                self.preallocated = True
+            except OSError as e:
+                logging.info(f"Can't preallocate {self.path}: {e}")
+
+    def add(self, index: int, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Queue the next segment in order, the batch is written once it reaches `combine_bytes`."""
+        if not self.pending:
+            self.batch_started = time.monotonic()
+
+        self.pending.append((index, data))
+        self.pending_bytes += len(data)
+
+        if self.pending_bytes >= self.combine_bytes or len(self.pending) >= IOV_MAX:
+            self.flush()
+
+    def is_due(self) -> bool:
+        """A batch is written anyway after `FLUSH_INTERVAL`, so a slow stream still reaches the disk and the journal."""
+        return bool(self.pending) and time.monotonic() - self.batch_started >= FLUSH_INTERVAL
+
+    def flush(self) -> None:
+        """Write the pending batch, then report its segments to `on_written` (at the next sync for a preallocated file)."""
+        if not self.pending:
+            return
+
+        self._write_all([memoryview(data) for _, data in self.pending])
+
+        written = []
+        for index, data in self.pending:
+            written.append((index, self.offset, len(data)))
+            self.offset += len(data)
+
+        self.pending = []
+        self.pending_bytes = 0
+
+        if not self.preallocated:
+            self._report(written)
+            return
+
+        self.unsynced += written
+        if time.monotonic() - self.last_sync >= SYNC_INTERVAL:
+            self.sync()
+
+    def sync(self) -> None:
+        """Sync the data of a preallocated file, then report the segments now on disk."""
+        if not self.unsynced:
+            return
+
+        getattr(os, 'fdatasync', os.fsync)(self.fd)
+        self.last_sync = time.monotonic()
+
+        written, self.unsynced = self.unsynced, []
+        self._report(written)
+
+    def _report(self, written: List[Tuple[int, int, int]]) -> None:
+        if self.on_written is not None:
+            self.on_written(written)
+
+    def _write_all(self, views: List[memoryview]) -> None:
+        """Write every buffer, resuming after the short writes of pipes and signals."""
+        if not hasattr(os, 'writev'):
+            for view in views:
+                while view:
+                    view = view[os.write(self.fd, view):]
+                    self.writes += 1
+            return
+
+        first = 0
+        while first < len(views):
+            sent = os.writev(self.fd, views[first:first + IOV_MAX])
+            self.writes += 1
+
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent:
+                views[first] = views[first][sent:]
+
+    def close(self) -> None:
+        """
+        Write what is left and give back the preallocated space past the data.
+        A batch that failed is dropped with the rest of the file, the journal never listed it.
+        """
+        if self.fd is None:
+            return
+
+        try:
+            self.flush()
+            self.sync()
+
+        finally:
+            if self.regular:
+                os.ftruncate(self.fd, self.offset)
+            os.close(self.fd)
+            self.fd = None
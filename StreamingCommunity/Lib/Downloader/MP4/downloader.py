@@ -6,7 +6,10 @@ import sys
 import time
 import signal
 import logging
+import threading
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Callable, List
 
 
 # External libraries
@@ -27,6 +30,7 @@ from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance
 
 # Logic class
 from ...FFmpeg import print_duration_table
+from .sidecar import DownloadSidecar
 
 
 # Config
@@ -34,6 +38,11 @@ REQUEST_VERIFY = config_manager.get_bool('REQUESTS', 'verify')
 GET_ONLY_LINK = config_manager.get_bool('M3U8_PARSER', 'get_only_link')
 REQUEST_TIMEOUT = config_manager.get_float('REQUESTS', 'timeout')
 TELEGRAM_BOT = config_manager.get_bool('DEFAULT', 'telegram_bot')
+MAX_RETRY = config_manager.get_int('REQUESTS', 'max_retry')
+RANGE_CONNECTIONS = config_manager.get_int('MP4_DOWNLOAD', 'range_connections')
+MIN_RANGE_SIZE = config_manager.get_int('MP4_DOWNLOAD', 'min_range_size_mb') * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+CHECKPOINT_INTERVAL = 2
 
 
 # Variable
@@ -70,9 +79,166 @@ def signal_handler(signum, frame, interrupt_handler, original_handler):
         signal.signal(signum, original_handler)
 
 
+class RangeNotSupported(Exception):
+    """The server answered a range request with the whole file."""
+
+
+def split_ranges(total: int, parts: int) -> List[List[int]]:
+    """
+    Split `total` bytes in `parts` contiguous ranges.
+
+    Returns:
+        List[List[int]]: `[start, end, done]` for each range, `end` inclusive and `done` the bytes already written.
+    """
+    part_size = -(-total // parts)
+    return [[start, min(start + part_size, total) - 1, 0] for start in range(0, total, part_size)]
+
+
+def contiguous_size(ranges: List[List[int]]) -> int:
+    """Bytes written from the beginning of the file without gaps."""
+    size = 0
+    for start, end, done in ranges:
+        size = start + done
+        if start + done <= end:
+            break
+
+    return size
+
+
+def probe_size(response: httpx.Response) -> int:
+    """Size of the remote file from the answer to a `bytes=0-0` request, 206 with Content-Range or 200 with the whole file."""
+    if response.status_code == 206:
+        match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get('content-range', ''))
+        return int(match.group(1)) if match else 0
+
+    return int(response.headers.get('content-length', 0))
+
+
+def download_range(client: httpx.Client, url: str, headers: dict, temp_path: str, byte_range: List[int], bar: tqdm, interrupt_handler: InterruptHandler, lock: threading.Lock, stop: threading.Event) -> None:
+    """
+    Download one byte range into its position of the preallocated file, resuming from the last byte written.
+    Only attempts that make no progress count towards `max_retry`.
+
+    Parameters:
+        - byte_range (List[int]): `[start, end, done]`, `done` is updated while writing.
+        - lock (threading.Lock): Guards the progress of the ranges, read to report the partial state.
+        - stop (threading.Event): Set once another range failed for good, the download can't complete anymore.
+    """
+    start, end, _ = byte_range
+    failures = 0
+
+    while not interrupt_handler.force_quit and not stop.is_set():
+        offset = attempt_offset = start + byte_range[2]
+        if offset > end:
+            return
+
+        try:
+            range_headers = {**headers, 'Range': f"bytes={offset}-{end}"}
+            with client.stream("GET", url, headers=range_headers) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise RangeNotSupported(f"Status {response.status_code} for range {offset}-{end}")
+
+                # Unbuffered, so the checkpoint never counts bytes still waiting in a Python buffer
+                with open(temp_path, 'r+b', buffering=0) as file:
+                    file.seek(offset)
+
+                    # Chunks as they come from the socket, nothing received is lost on errors
+                    for chunk in response.iter_bytes():
+                        if interrupt_handler.force_quit or stop.is_set():
+                            return
+
+                        # Never write past the range if the server sends more
+                        if offset + len(chunk) > end + 1:
+                            chunk = chunk[:end + 1 - offset]
+
+                        # A raw write may take only part of the chunk
+                        view = memoryview(chunk)
+                        while view:
+                            size = file.write(view)
+                            view = view[size:]
+                            offset += size
+                            with lock:
+                                byte_range[2] += size
+                            bar.update(size)
+
+                        if offset > end:
+                            return
+
+            raise httpx.ReadError(f"Range {start}-{end} closed at byte {offset}")
+
+        except RangeNotSupported:
+            raise
+
+        except Exception as e:
+            failures = 1 if offset > attempt_offset else failures + 1
+            if failures > MAX_RETRY:
+                raise
+
+            logging.warning(f"Range {start}-{end} failed at byte {offset} (attempt {failures}): {e}")
+            stop.wait(min(2 ** failures * 0.25, 10))
+
+
+def download_ranges(client: httpx.Client, url: str, headers: dict, temp_path: str, ranges: List[List[int]], bar: tqdm, interrupt_handler: InterruptHandler, checkpoint: Callable[[], None] = None) -> None:
+    """
+    Fetch the ranges in parallel, one connection each, into `temp_path` already allocated at full size.
+    The first range failing for good stops the others, its error is raised once they have returned.
+
+    Parameters:
+        - checkpoint (Callable): Called every `CHECKPOINT_INTERVAL` seconds to record the progress.
+    """
+    lock = threading.Lock()
+    stop = threading.Event()
+    pending = [byte_range for byte_range in ranges if byte_range[0] + byte_range[2] <= byte_range[1]]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+        futures = [
+            executor.submit(download_range, client, url, headers, temp_path, byte_range, bar, interrupt_handler, lock, stop)
+            for byte_range in pending
+        ]
+
+        try:
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, timeout=CHECKPOINT_INTERVAL, return_when=FIRST_EXCEPTION)
+                if checkpoint is not None:
+                    checkpoint()
+
+                for future in done:
+                    future.result()
+
+        # Leaving the executor waits for the ranges still running, they return at their next chunk
+        except BaseException:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def download_single(response: httpx.Response, temp_path: str, bar: tqdm, interrupt_handler: InterruptHandler) -> None:
+    """
+    Stream the whole file over the response already open, for servers without range support.
+    """
+    with open(temp_path, 'wb') as file:
+        try:
+            for chunk in response.iter_bytes(chunk_size=CHUNK_SIZE):
+                if interrupt_handler.force_quit:
+                    console.print("\n[bold red]Force quitting... Saving partial download.[/bold red]")
+                    break
+
+                if chunk:
+                    bar.update(file.write(chunk))
+
+        except KeyboardInterrupt:
+            if not interrupt_handler.force_quit:
+                interrupt_handler.kill_download = True
+
+
 def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = None):
     """
     Downloads an MP4 video with enhanced interrupt handling.
+    If the server accepts byte ranges the file is fetched over `range_connections` parallel connections,
+    and an interrupted download resumes from the partial temp file while the remote file is unchanged.
     - Single Ctrl+C: Completes download gracefully
     - Triple Ctrl+C: Saves partial download and exits
     """
@@ -108,6 +274,9 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
 
     # Set interrupt handler
     temp_path = f"{path}.temp"
+    sidecar = DownloadSidecar(temp_path)
+    validator = None
+    ranges = None
     interrupt_handler = InterruptHandler()
     original_handler = signal.signal(signal.SIGINT, partial(signal_handler, interrupt_handler=interrupt_handler, original_handler=signal.getsignal(signal.SIGINT)))
 
@@ -115,15 +284,33 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
     try:
-        with httpx.Client() as client:
-            with client.stream("GET", url, headers=headers) as response:
+        limits = httpx.Limits(max_connections=max(1, RANGE_CONNECTIONS) + 1)
+        with httpx.Client(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+
+            # One byte tells the size and the range support, a server ignoring it answers with the whole file
+            with client.stream("GET", url, headers={**headers, 'Range': 'bytes=0-0'}) as response:
                 response.raise_for_status()
-                total = int(response.headers.get('content-length', 0))
+                total = probe_size(response)
+                accept_ranges = response.status_code == 206
+
+                # Read the single byte, so the connection goes back to the pool instead of being reset
+                if accept_ranges:
+                    response.read()
                 
                 if total == 0:
                     console.print("[bold red]No video stream found.[/bold red]")
                     return None, False
 
+                # Continue a previous run if the file on the server is the same
+                validator = DownloadSidecar.get_validator(response.headers, total)
+                if accept_ranges:
+                    ranges = sidecar.load(validator)
+
+                if ranges is not None:
+                    console.print(f"[cyan]Resuming from [green]{internet_manager.format_file_size(sum(r[2] for r in ranges))}")
+                else:
+                    sidecar.remove()
+
                 # Create a fancy progress bar
                 progress_bar = tqdm(
                     total=total,
@@ -136,29 +323,56 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
                     unit='iB',
                     unit_scale=True,
                     desc='Downloading',
+                    initial=sum(r[2] for r in ranges) if ranges else 0,
                     mininterval=0.05,
                     file=sys.stdout                         # Using file=sys.stdout to force in-place updates because sys.stderr may not support carriage returns in this environment.  
                 )
 
-                downloaded = 0
-                with open(temp_path, 'wb') as file, progress_bar as bar:
+                # Without range support the answer to the probe is the download
+                if not accept_ranges:
+                    with progress_bar as bar:
+                        download_single(response, temp_path, bar, interrupt_handler)
+
+            if accept_ranges:
+                with progress_bar as bar:
                     try:
-                        for chunk in response.iter_bytes(chunk_size=1024):
-                            if interrupt_handler.force_quit:
-                                console.print("\n[bold red]Force quitting... Saving partial download.[/bold red]")
-                                break
-                            
-                            if chunk:
-                                size = file.write(chunk)
-                                downloaded += size
-                                bar.update(size)
+                        if ranges is None:
+                            parts = RANGE_CONNECTIONS if total >= MIN_RANGE_SIZE else 1
+                            ranges = split_ranges(total, max(1, parts))
+
+                            # Preallocate, each range writes at its own offset
+                            with open(temp_path, 'wb') as file:
+                                file.truncate(total)
+
+                        # The server sends the whole file (200) if it changed meanwhile
+                        range_headers = dict(headers)
+                        if DownloadSidecar.if_range(validator):
+                            range_headers['If-Range'] = DownloadSidecar.if_range(validator)
+
+                        checkpoint = partial(sidecar.save, validator, ranges)
+                        download_ranges(client, url, range_headers, temp_path, ranges, bar, interrupt_handler, checkpoint)
+
+                        # Partial download: keep only the data without holes
+                        if interrupt_handler.force_quit:
+                            with open(temp_path, 'r+b') as file:
+                                file.truncate(contiguous_size(ranges))
+
+                    except RangeNotSupported as e:
+                        logging.warning(f"Range requests refused, downloading with a single connection: {e}")
+                        ranges = None
+                        sidecar.remove()
+                        bar.reset()
+                        with client.stream("GET", url, headers=headers) as response:
+                            response.raise_for_status()
+                            download_single(response, temp_path, bar, interrupt_handler)
 
                     except KeyboardInterrupt:
                         if not interrupt_handler.force_quit:
                             interrupt_handler.kill_download = True
-                    
+
         if os.path.exists(temp_path):
             os.rename(temp_path, path)
+            sidecar.remove()
 
         if os.path.exists(path):
             console.print(Panel(
@@ -183,8 +397,16 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
         console.print(f"[bold red]Unexpected Error: {e}[/bold red]")
-        if os.path.exists(temp_path):
+
+        # Keep what has been written if the next run can verify the remote file
+        if ranges is not None and validator is not None and DownloadSidecar.can_resume(validator):
+            sidecar.save(validator, ranges)
+            console.print("[yellow]Partial download kept, it will resume on the next run.")
+
+        elif os.path.exists(temp_path):
             os.remove(temp_path)
+            sidecar.remove()
+
         return None, interrupt_handler.kill_download
     
     finally:
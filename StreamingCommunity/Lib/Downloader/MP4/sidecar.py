@@ -0,0 +1,109 @@
+# 18.10.26
+
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+
+
+class DownloadSidecar:
+    def __init__(self, temp_path: str):
+        """
+        State of a partial MP4 download kept next to its temp file: validator of the remote file and bytes written per range.
+
+        Parameters:
+            - temp_path (str): Path of the partial download.
+        """
+        self.temp_path = temp_path
+        self.path = f"{temp_path}.json"
+
+    @staticmethod
+    def get_validator(headers, total: int) -> Dict:
+        """
+        Identify the version of the remote file from the response headers.
+
+        Parameters:
+            - total (int): Size of the whole file, the response may cover only part of it.
+
+        Returns:
+            Dict: 'etag', 'last_modified' and 'total' of the file.
+        """
+        return {
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'total': total
+        }
+
+    @staticmethod
+    def can_resume(validator: Dict) -> bool:
+        """Without ETag or Last-Modified a changed file can't be detected."""
+        return bool(validator.get('etag') or validator.get('last_modified'))
+
+    @staticmethod
+    def if_range(validator: Dict) -> Optional[str]:
+        """Value for the If-Range header, weak ETags are not allowed there."""
+        etag = validator.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+
+        return validator.get('last_modified')
+
+    def load(self, validator: Dict) -> Optional[List[List[int]]]:
+        """
+        Read the ranges of a previous run of the same file.
+
+        Parameters:
+            - validator (Dict): Validator of the file on the server now.
+
+        Returns:
+            Optional[List[List[int]]]: `[start, end, done]` per range, None if there is nothing to resume.
+        """
+        if not self.can_resume(validator) or not os.path.exists(self.path) or not os.path.exists(self.temp_path):
+            return None
+
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+
+        except (OSError, ValueError) as e:
+            logging.error(f"Invalid sidecar {self.path}, starting from scratch: {e}")
+            return None
+
+        if state.get('validator') != validator:
+            logging.info(f"Remote file changed since the partial download: {state.get('validator')} -> {validator}")
+            return None
+
+        ranges = state.get('ranges')
+        if not ranges or os.path.getsize(self.temp_path) != validator['total']:
+            return None
+
+        return [[int(start), int(end), int(done)] for start, end, done in ranges]
+
+    def save(self, validator: Dict, ranges: List[List[int]]) -> None:
+        """
+        Record the progress, replacing the previous state atomically.
+
+        Parameters:
+            - validator (Dict): Validator of the file being downloaded.
+            - ranges (List[List[int]]): `[start, end, done]` per range.
+        """
+        if not self.can_resume(validator):
+            return
+
+        state = {
+            'validator': validator,
+            'ranges': [list(byte_range) for byte_range in ranges]
+        }
+
+        try:
+            with open(f"{self.path}.tmp", 'w') as f:
+                json.dump(state, f)
+            os.replace(f"{self.path}.tmp", self.path)
+
+        except OSError as e:
+            logging.error(f"Can't write sidecar {self.path}: {e}")
+
+    def remove(self) -> None:
+        """Delete the state, the download is complete or can't be resumed."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
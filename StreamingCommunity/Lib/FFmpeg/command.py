@@ -91,31 +91,10 @@ def select_subtitle_encoder() -> Optional[str]:
     return None
 
 
-def join_video(video_path: str, out_path: str, codec: M3U8_Codec = None):
+def _add_codec_params(ffmpeg_cmd: List[str], codec: M3U8_Codec, description: str) -> None:
     """
-    Joins single ts video file to mp4
-    
-    Parameters:
-        - video_path (str): The path to the video file.
-        - out_path (str): The path to save the output file.
-        - codec (M3U8_Codec): The video codec to use. Defaults to 'copy'.
+    Appends the video and audio output parameters, stream copy unless `use_codec` is enabled.
     """
-    ffmpeg_cmd = [get_ffmpeg_path()]
-
-    # Enabled the use of gpu
-    if USE_GPU:
-        ffmpeg_cmd.extend(['-hwaccel', 'cuda'])
-
-    # Add mpegts to force to detect input file as ts file
-    if need_to_force_to_ts(video_path):
-        #console.log("[red]Force input file to 'mpegts'.")
-        ffmpeg_cmd.extend(['-f', 'mpegts'])
-        vcodec = "libx264"
-
-    # Insert input video path
-    ffmpeg_cmd.extend(['-i', video_path])
-
-    # Add output Parameters
     if USE_CODEC and codec != None:
         if USE_VCODEC:
             if codec.video_codec_name: 
@@ -124,17 +103,16 @@ def join_video(video_path: str, out_path: str, codec: M3U8_Codec = None):
                 else: 
                     ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
             else: 
-                console.log("[red]Cant find vcodec for 'join_audios'")
+                console.log(f"[red]Cant find vcodec for '{description}'")
         else:
             if USE_GPU:
                 ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
 
-
         if USE_ACODEC:
             if codec.audio_codec_name: 
                 ffmpeg_cmd.extend(['-c:a', codec.audio_codec_name])
             else: 
-                console.log("[red]Cant find acodec for 'join_audios'")
+                console.log(f"[red]Cant find acodec for '{description}'")
 
         if USE_BITRATE:
             ffmpeg_cmd.extend(['-b:v',  f'{codec.video_bitrate // 1000}k'])
@@ -149,6 +127,34 @@ def join_video(video_path: str, out_path: str, codec: M3U8_Codec = None):
     else:
         ffmpeg_cmd.extend(['-preset', 'fast'])
 
+
+def join_video(video_path: str, out_path: str, codec: M3U8_Codec = None):
+    """
+    Joins single ts video file to mp4
+    
+    Parameters:
+        - video_path (str): The path to the video file.
+        - out_path (str): The path to save the output file.
+        - codec (M3U8_Codec): The video codec to use. Defaults to 'copy'.
+    """
+    ffmpeg_cmd = [get_ffmpeg_path()]
+
+    # Enabled the use of gpu
+    if USE_GPU:
+        ffmpeg_cmd.extend(['-hwaccel', 'cuda'])
+
+    # Add mpegts to force to detect input file as ts file
+    if need_to_force_to_ts(video_path):
+        #console.log("[red]Force input file to 'mpegts'.")
+        ffmpeg_cmd.extend(['-f', 'mpegts'])
+        vcodec = "libx264"
+
+    # Insert input video path
+    ffmpeg_cmd.extend(['-i', video_path])
+
+    # Add output Parameters
+    _add_codec_params(ffmpeg_cmd, codec, 'join_video')
+
     # Overwrite
     ffmpeg_cmd += [out_path, "-y"]
 
@@ -208,37 +214,7 @@ def join_audios(video_path: str, audio_tracks: List[Dict[str, str]], out_path: s
         ffmpeg_cmd.append(f'{i}:a')     # Map audio streams from subsequent inputs
 
     # Add output Parameters
-    if USE_CODEC:
-        if USE_VCODEC:
-            if codec.video_codec_name: 
-                if not USE_GPU: 
-                    ffmpeg_cmd.extend(['-c:v', codec.video_codec_name])
-                else: 
-                    ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
-            else: 
-                console.log("[red]Cant find vcodec for 'join_audios'")
-        else:
-            if USE_GPU:
-                ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
-
-        if USE_ACODEC:
-            if codec.audio_codec_name: 
-                ffmpeg_cmd.extend(['-c:a', codec.audio_codec_name])
-            else: 
-                console.log("[red]Cant find acodec for 'join_audios'")
-
-        if USE_BITRATE:
-            ffmpeg_cmd.extend(['-b:v',  f'{codec.video_bitrate // 1000}k'])
-            ffmpeg_cmd.extend(['-b:a',  f'{codec.audio_bitrate // 1000}k'])
-
-    else:
-        ffmpeg_cmd.extend(['-c', 'copy'])
-
-    # Ultrafast preset always or fast for gpu
-    if not USE_GPU:
-        ffmpeg_cmd.extend(['-preset', FFMPEG_DEFAULT_PRESET])
-    else:
-        ffmpeg_cmd.extend(['-preset', 'fast'])
+    _add_codec_params(ffmpeg_cmd, codec, 'join_audios')
 
     # Use shortest input path for video and audios
     if not video_audio_same_duration:
@@ -318,4 +294,143 @@ def join_subtitle(video_path: str, subtitles_list: List[Dict[str, str]], out_pat
                 capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join subtitle")
                 print()
 
-    return out_path
\ No newline at end of file
+    return out_path
+
+
+def _existing_inputs(tracks: List[Dict[str, str]], kind: str) -> List[Dict[str, str]]:
+    """Drop the tracks whose file is missing, so the stream indexes of the maps stay right."""
+    existing = []
+    for track in tracks:
+        if os_manager.check_file(track.get('path')):
+            existing.append(track)
+        else:
+            logging.error(f"Skip {kind} join: {track.get('path')} doesn't exist")
+
+    return existing
+
+
+def build_merge_command(video_path: str, audio_tracks: List[Dict[str, str]], subtitles_list: List[Dict[str, str]], out_path: str, codec: M3U8_Codec = None, remux_only: bool = False) -> List[str]:
+    """
+    Builds one FFmpeg command mapping the video, every audio track and every subtitle into the output.
+    
+    Parameters:
+        - video_path (str): The path to the video file.
+        - audio_tracks (list[dict[str, str]]): Audio inputs, each dictionary should contain the 'path' key.
+        - subtitles_list (list[dict[str, str]]): Subtitle inputs, each dictionary should contain the 'path' and 'language' keys.
+        - out_path (str): The path to save the output file.
+        - codec (M3U8_Codec): The codec to use if `use_codec` is enabled.
+        - remux_only (bool): Only copy the streams, for inputs that can't be probed in advance (pipes).
+
+    Returns:
+        List[str]: The FFmpeg command.
+    """
+    if not remux_only:
+        audio_tracks = _existing_inputs(audio_tracks, "audio")
+        subtitles_list = _existing_inputs(subtitles_list, "subtitle")
+
+    ffmpeg_cmd = [get_ffmpeg_path()]
+
+    # Enabled the use of gpu
+    if USE_GPU and not remux_only:
+        ffmpeg_cmd.extend(['-hwaccel', 'cuda'])
+
+    # Inputs: video, audio tracks, subtitles
+    ffmpeg_cmd.extend(['-i', video_path])
+
+    for audio_track in audio_tracks:
+        ffmpeg_cmd.extend(['-i', audio_track['path']])
+
+    for subtitle in subtitles_list:
+        ffmpeg_cmd.extend(['-i', subtitle['path']])
+
+    # Audio of the video input is kept only if there are no separate tracks
+    ffmpeg_cmd.extend(['-map', '0:v'])
+    if audio_tracks:
+        for i in range(1, len(audio_tracks) + 1):
+            ffmpeg_cmd.extend(['-map', f'{i}:a'])
+    else:
+        ffmpeg_cmd.extend(['-map', '0:a?'])
+
+    for idx, subtitle in enumerate(subtitles_list):
+        ffmpeg_cmd.extend(['-map', f"{len(audio_tracks) + idx + 1}:s"])
+        ffmpeg_cmd.extend([f"-metadata:s:s:{idx}", f"title={subtitle['language']}"])
+
+    # Add output Parameters
+    if remux_only:
+        ffmpeg_cmd.extend(['-c', 'copy'])
+    else:
+        _add_codec_params(ffmpeg_cmd, codec, 'join_all')
+
+    if subtitles_list:
+        ffmpeg_cmd.extend(['-c:s', select_subtitle_encoder()])
+
+    # Use shortest input path for video and audios
+    if audio_tracks and not remux_only:
+        video_audio_same_duration, duration_diff = check_duration_v_a(video_path, audio_tracks[0].get('path'))
+        if not video_audio_same_duration:
+            console.log(f"[red]Use shortest input (Duration difference: {duration_diff:.2f} seconds)...")
+            ffmpeg_cmd.extend(['-shortest', '-strict', 'experimental'])
+
+    # Overwrite
+    ffmpeg_cmd += [out_path, "-y"]
+    logging.info(f"FFmpeg command: {ffmpeg_cmd}")
+    return ffmpeg_cmd
+
+
+def join_all(video_path: str, audio_tracks: List[Dict[str, str]], subtitles_list: List[Dict[str, str]], out_path: str, codec: M3U8_Codec = None):
+    """
+    Joins audio tracks and subtitles with a video file in a single FFmpeg pass.
+    
+    Parameters:
+        - video_path (str): The path to the video file.
+        - audio_tracks (list[dict[str, str]]): A list of dictionaries containing the 'path' key of each audio file.
+        - subtitles_list (list[dict[str, str]]): A list of dictionaries containing the 'path' and 'language' keys of each subtitle.
+        - out_path (str): The path to save the output file.
+        - codec (M3U8_Codec): The codec to use if `use_codec` is enabled.
+    """
+    ffmpeg_cmd = build_merge_command(video_path, audio_tracks, subtitles_list, out_path, codec)
+
+    # Run join
+    if DEBUG_MODE:
+        subprocess.run(ffmpeg_cmd, check=True)
+
+    else:
+        if get_use_large_bar():
+            capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join all")
+            print()
+
+        else:
+            console.log(f"[purple]FFmpeg [white][[cyan]Join all[white]] ...")
+            with suppress_output():
+                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join all")
+                print()
+
+    return out_path
+
+
+def start_stream_remux(video_path: str, audio_tracks: List[Dict[str, str]], subtitles_list: List[Dict[str, str]], out_path: str, log_path: str) -> subprocess.Popen:
+    """
+    Starts FFmpeg remuxing inputs that are still being written (named pipes) straight into the final file.
+    
+    Parameters:
+        - video_path (str): The path of the video input.
+        - audio_tracks (list[dict[str, str]]): Audio inputs, each dictionary should contain the 'path' key.
+        - subtitles_list (list[dict[str, str]]): Subtitle files, each dictionary should contain the 'path' and 'language' keys.
+        - out_path (str): The path to save the output file.
+        - log_path (str): File receiving the FFmpeg log.
+
+    Returns:
+        subprocess.Popen: The running FFmpeg process, it exits once every pipe has been closed by its writer.
+    """
+    ffmpeg_cmd = build_merge_command(video_path, audio_tracks, subtitles_list, out_path, remux_only=True)
+    ffmpeg_cmd[1:1] = ['-loglevel', DEBUG_FFMPEG]
+
+    # Own session, Ctrl+C is handled by the downloader that closes the pipes
+    with open(log_path, 'wb') as log_file:
+        return subprocess.Popen(
+            ffmpeg_cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=log_file,
+            start_new_session=True
+        )
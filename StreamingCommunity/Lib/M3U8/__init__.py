@@ -3,4 +3,5 @@
 from .decryptor import M3U8_Decryption
 from .estimator import M3U8_Ts_Estimator
 from .parser import M3U8_Parser, M3U8_Codec
-from .url_fixer import M3U8_UrlFix
\ No newline at end of file
+from .url_fixer import M3U8_UrlFix
+from .playlist import CompiledPlaylist
\ No newline at end of file
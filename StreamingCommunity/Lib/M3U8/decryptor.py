@@ -1,7 +1,6 @@
 # 03.04.24
 
 import sys
-import time
 import logging
 import importlib.util
 
@@ -21,13 +20,13 @@ if not crypto_installed:
 
 logging.info("[cyan]Decrypy use: Cryptodomex")
 from Cryptodome.Cipher import AES
-from Cryptodome.Util.Padding import unpad
 
 
 
 class M3U8_Decryption:
     """
     Class for decrypting M3U8 playlist content using AES with pycryptodomex.
+    A new cipher is built for each segment, so the same object can be used by many threads.
     """
     def __init__(self, key: bytes, iv: bytes, method: str) -> None:
         """
@@ -35,57 +34,58 @@ class M3U8_Decryption:
 
         Parameters:
             key (bytes): The encryption key.
-            iv (bytes): The initialization vector (IV).
+            iv (bytes): The initialization vector (IV), None to derive it from the media sequence number.
             method (str): The encryption method.
         """
         self.key = key
         self.iv = iv
         if "0x" in str(iv):
-            self.iv = bytes.fromhex(iv.replace("0x", ""))
+            self.iv = bytes.fromhex(iv.replace("0x", "").zfill(32))
         self.method = method
 
-        # Pre-create the cipher based on the encryption method
+        if self.method not in {"AES", "AES-128", "AES-128-CTR"}:
+            raise ValueError("Invalid or unsupported method")
+
+    def get_iv(self, sequence: int) -> bytes:
+        """
+        IV of a segment: the one of the playlist, or its media sequence number as a 128-bit big-endian integer.
+
+        Parameters:
+            sequence (int): Media sequence number of the segment.
+        """
+        if self.iv is not None:
+            return self.iv
+
+        return sequence.to_bytes(16, "big")
+
+    def _new_cipher(self, sequence: int):
         if self.method == "AES":
-            self.cipher = AES.new(self.key, AES.MODE_ECB)
+            return AES.new(self.key, AES.MODE_ECB)
         elif self.method == "AES-128":
-            self.cipher = AES.new(self.key[:16], AES.MODE_CBC, iv=self.iv)
-        elif self.method == "AES-128-CTR":
-            self.cipher = AES.new(self.key[:16], AES.MODE_CTR, nonce=self.iv)
+            return AES.new(self.key[:16], AES.MODE_CBC, iv=self.get_iv(sequence))
         else:
-            raise ValueError("Invalid or unsupported method")
+            return AES.new(self.key[:16], AES.MODE_CTR, nonce=b"", initial_value=self.get_iv(sequence))
 
-    def decrypt(self, ciphertext: bytes) -> bytes:
+    def decrypt(self, ciphertext: bytes, sequence: int = 0) -> bytearray:
         """
         Decrypt the ciphertext using the specified encryption method.
 
         Parameters:
             ciphertext (bytes): The encrypted content to decrypt.
+            sequence (int): Media sequence number of the segment.
 
         Returns:
-            bytes: The decrypted content.
+            bytearray: The decrypted content, written in a buffer allocated once and trimmed in place.
         """
-        #start = time.perf_counter_ns()
+        decrypted_content = bytearray(len(ciphertext))
+        self._new_cipher(sequence).decrypt(ciphertext, output=decrypted_content)
 
         if self.method in {"AES", "AES-128"}:
-            decrypted_data = self.cipher.decrypt(ciphertext)
-            decrypted_content = unpad(decrypted_data, AES.block_size)
-        elif self.method == "AES-128-CTR":
-            decrypted_content = self.cipher.decrypt(ciphertext)
-        else:
-            raise ValueError("Invalid or unsupported method")
 
-        """
-        end = time.perf_counter_ns()
-
-        # Calculate the elapsed time with high precision
-        elapsed_nanoseconds = end - start
-        elapsed_milliseconds = elapsed_nanoseconds / 1_000_000
-        elapsed_seconds = elapsed_nanoseconds / 1_000_000_000
-
-        # Log performance metrics
-        logging.info("[Crypto Decryption Performance]")
-        logging.info(f"Method: {self.method}")
-        logging.info(f"Decryption Time: {elapsed_milliseconds:.4f} ms ({elapsed_seconds:.6f} s)")
-        logging.info(f"Decrypted Content Length: {len(decrypted_content)} bytes")
-        """
-        return decrypted_content
\ No newline at end of file
+            # PKCS#7, same checks as Cryptodome unpad without copying the segment
+            padding = decrypted_content[-1] if decrypted_content else 0
+            if not 1 <= padding <= AES.block_size or decrypted_content[-padding:] != bytes([padding]) * padding:
+                raise ValueError("Padding is incorrect.")
+            del decrypted_content[-padding:]
+
+        return decrypted_content
@@ -2,11 +2,14 @@
 
 import re
 import logging
+from array import array
+from typing import Dict, Optional, Tuple
 
 
 # Internal utilities
 from m3u8 import loads
 from StreamingCommunity.Util.os import internet_manager
+from .playlist import CompiledPlaylist
 
 
 # Costant
@@ -34,6 +37,8 @@ CODEC_MAPPINGS = {
     }
 }
     
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
 RESOLUTIONS = [
     (7680, 4320),  # 8K
     (3840, 2160),  # 4K
@@ -384,6 +389,8 @@ class M3U8_Parser:
         self.segments = []
         self.video_playlist = []
         self.keys = None
+        self.key_list = []
+        self.playlist: CompiledPlaylist = CompiledPlaylist("")
         self.subtitle_playlist = []
         self.subtitle = []
         self.audio_playlist = []
@@ -392,23 +399,183 @@ class M3U8_Parser:
         self._audio: M3U8_Audio = None
         self._subtitle: M3U8_Subtitle = None
         self.duration: float = 0
+        self.media_sequence: int = 0
+        self.target_duration: float = 0
+        self.is_endlist: bool = False
+        self.playlist_type: str = ""
 
         self.__create_variable__()
 
     def parse_data(self, uri, raw_content) -> None:
         """
-        Extracts all information present in the provided M3U8 content.
+        Extracts all information present in the provided M3U8 content, reading its lines once.
 
         Parameters:
-            - m3u8_content (str): The content of the M3U8 file.
+            - uri (str): URL of the playlist.
+            - raw_content (str): The content of the M3U8 file.
+        """
+        self.playlist = CompiledPlaylist(uri)
+        self.segments = self.playlist.paths
+        self.__parse_lines__(raw_content)
+
+    def parse_data_m3u8(self, uri, raw_content) -> None:
+        """
+        Same as `parse_data` through the object model of the `m3u8` library, much slower on long playlists.
+
+        Parameters:
+            - uri (str): URL of the playlist.
+            - raw_content (str): The content of the M3U8 file.
         """
         m3u8_obj = loads(raw_content, uri)
+        self.media_sequence = m3u8_obj.media_sequence or 0
+        self.target_duration = m3u8_obj.target_duration or 0
+        self.is_endlist = bool(m3u8_obj.is_endlist)
+        self.playlist_type = str(m3u8_obj.playlist_type or "").upper()
+        self.playlist = CompiledPlaylist(uri)
+        self.segments = self.playlist.paths
         
         self.__parse_video_info__(m3u8_obj)
         self.__parse_subtitles_and_audio__(m3u8_obj)
         self.__parse_segments__(m3u8_obj)
         self.is_master_playlist = self.__is_master__(m3u8_obj)
 
+    @staticmethod
+    def __parse_attributes__(value: str) -> Dict[str, str]:
+        """Convert an attribute list `KEY=VALUE,KEY="VALUE"` to a dictionary, without the quotes."""
+        return {name: attribute.strip('"') for name, attribute in ATTRIBUTE_PATTERN.findall(value)}
+
+    def __parse_lines__(self, raw_content: str) -> None:
+        """
+        Fill the playlist attributes with a single pass over the lines, reading only the tags in use.
+
+        Parameters:
+            - raw_content (str): The content of the M3U8 file.
+        """
+        append = self.playlist.append
+        range_ends = {}
+        duration = 0
+        byterange = None
+        key_index = None
+        stream_info = None
+        is_variant = False
+        has_segments = False
+
+        try:
+            for line in raw_content.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+
+                # URI of a variant or of a segment
+                if line[0] != '#':
+                    if stream_info is not None:
+                        self.__add_variant__(stream_info, line)
+                        stream_info = None
+                        continue
+
+                    has_segments = True
+                    self.duration += duration
+
+                    if "vtt" not in line:
+                        byte_range = self.__parse_byte_range__(byterange, range_ends.get(line, 0))
+                        if byte_range is not None:
+                            range_ends[line] = byte_range[0] + byte_range[1]
+
+                        append(line, duration, byte_range, key_index)
+                    else:
+                        self.subtitle.append(line)
+
+                    duration = 0
+                    byterange = None
+                    continue
+
+                tag, _, value = line.partition(':')
+
+                if tag == '#EXTINF':
+                    duration = float(value.split(',', 1)[0] or 0)
+
+                elif tag == '#EXT-X-BYTERANGE':
+                    byterange = value
+
+                elif tag == '#EXT-X-KEY':
+                    key_index = self.__add_key__(self.__parse_attributes__(value))
+
+                elif tag == '#EXT-X-STREAM-INF':
+                    stream_info = self.__parse_attributes__(value)
+                    is_variant = True
+
+                elif tag == '#EXT-X-MEDIA':
+                    self.__add_media__(self.__parse_attributes__(value))
+
+                elif tag == '#EXT-X-MEDIA-SEQUENCE':
+                    self.media_sequence = int(value)
+
+                elif tag == '#EXT-X-TARGETDURATION':
+                    self.target_duration = float(value)
+
+                elif tag == '#EXT-X-PLAYLIST-TYPE':
+                    self.playlist_type = value.strip().upper()
+
+                elif tag == '#EXT-X-ENDLIST':
+                    self.is_endlist = True
+
+        except Exception as e:
+            logging.error(f"Error parsing playlist: {e}")
+
+        self.is_master_playlist = True if is_variant else (False if has_segments else None)
+
+    def __add_key__(self, attributes: Dict[str, str]) -> Optional[int]:
+        """Register an EXT-X-KEY, returns its index in `key_list` or None for METHOD=NONE."""
+        method = attributes.get('METHOD')
+        if method in (None, "NONE"):
+            return None
+
+        key_info = {'method': method, 'iv': attributes.get('IV'), 'uri': attributes.get('URI')}
+        if self.keys is None:
+            self.keys = key_info
+
+        if key_info not in self.key_list:
+            self.key_list.append(key_info)
+        return self.key_list.index(key_info)
+
+    def __add_variant__(self, attributes: Dict[str, str], uri: str) -> None:
+        """Register an EXT-X-STREAM-INF and the URI on the line after it."""
+        bandwidth = int(attributes['BANDWIDTH']) if 'BANDWIDTH' in attributes else None
+
+        width, _, height = attributes.get('RESOLUTION', '').partition('x')
+        resolution = (int(width), int(height)) if height else M3U8_Parser.extract_resolution(uri)
+
+        if attributes.get('CODECS') is not None:
+            self.codec = M3U8_Codec(bandwidth, attributes['CODECS'])
+            self.codec.resolution = resolution
+
+        self.video_playlist.append({
+            "uri": uri,
+            "resolution": resolution,
+            "bandwidth": bandwidth
+        })
+
+    def __add_media__(self, attributes: Dict[str, str]) -> None:
+        """Register an EXT-X-MEDIA of type AUDIO or SUBTITLES."""
+        media_type = attributes.get('TYPE')
+        media = {
+            "type": media_type,
+            "name": attributes.get('NAME'),
+            "default": attributes.get('DEFAULT'),
+            "language": attributes.get('LANGUAGE'),
+            "uri": attributes.get('URI')
+        }
+
+        if media_type == "SUBTITLES":
+            self.subtitle_playlist.append(media)
+        elif media_type == "AUDIO":
+            self.audio_playlist.append(media)
+
+    @property
+    def is_live(self) -> bool:
+        """A media playlist still growing: live or EVENT, without EXT-X-ENDLIST."""
+        return bool(self.segments) and not self.is_endlist and self.playlist_type != "VOD"
+
     @staticmethod
     def extract_resolution(uri: str) -> int:
         """
@@ -523,15 +690,19 @@ class M3U8_Parser:
         except Exception as e:
             logging.error(f"Error parsing video info: {e}")
 
-    def __parse_encryption_keys__(self, obj) -> None:
+    def __parse_encryption_keys__(self, obj) -> Optional[int]:
         """
         Extracts encryption keys either from the M3U8 object or from individual segments.
+        Every distinct key is stored once in `key_list`, `keys` is the first one.
 
         Parameters:
             - obj: Either the main M3U8 object or an individual segment.
+
+        Returns:
+            int: Index in `key_list` of the key of `obj`, None if it is not encrypted.
         """
         try:
-            if hasattr(obj, 'key') and obj.key is not None:
+            if hasattr(obj, 'key') and obj.key is not None and obj.key.method not in (None, "NONE"):
                 key_info = {
                     'method': obj.key.method,
                     'iv': obj.key.iv,
@@ -541,18 +712,29 @@ class M3U8_Parser:
                 if self.keys is None:
                     self.keys = key_info
 
-                """
-                elif obj.key.uri not in self.keys:
-                    if isinstance(self.keys, dict):
-                        self.keys[obj.key.uri] = key_info
-                    else:
-                        old_key = self.keys
-                        self.keys = {'default': old_key, obj.key.uri: key_info}
-                """
+                if key_info not in self.key_list:
+                    self.key_list.append(key_info)
+                return self.key_list.index(key_info)
 
         except Exception as e:
             logging.error(f"Error parsing encryption keys: {e}")
-            pass
+
+        return None
+
+    @staticmethod
+    def __parse_byte_range__(byterange: Optional[str], previous_end: int) -> Optional[Tuple[int, int]]:
+        """
+        Convert an EXT-X-BYTERANGE value `<length>[@<offset>]` to `(offset, length)`.
+
+        Parameters:
+            - byterange (str): Value of the tag, None if the segment is a whole file.
+            - previous_end (int): End of the previous range of the same resource, the offset when omitted.
+        """
+        if not byterange:
+            return None
+
+        length, _, offset = str(byterange).partition("@")
+        return (int(offset) if offset else previous_end), int(length)
 
     def __parse_subtitles_and_audio__(self, m3u8_obj) -> None:
         """
@@ -592,22 +774,30 @@ class M3U8_Parser:
             - m3u8_obj: The M3U8 object containing segment data.
         """
         try:
+            range_ends = {}
+
             for segment in m3u8_obj.segments:
 
-                # Parse key
-                self.__parse_encryption_keys__(segment)
+                # Parse key, rotated keys give each segment its own index
+                key_index = self.__parse_encryption_keys__(segment)
                 
                 # Collect all index duration
                 self.duration += segment.duration
 
                 if "vtt" not in segment.uri:
-                    self.segments.append(segment.uri)
+                    byte_range = self.__parse_byte_range__(segment.byterange, range_ends.get(segment.uri, 0))
+                    if byte_range is not None:
+                        range_ends[segment.uri] = byte_range[0] + byte_range[1]
+
+                    self.playlist.append(segment.uri, segment.duration or 0, byte_range, key_index)
                 else:
                     self.subtitle.append(segment.uri)
             
             # Second check if there is key in main m3u8 obj
             if self.keys is None:
-                self.__parse_encryption_keys__(m3u8_obj)
+                key_index = self.__parse_encryption_keys__(m3u8_obj)
+                if key_index is not None:
+                    self.playlist.key_indexes[:] = array('i', [key_index] * len(self.playlist))
 
         except Exception as e:
             logging.error(f"Error parsing segments: {e}")
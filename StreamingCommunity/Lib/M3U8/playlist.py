@@ -0,0 +1,91 @@
+# 18.10.26
+
+from array import array
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+
+class CompiledPlaylist:
+    """
+    Segments of a media playlist kept as one base URL plus compact per-segment arrays.
+    Indexing returns the absolute URL of a segment, resolved only when it is requested.
+    """
+    __slots__ = ('base_url', '_base', '_base_dir', '_origin', 'paths', 'durations', 'range_offsets', 'range_lengths', 'key_indexes')
+
+    def __init__(self, base_url: str):
+        """
+        Parameters:
+            - base_url (str): URL of the media playlist, relative segment paths are resolved against it.
+        """
+        self.base_url = base_url
+        self.paths: List[str] = []
+        self.durations = array('d')
+        self.range_offsets = array('q')         # -1 when the segment is a whole file
+        self.range_lengths = array('q')
+        self.key_indexes = array('i')           # -1 when the segment is not encrypted
+
+        # Same base as M3U8_UrlFix: the query of the playlist is not inherited by the segments
+        parsed_url = urlparse(base_url or "")
+        self._origin = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        self._base = f"{self._origin}{parsed_url.path}"
+        self._base_dir = self._base[:self._base.rfind('/') + 1]
+
+    def append(self, path: str, duration: float = 0, byte_range: Optional[Tuple[int, int]] = None, key_index: Optional[int] = None) -> None:
+        """
+        Add a segment.
+
+        Parameters:
+            - path (str): URI of the segment as written in the playlist.
+            - duration (float): EXTINF duration in seconds.
+            - byte_range (Tuple[int, int]): `(offset, length)` of an EXT-X-BYTERANGE segment.
+            - key_index (int): Index of its key in the parser `key_list`.
+        """
+        self.paths.append(path)
+        self.durations.append(duration)
+        self.range_offsets.append(byte_range[0] if byte_range else -1)
+        self.range_lengths.append(byte_range[1] if byte_range else -1)
+        self.key_indexes.append(-1 if key_index is None else key_index)
+
+    def resolve(self, path: str) -> str:
+        """Absolute URL of a segment path."""
+        if path.startswith(("http://", "https://")):
+            return path
+
+        # Plain relative paths are the common case, leave dot segments and the rest to urljoin
+        if path and "./" not in path and not path.startswith(("/", "?", "#")) and ":" not in path.split("/", 1)[0]:
+            return self._base_dir + path
+
+        if path.startswith("/") and not path.startswith("//"):
+            return self._origin + path
+
+        return urljoin(self._base, path)
+
+    def url(self, index: int) -> str:
+        return self.resolve(self.paths[index])
+
+    def byte_range(self, index: int) -> Optional[Tuple[int, int]]:
+        """`(offset, length)` of a segment, None if it is a whole file."""
+        if self.range_lengths[index] < 0:
+            return None
+
+        return self.range_offsets[index], self.range_lengths[index]
+
+    def key_index(self, index: int) -> Optional[int]:
+        key_index = self.key_indexes[index]
+        return None if key_index < 0 else key_index
+
+    @property
+    def duration(self) -> float:
+        return sum(self.durations)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> str:
+        return self.resolve(self.paths[index])
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.resolve(path) for path in self.paths)
+
+    def __repr__(self) -> str:
+        return f"CompiledPlaylist(base_url={self.base_url!r}, segments={len(self.paths)})"
@@ -0,0 +1,153 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+import glob
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import statistics
+from typing import Dict, List, Optional
+
+
+# Import
+from StreamingCommunity.Util.os import os_summary, get_ffmpeg_path
+from StreamingCommunity.Lib.Downloader import HLS_Downloader
+from StreamingCommunity.Lib.Downloader.HLS import segments as hls_segments
+from StreamingCommunity.Lib.Downloader.HLS import downloader as hls_downloader
+from hls_origin import LocalOrigin, generate_source, origin_config, parse_origin_args
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+    except ImportError:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return getattr(memory, 'peak_wset', memory.rss) / 1024 / 1024
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def file_sha1(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def check_tracks(origin: LocalOrigin, temp_dir: str) -> Optional[List[str]]:
+    """
+    Compare the downloaded tracks with the segments served, in order.
+
+    Returns:
+        List[str]: Tracks missing or different from the origin, None if the tracks were remuxed through pipes.
+    """
+    if hls_downloader.STREAM_REMUX:
+        return None
+
+    expected = [os.path.join(temp_dir, 'video', '0.ts')]
+    if origin.config.audio:
+        expected += glob.glob(os.path.join(temp_dir, 'audio', '*', '0.ts')) or [os.path.join(temp_dir, 'audio', '0.ts')]
+
+    return [
+        os.path.relpath(path, temp_dir) for path in expected
+        if not os.path.exists(path) or file_sha1(path) != origin.expected_sha1
+    ]
+
+
+def run_once(origin: LocalOrigin, work_dir: str, run: int) -> Dict:
+    """Download the stream of `origin` once and measure it."""
+    output_path = os.path.join(work_dir, f"run_{run}", "bench.mp4")
+    metrics_path = os.path.join(work_dir, f"run_{run}.jsonl")
+    hls_segments.METRICS_FILE = metrics_path
+
+    # The tracks are kept until they have been compared with the origin
+    hls_downloader.CLEANUP_TMP = False
+    downloader = HLS_Downloader(m3u8_url=origin.url, output_path=output_path)
+
+    start = time.perf_counter()
+    result = downloader.start()
+    elapsed = time.perf_counter() - start
+
+    corrupted = check_tracks(origin, downloader.path_manager.temp_dir)
+    shutil.rmtree(downloader.path_manager.temp_dir, ignore_errors=True)
+
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        requests = [json.loads(line) for line in f]
+    latencies = [r['latency'] for r in requests if 200 <= r['status'] < 300]
+
+    tracks = 2 if origin.config.audio else 1
+    download_time = result['timings'].get('download', elapsed)
+    return {
+        'error': f"corrupted {', '.join(corrupted)}" if corrupted else result['error'],
+        'verified': corrupted is not None,
+        'corrupted': bool(corrupted),
+        'seconds': elapsed,
+        'throughput': origin.payload_size * tracks / 1024 / 1024 / download_time if download_time else 0,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'failed_requests': sum(1 for r in requests if not 200 <= r['status'] < 300),
+        'merge': result['timings'].get('merge', 0),
+        'timings': result['timings']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HLS_Downloader against a local origin, no network needed")
+    parse_origin_args(parser)
+    parser.add_argument("--runs", type=int, default=3, help="Downloads to measure")
+    parser.add_argument("--synthetic", action="store_true", help="Serve synthetic TS packets instead of an encoded source (merge will fail)")
+    args = parser.parse_args()
+
+    os_summary.get_system_summary()
+    config = origin_config(args)
+    work_dir = tempfile.mkdtemp(prefix="hls_bench_")
+
+    if not config.source and not args.synthetic:
+        config.source = generate_source(get_ffmpeg_path(), config, os.path.join(tempfile.gettempdir(), "hls_bench_source"))
+
+    origin = LocalOrigin(config).start()
+    results = []
+    try:
+        for run in range(args.runs):
+            results.append(run_once(origin, work_dir, run))
+
+    finally:
+        origin.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nOrigin: {config}")
+    print(f"Requests: {origin.requests}, injected 503: {origin.injected_errors}, injected 429: {origin.injected_throttles}\n")
+    print(f"{'run':>4}{'total s':>10}{'MB/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'merge s':>10}{'failed':>8}  error")
+    for run, r in enumerate(results):
+        print(f"{run:>4}{r['seconds']:>10.2f}{r['throughput']:>10.1f}{r['p50'] * 1000:>10.1f}{r['p99'] * 1000:>10.1f}{r['merge']:>10.2f}{r['failed_requests']:>8}  {r['error'] or ''}")
+
+    print(f"\nMedian throughput: {statistics.median(r['throughput'] for r in results):.1f} MB/s, peak RSS: {peak_rss_mb():.0f} MB")
+
+    if not all(r['verified'] for r in results):
+        print("Tracks not checked: stream_remux sends them to FFmpeg through pipes")
+    if any(r['corrupted'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
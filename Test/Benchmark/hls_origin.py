@@ -0,0 +1,298 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+import time
+import struct
+import random
+import hashlib
+import argparse
+import threading
+import subprocess
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Optional, Tuple
+
+
+# External libraries
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import pad
+
+
+# Costant
+TS_PACKET = 188
+SEGMENT_DURATION = 4
+KEY = bytes(range(16))
+
+
+@dataclass
+class OriginConfig:
+    segments: int = 200
+    segment_kb: int = 512
+    encrypted: bool = False
+    byte_ranges: bool = False
+    audio: bool = False
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0
+    throttle_rate: float = 0
+    source: Optional[str] = None
+
+
+def generate_source(ffmpeg_path: str, config: OriginConfig, cache_dir: str) -> Optional[str]:
+    """
+    Encode a test pattern of `segments * SEGMENT_DURATION` seconds at the bitrate giving `segment_kb` per segment,
+    so the segments served can really be merged. The file is cached between runs.
+    """
+    duration = config.segments * SEGMENT_DURATION
+    bitrate = config.segment_kb * 1024 * 8 // SEGMENT_DURATION
+    path = os.path.join(cache_dir, f"source_{duration}s_{bitrate}.ts")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    command = [
+        ffmpeg_path, "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=25",
+        "-f", "lavfi", "-i", "sine=frequency=440",
+        "-t", str(duration),
+        "-c:v", "libx264", "-preset", "ultrafast", "-b:v", str(bitrate), "-maxrate", str(bitrate), "-bufsize", str(bitrate),
+        "-c:a", "aac", "-b:a", "64k",
+        "-f", "mpegts", path
+    ]
+
+    try:
+        subprocess.run(command, check=True)
+        return path
+
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Can't generate the source with FFmpeg ({e}), serving synthetic segments")
+        return None
+
+
+class LocalOrigin:
+    def __init__(self, config: OriginConfig, port: int = 0):
+        """
+        Stand-in for a CDN serving one HLS stream on 127.0.0.1: master, media playlists, key and segments.
+
+        Parameters:
+            - config (OriginConfig): Shape of the stream and faults to inject.
+            - port (int): Port to listen on, 0 picks a free one.
+        """
+        self.config = config
+        plain_segments = self._plain_segments()
+        self.payload_size = sum(len(segment) for segment in plain_segments)
+        self.expected_sha1 = self._digest(plain_segments)
+        self.segments = self._encrypt(plain_segments)
+        self.offsets = self._build_offsets()
+        self.whole_file = b"".join(self.segments) if config.byte_ranges else b""
+        self.requests = 0
+        self.injected_errors = 0
+        self.injected_throttles = 0
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/master.m3u8"
+
+    def start(self) -> "LocalOrigin":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _plain_segments(self) -> List[bytes]:
+        """Segments of the source, split on TS packet boundaries, or synthetic TS packets without a source."""
+        count, size = self.config.segments, self.config.segment_kb * 1024
+
+        if self.config.source:
+            with open(self.config.source, 'rb') as f:
+                data = f.read()
+            step = max(TS_PACKET, len(data) // count // TS_PACKET * TS_PACKET)
+            return [data[i * step:(i + 1) * step if i < count - 1 else len(data)] for i in range(count)]
+
+        # Every packet is unique, so reordered, repeated or missing segments change the output
+        header = b"\x47\x1f\xff\x10"
+        payload_size = TS_PACKET - len(header) - 8
+        packets = size // TS_PACKET
+        segments = []
+        for i in range(count):
+            payload = random.Random(i).randbytes(packets * payload_size)
+            segments.append(b"".join(
+                header + struct.pack(">II", i, p) + payload[p * payload_size:(p + 1) * payload_size]
+                for p in range(packets)
+            ))
+        return segments
+
+    @staticmethod
+    def _digest(segments: List[bytes]) -> str:
+        """SHA-1 of the track a correct download writes: the clear segments in order."""
+        sha1 = hashlib.sha1()
+        for segment in segments:
+            sha1.update(segment)
+        return sha1.hexdigest()
+
+    def _encrypt(self, segments: List[bytes]) -> List[bytes]:
+        if not self.config.encrypted:
+            return segments
+
+        # No IV in the playlist: the IV is the media sequence number
+        return [AES.new(KEY, AES.MODE_CBC, iv=i.to_bytes(16, "big")).encrypt(pad(segment, 16)) for i, segment in enumerate(segments)]
+
+    def _build_offsets(self) -> List[int]:
+        offsets = [0]
+        for segment in self.segments:
+            offsets.append(offsets[-1] + len(segment))
+        return offsets
+
+    def master_playlist(self) -> str:
+        lines = ["#EXTM3U", "#EXT-X-VERSION:4"]
+        audio_group = ""
+        if self.config.audio:
+            lines.append('#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Italiano",LANGUAGE="ita",DEFAULT=YES,URI="audio/index.m3u8"')
+            audio_group = ',AUDIO="audio"'
+
+        bandwidth = self.config.segment_kb * 1024 * 8 // SEGMENT_DURATION
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION=640x360,CODECS="avc1.640028,mp4a.40.2"{audio_group}')
+        lines.append("video/index.m3u8")
+        return "\n".join(lines) + "\n"
+
+    def media_playlist(self) -> str:
+        lines = ["#EXTM3U", "#EXT-X-VERSION:4", f"#EXT-X-TARGETDURATION:{SEGMENT_DURATION}", "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+        if self.config.encrypted:
+            lines.append('#EXT-X-KEY:METHOD=AES-128,URI="/key.bin"')
+
+        for i in range(len(self.segments)):
+            lines.append(f"#EXTINF:{SEGMENT_DURATION}.000,")
+            if self.config.byte_ranges:
+                lines += [f"#EXT-X-BYTERANGE:{self.offsets[i + 1] - self.offsets[i]}@{self.offsets[i]}", "stream.ts"]
+            else:
+                lines.append(f"seg/{i}.ts")
+
+        lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+    def _fault(self) -> Optional[int]:
+        """Status of an injected failure for this request, None to serve it."""
+        roll = random.random()
+        with self.lock:
+            self.requests += 1
+            if roll < self.config.throttle_rate:
+                self.injected_throttles += 1
+                return 429
+            if roll < self.config.throttle_rate + self.config.error_rate:
+                self.injected_errors += 1
+                return 503
+
+        return None
+
+    def _delay(self) -> None:
+        latency = self.config.latency_ms + random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def _segment_body(self, path: str, range_header: Optional[str]) -> Tuple[int, bytes, Optional[str]]:
+        """Status, body and Content-Range of a segment request."""
+        if path.endswith("/stream.ts"):
+            if not range_header:
+                return 200, self.whole_file, None
+
+            start, _, end = range_header.split("=", 1)[1].partition("-")
+            start, end = int(start), min(int(end), len(self.whole_file) - 1)
+            return 206, self.whole_file[start:end + 1], f"bytes {start}-{end}/{len(self.whole_file)}"
+
+        index = int(path.rsplit("/", 1)[1].split(".")[0])
+        return 200, self.segments[index], None
+
+    def _handler(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status: int, body: bytes, content_type: str = "video/mp2t", headers: Optional[dict] = None):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    for name, value in (headers or {}).items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                # The client may drop the request, e.g. the losing request of a hedged pair
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+
+                if path == "/master.m3u8":
+                    return self.send(200, origin.master_playlist().encode(), "application/vnd.apple.mpegurl")
+                if path.endswith("/index.m3u8"):
+                    return self.send(200, origin.media_playlist().encode(), "application/vnd.apple.mpegurl")
+                if path == "/key.bin":
+                    return self.send(200, KEY, "application/octet-stream")
+
+                if path.endswith("/stream.ts") or path.startswith(("/video/seg/", "/audio/seg/")):
+                    origin._delay()
+                    status = origin._fault()
+                    if status is not None:
+                        return self.send(status, b"", headers={"Retry-After": "1"} if status == 429 else None)
+
+                    status, body, content_range = origin._segment_body(path, self.headers.get("Range"))
+                    return self.send(status, body, headers={"Content-Range": content_range} if content_range else None)
+
+                self.send(404, b"")
+
+        return Handler
+
+
+def parse_origin_args(parser: argparse.ArgumentParser) -> None:
+    """Add the options of the origin to a command line parser."""
+    parser.add_argument("--segments", type=int, default=200, help="Segments per track")
+    parser.add_argument("--segment-kb", type=int, default=512, help="Size of a segment in KB")
+    parser.add_argument("--encrypted", action="store_true", help="Encrypt the segments with AES-128")
+    parser.add_argument("--byte-ranges", action="store_true", help="Serve the segments as EXT-X-BYTERANGE of one file")
+    parser.add_argument("--audio", action="store_true", help="Add an audio rendition to the master playlist")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay before each segment response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- variation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of segment requests answered 503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of segment requests answered 429")
+    parser.add_argument("--source", help="MPEG-TS file to split into segments (default: generated with FFmpeg)")
+
+
+def origin_config(args: argparse.Namespace) -> OriginConfig:
+    return OriginConfig(
+        segments=args.segments, segment_kb=args.segment_kb, encrypted=args.encrypted, byte_ranges=args.byte_ranges,
+        audio=args.audio, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, source=args.source
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic HLS stream on 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parse_origin_args(parser)
+    args = parser.parse_args()
+
+    origin = LocalOrigin(origin_config(args), args.port).start()
+    print(f"Serving {origin.url}")
+    try:
+        origin.thread.join()
+    except KeyboardInterrupt:
+        origin.stop()
@@ -0,0 +1,99 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+import time
+import statistics
+
+
+# Import
+from StreamingCommunity.Lib.M3U8 import M3U8_Parser
+
+
+SIZES = [100, 1000, 10000, 50000]
+BASE_URL = "https://cdn.example.com/hls/1080p/playlist.m3u8"
+
+
+def make_media_playlist(count: int, byte_ranges: bool = False) -> str:
+    """Media playlist of `count` segments, with a key rotated every 100 segments."""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:4", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+
+    for i in range(count):
+        if i % 100 == 0:
+            lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.com/key/{i // 100}?token=abc",IV=0x{i:032x}')
+        lines.append("#EXTINF:4.004,")
+
+        if byte_ranges:
+            lines += [f"#EXT-X-BYTERANGE:188000@{i * 188000}", "video.ts"]
+        else:
+            lines.append(f"seg-{i:06d}.ts?token=abc&expires=1760000000")
+
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def make_master_playlist(count: int) -> str:
+    """Master playlist with `count` variants sharing a few audio and subtitle renditions."""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:4"]
+
+    for language in ("ita", "eng", "jpn"):
+        lines.append(f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="{language}",LANGUAGE="{language}",DEFAULT={"YES" if language == "ita" else "NO"},URI="audio/{language}/playlist.m3u8"')
+        lines.append(f'#EXT-X-MEDIA:TYPE=SUBTITLES,GROUP-ID="subs",NAME="{language}",LANGUAGE="{language}",DEFAULT=NO,URI="subs/{language}/playlist.m3u8"')
+
+    for i in range(count):
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={1000000 + i},RESOLUTION=1920x{i % 1080 + 1},CODECS="avc1.640028,mp4a.40.2",AUDIO="audio",SUBTITLES="subs"')
+        lines.append(f"video/{i}/playlist.m3u8")
+
+    return "\n".join(lines) + "\n"
+
+
+def snapshot(parser: M3U8_Parser) -> tuple:
+    """Public attributes the downloader reads, to check both paths agree."""
+    playlist = parser.playlist
+    return (
+        parser.is_master_playlist, parser.media_sequence, parser.target_duration, parser.is_endlist, parser.playlist_type,
+        round(parser.duration, 6), parser.key_list, parser.keys, parser.video_playlist, parser.audio_playlist,
+        parser.subtitle_playlist, parser.subtitle, list(playlist.paths), list(playlist.durations),
+        list(playlist.range_offsets), list(playlist.range_lengths), list(playlist.key_indexes),
+        parser.codec.codecs if parser.codec else None,
+    )
+
+
+def measure(method: str, content: str, repeat: int) -> float:
+    """Median seconds of `repeat` parses."""
+    timings = []
+    for _ in range(repeat):
+        parser = M3U8_Parser()
+        start = time.perf_counter()
+        getattr(parser, method)(BASE_URL, content)
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+
+def main():
+    print(f"{'playlist':<14}{'entries':>9}{'m3u8 lib':>12}{'line parser':>14}{'speedup':>10}")
+
+    for name, build in (("media", make_media_playlist), ("byterange", lambda n: make_media_playlist(n, True)), ("master", make_master_playlist)):
+        for count in SIZES:
+            content = build(count)
+
+            fast, slow = M3U8_Parser(), M3U8_Parser()
+            fast.parse_data(BASE_URL, content)
+            slow.parse_data_m3u8(BASE_URL, content)
+            if snapshot(fast) != snapshot(slow):
+                raise AssertionError(f"Parsers disagree on the {name} playlist with {count} entries")
+
+            repeat = 5 if count <= 10000 else 2
+            slow_time = measure("parse_data_m3u8", content, repeat)
+            fast_time = measure("parse_data", content, repeat)
+            print(f"{name:<14}{count:>9}{slow_time * 1000:>10.1f}ms{fast_time * 1000:>12.1f}ms{slow_time / fast_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
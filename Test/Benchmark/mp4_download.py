@@ -0,0 +1,128 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from typing import Dict, List
+
+
+# External libraries
+import psutil
+
+
+# Import
+from StreamingCommunity.Lib.Downloader.MP4 import downloader as mp4_downloader
+from mp4_server import RangeServer, ServerConfig, create_file
+
+
+def file_hash(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+class PeakMemory:
+    def __init__(self, interval: float = 0.05):
+        """Sample the RSS of this process while a download runs, the kernel only keeps the lifetime peak."""
+        self.interval = interval
+        self.peak = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        process = psutil.Process()
+        while not self.stop.is_set():
+            self.peak = max(self.peak, process.memory_info().rss)
+            self.stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakMemory":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop.set()
+        self.thread.join()
+
+
+def run_case(url: str, work_dir: str, expected_hash: str, size: int, connections: int, chunk_kb: int) -> Dict:
+    """Download the file once with `connections` ranges and `chunk_kb` reads."""
+    mp4_downloader.RANGE_CONNECTIONS = connections
+    mp4_downloader.CHUNK_SIZE = chunk_kb * 1024
+    mp4_downloader.MIN_RANGE_SIZE = 0
+    output_path = os.path.join(work_dir, f"c{connections}_k{chunk_kb}.mp4")
+
+    with PeakMemory() as memory:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        path, _ = mp4_downloader.MP4_downloader(url=url, path=output_path)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    ok = path is not None and file_hash(path) == expected_hash
+    if path is not None:
+        os.remove(path)
+
+    return {
+        'connections': connections,
+        'chunk_kb': chunk_kb,
+        'mb_s': size / 1024 / 1024 / wall,
+        'cpu_s': cpu,
+        'peak_mb': memory.peak / 1024 / 1024,
+        'ok': ok
+    }
+
+
+def print_table(title: str, results: List[Dict]) -> None:
+    print(f"\n{title}")
+    print(f"{'conn':>5}{'chunk KB':>10}{'MB/s':>10}{'CPU s':>8}{'peak MB':>9}  result")
+    for r in results:
+        print(f"{r['connections']:>5}{r['chunk_kb']:>10}{r['mb_s']:>10.1f}{r['cpu_s']:>8.2f}{r['peak_mb']:>9.0f}  {'ok' if r['ok'] else 'CORRUPTED'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MP4_downloader against a local range server, no network needed")
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the test file")
+    parser.add_argument("--file", help="Serve this file instead of a generated one")
+    parser.add_argument("--connections", default="1,2,4,8", help="Range connections to compare")
+    parser.add_argument("--chunk-kb", default="64,256,1024,4096", help="Read sizes to compare on the single connection download")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="MB/s cap per connection (0 = unlimited)")
+    parser.add_argument("--disconnect-rate", type=float, default=0, help="Fraction of responses closed mid-stream")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    source = args.file or create_file(os.path.join(tempfile.gettempdir(), "mp4_bench_source", f"{args.size_mb}mb.bin"), args.size_mb)
+    size = os.path.getsize(source)
+    expected_hash = file_hash(source)
+    work_dir = tempfile.mkdtemp(prefix="mp4_bench_")
+
+    try:
+        # Ranged downloads read what the socket returns, the connection count is what matters
+        config = ServerConfig(source, True, args.bandwidth_mbps, args.disconnect_rate)
+        with RangeServer(config, args.port) as server:
+            ranged = [run_case(server.url, work_dir, expected_hash, size, int(c), 1024) for c in args.connections.split(",")]
+
+        # Without range support the file comes over one connection in CHUNK_SIZE reads
+        config = ServerConfig(source, False, args.bandwidth_mbps, 0)
+        with RangeServer(config, args.port + 1) as server:
+            single = [run_case(server.url, work_dir, expected_hash, size, 1, int(k)) for k in args.chunk_kb.split(",")]
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nFile: {size / 1024 / 1024:.0f} MB, bandwidth cap: {args.bandwidth_mbps or 'none'} MB/s per connection, disconnect rate: {args.disconnect_rate}")
+    print_table("Range requests", ranged)
+    print_table("Single connection (no range support)", single)
+
+
+if __name__ == "__main__":
+    main()
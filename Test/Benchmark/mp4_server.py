@@ -0,0 +1,167 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+import time
+import random
+import argparse
+import multiprocessing
+from dataclasses import dataclass
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Tuple
+
+
+# Costant
+BLOCK_SIZE = 64 * 1024
+PATTERN = bytes(range(256)) * 4096      # 1 MB repeated to build the test file
+
+
+@dataclass
+class ServerConfig:
+    path: str
+    ranges: bool = True
+    bandwidth_mbps: float = 0            # MB/s per connection, 0 = unlimited
+    disconnect_rate: float = 0           # Fraction of responses cut at a random byte
+
+
+def create_file(path: str, size_mb: int) -> str:
+    """Write a `size_mb` test file once, a new size rewrites it."""
+    size = size_mb * 1024 * 1024
+    if os.path.exists(path) and os.path.getsize(path) == size:
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(PATTERN)
+    return path
+
+
+def make_handler(config: ServerConfig):
+    total = os.path.getsize(config.path)
+    stat = os.stat(config.path)
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _requested_range(self) -> Optional[Tuple[int, int]]:
+            """`(start, end)` of a satisfiable Range header, None to send the whole file."""
+            header = self.headers.get("Range")
+            if not config.ranges or not header or not header.startswith("bytes="):
+                return None
+
+            # A changed file is sent whole
+            if_range = self.headers.get("If-Range")
+            if if_range and if_range not in (etag, last_modified):
+                return None
+
+            start, _, end = header[6:].partition("-")
+            start = int(start)
+            end = min(int(end), total - 1) if end else total - 1
+            return (start, end) if start <= end else None
+
+        def do_GET(self):
+            byte_range = self._requested_range()
+            start, end = byte_range or (0, total - 1)
+
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            if config.ranges:
+                self.send_header("Accept-Ranges", "bytes")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+            self.end_headers()
+
+            # Cut this response somewhere in the body
+            cut_at = end + 1
+            if config.disconnect_rate and random.random() < config.disconnect_rate:
+                cut_at = random.randint(start, end)
+
+            self._send_body(start, min(end + 1, cut_at))
+            if cut_at <= end:
+                self.close_connection = True
+
+        def _send_body(self, start: int, stop: int) -> None:
+            """Send `[start, stop)` in blocks, paced to `bandwidth_mbps`."""
+            rate = config.bandwidth_mbps * 1024 * 1024
+            began = time.monotonic()
+            sent = 0
+
+            try:
+                with open(config.path, 'rb') as f:
+                    f.seek(start)
+                    while start + sent < stop:
+                        block = f.read(min(BLOCK_SIZE, stop - start - sent))
+                        self.wfile.write(block)
+                        sent += len(block)
+
+                        if rate:
+                            ahead = sent / rate - (time.monotonic() - began)
+                            if ahead > 0:
+                                time.sleep(ahead)
+
+            # The client may close the stream early, e.g. after reading the headers
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    return Handler
+
+
+def serve(config: ServerConfig, port: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+class RangeServer:
+    def __init__(self, config: ServerConfig, port: int):
+        """
+        Stand-in for a file host, in its own process so its CPU time is not counted with the downloader.
+
+        Parameters:
+            - config (ServerConfig): File to serve and faults to inject.
+            - port (int): Port on 127.0.0.1.
+        """
+        self.config = config
+        self.port = port
+        self.process = multiprocessing.Process(target=serve, args=(config, port), daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/video.mp4"
+
+    def __enter__(self) -> "RangeServer":
+        self.process.start()
+        time.sleep(0.5)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.process.terminate()
+        self.process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a file on 127.0.0.1 with Range support, bandwidth caps and disconnects")
+    parser.add_argument("path", help="File to serve")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--no-range", action="store_true", help="Ignore Range headers")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="MB/s per connection (0 = unlimited)")
+    parser.add_argument("--disconnect-rate", type=float, default=0, help="Fraction of responses closed mid-stream")
+    args = parser.parse_args()
+
+    print(f"Serving {args.path} on http://127.0.0.1:{args.port}/video.mp4")
+    serve(ServerConfig(args.path, not args.no_range, args.bandwidth_mbps, args.disconnect_rate), args.port)
@@ -0,0 +1,87 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+
+# Import
+import time
+import unittest
+import threading
+from StreamingCommunity.Lib.Downloader.HLS.buffer import ReorderWindow
+
+
+class TestReorderWindow(unittest.TestCase):
+    def test_reserve_within_caps(self):
+        window = ReorderWindow(max_segments=2, max_bytes=100)
+
+        self.assertTrue(window.reserve(1, 40, block=False))
+        self.assertTrue(window.reserve(2, 40, block=False))
+        self.assertEqual((window.pending_segments, window.pending_bytes), (2, 80))
+
+        # Segment cap
+        self.assertFalse(window.reserve(3, 10, block=False))
+
+    def test_byte_cap(self):
+        window = ReorderWindow(max_segments=0, max_bytes=100)
+
+        self.assertTrue(window.reserve(1, 60, block=False))
+        self.assertFalse(window.reserve(2, 60, block=False))
+        self.assertEqual(window.peak_bytes, 60)
+
+    def test_expected_segment_always_admitted(self):
+        window = ReorderWindow(max_segments=1, max_bytes=10)
+        self.assertTrue(window.reserve(1, 10, block=False))
+
+        # The writer is waiting for segment 0, refusing it would stall the download
+        self.assertTrue(window.reserve(0, 50, block=False))
+        self.assertEqual((window.pending_segments, window.pending_bytes), (2, 60))
+
+    def test_advance_admits_the_next_segment(self):
+        window = ReorderWindow(max_segments=1, max_bytes=0)
+        self.assertTrue(window.reserve(1, 10, block=False))
+        self.assertFalse(window.reserve(2, 10, block=False))
+
+        window.advance(2)
+        self.assertTrue(window.reserve(2, 10, block=False))
+
+    def test_release_and_shrink(self):
+        window = ReorderWindow(max_segments=0, max_bytes=100)
+        window.reserve(1, 80, block=False)
+
+        # Decryption removed the padding
+        window.shrink(30)
+        self.assertEqual(window.pending_bytes, 50)
+        self.assertTrue(window.reserve(2, 50, block=False))
+
+        window.release(50)
+        window.release(50)
+        self.assertEqual((window.pending_segments, window.pending_bytes), (0, 0))
+
+    def test_blocking_reserve_woken_by_release(self):
+        window = ReorderWindow(max_segments=1, max_bytes=0)
+        window.reserve(1, 10, block=False)
+
+        threading.Timer(0.2, window.release, args=(10,)).start()
+        start = time.monotonic()
+        self.assertTrue(window.reserve(2, 10, block=True, timeout=5))
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_blocking_reserve_cancel_and_timeout(self):
+        window = ReorderWindow(max_segments=1, max_bytes=0)
+        window.reserve(1, 10, block=False)
+
+        self.assertFalse(window.reserve(2, 10, block=True, timeout=0.2))
+
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+        self.assertFalse(window.reserve(2, 10, block=True, cancel=cancel))
+        self.assertEqual(window.pending_segments, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+
+# Import
+import shutil
+import tempfile
+import unittest
+from StreamingCommunity.Lib.Downloader.HLS.journal import SegmentJournal, JOURNAL_NAME
+
+
+class TestSegmentJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp_folder = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.tmp_folder, "0.ts")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_folder, ignore_errors=True)
+
+    def write_journal(self, entries, playlist_id="playlist", complete=False):
+        journal = SegmentJournal(self.tmp_folder)
+        journal.open(playlist_id, 0)
+        journal.record_many(entries)
+        journal.close(complete)
+
+    def write_data(self, size):
+        with open(self.data_path, 'wb') as f:
+            f.write(b"\x47" * size)
+
+    def test_load_resumes_after_last_segment(self):
+        self.write_journal([(0, 0, 100), (1, 100, 50), (2, 150, 25)])
+        self.write_data(175)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (3, 175))
+
+    def test_load_stops_at_gap(self):
+        self.write_journal([(0, 0, 100), (1, 100, 100), (3, 300, 100)])
+        self.write_data(400)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (2, 200))
+
+    def test_load_stops_at_offset_mismatch(self):
+        self.write_journal([(0, 0, 100), (1, 120, 100)])
+        self.write_data(220)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (1, 100))
+
+    def test_load_stops_past_data_size(self):
+        self.write_journal([(0, 0, 100), (1, 100, 100)])
+        self.write_data(150)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (1, 100))
+
+    def test_load_ignores_other_playlist(self):
+        self.write_journal([(0, 0, 100)], playlist_id="other")
+        self.write_data(100)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (0, 0))
+
+    def test_load_without_data(self):
+        self.write_journal([(0, 0, 100)])
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (0, 0))
+
+    def test_load_stops_at_torn_line(self):
+        self.write_journal([(0, 0, 100)])
+        with open(os.path.join(self.tmp_folder, JOURNAL_NAME), 'a') as f:
+            f.write("1 100")
+        self.write_data(200)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (1, 100))
+
+    def test_open_keeps_entries_before_resume(self):
+        self.write_journal([(0, 0, 100), (1, 100, 100), (2, 200, 100)])
+        self.write_data(300)
+
+        journal = SegmentJournal(self.tmp_folder)
+        journal.open("playlist", 2)
+        journal.record(2, 200, 50)
+        journal.close()
+        self.write_data(250)
+
+        self.assertEqual(SegmentJournal(self.tmp_folder).load("playlist", self.data_path), (3, 250))
+
+    def test_is_complete(self):
+        self.write_journal([(0, 0, 100)])
+        self.assertFalse(SegmentJournal.is_complete(self.tmp_folder))
+
+        self.write_journal([(0, 0, 100)], complete=True)
+        self.assertTrue(SegmentJournal.is_complete(self.tmp_folder))
+
+    def test_is_complete_without_journal(self):
+        self.assertFalse(SegmentJournal.is_complete(self.tmp_folder))
+
+        # Folder downloaded before the journal existed
+        self.write_data(100)
+        self.assertTrue(SegmentJournal.is_complete(self.tmp_folder))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+
+# Import
+import time
+import unittest
+import threading
+from StreamingCommunity.Lib.Downloader.HLS.scheduler import SegmentScheduler, RetryTracker
+
+
+class TestSegmentScheduler(unittest.TestCase):
+    def setUp(self):
+        self.runs = []
+        self.lock = threading.Lock()
+
+    def record(self, index, attempt, hedge):
+        with self.lock:
+            self.runs.append((index, attempt, hedge, time.monotonic()))
+
+    def test_lowest_index_first(self):
+        scheduler = SegmentScheduler(self.record, workers=1)
+        for index in (5, 1, 3):
+            scheduler.submit(index)
+
+        scheduler.start()
+        self.assertTrue(scheduler.join())
+        scheduler.close()
+
+        self.assertEqual([run[0] for run in self.runs], [1, 3, 5])
+
+    def test_delayed_attempts_run_in_due_order(self):
+        scheduler = SegmentScheduler(self.record, workers=2)
+        scheduler.start()
+
+        start = time.monotonic()
+        scheduler.schedule(1, 1, 0.4)
+        scheduler.schedule(2, 1, 0.1)
+        self.assertEqual(scheduler.waiting_retries(), 2)
+
+        self.assertTrue(scheduler.join())
+        scheduler.close()
+
+        self.assertEqual([run[0] for run in self.runs], [2, 1])
+        self.assertGreaterEqual(self.runs[0][3] - start, 0.1)
+        self.assertGreaterEqual(self.runs[1][3] - start, 0.4)
+
+    def test_join_waits_for_retries(self):
+        scheduler = None
+
+        def fail_once(index, attempt, hedge):
+            self.record(index, attempt, hedge)
+            if attempt == 0:
+                scheduler.schedule(index, attempt + 1, 0.1)
+
+        scheduler = SegmentScheduler(fail_once, workers=2)
+        scheduler.start()
+        for index in range(3):
+            scheduler.submit(index)
+
+        self.assertTrue(scheduler.join())
+        scheduler.close()
+
+        self.assertEqual(sorted((run[0], run[1]) for run in self.runs), [(i, a) for i in range(3) for a in (0, 1)])
+
+    def test_hedge_flag_reaches_target(self):
+        scheduler = SegmentScheduler(self.record, workers=1)
+        scheduler.start()
+        scheduler.submit(4, hedge=True)
+
+        self.assertTrue(scheduler.join())
+        scheduler.close()
+
+        self.assertEqual(self.runs[0][:3], (4, 0, True))
+
+    def test_join_cancel(self):
+        scheduler = SegmentScheduler(self.record, workers=1)
+        scheduler.start()
+        scheduler.schedule(1, 1, 30)
+
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+        self.assertFalse(scheduler.join(cancel))
+        scheduler.close()
+
+    def test_close_drops_pending_attempts(self):
+        scheduler = SegmentScheduler(self.record, workers=1)
+        scheduler.start()
+        scheduler.schedule(1, 1, 30)
+
+        start = time.monotonic()
+        scheduler.close()
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(scheduler.outstanding, 0)
+        self.assertEqual(self.runs, [])
+
+
+class TestRetryTracker(unittest.TestCase):
+    def test_claim_once(self):
+        retries = RetryTracker(max_retry=3)
+
+        self.assertTrue(retries.claim(1))
+        self.assertFalse(retries.claim(1))
+        self.assertTrue(retries.settled(1, 2))
+        self.assertFalse(retries.settled(0, 2))
+
+    def test_gives_up_after_max_retry(self):
+        retries = RetryTracker(max_retry=3)
+
+        self.assertIsNone(retries.on_failure(0, 1, 0))
+        self.assertIsNone(retries.on_failure(0, 1, 1))
+        self.assertEqual(retries.on_failure(0, 1, 2), [0])
+        self.assertEqual((retries.retries, retries.max_attempts, retries.failed_segments), (3, 3, {0}))
+        self.assertTrue(retries.settled(0, 1))
+
+    def test_merged_request_skips_settled_segments(self):
+        retries = RetryTracker(max_retry=1)
+
+        # A hedge delivered the middle segment of the merged request
+        retries.claim(5)
+        self.assertEqual(retries.on_failure(4, 7, 0), [4, 6])
+        self.assertEqual(retries.failed_segments, {4, 6})
+
+    def test_backoff(self):
+        retries = RetryTracker(max_retry=3, backoff_factor=0.5)
+        self.assertEqual([retries.backoff(attempt) for attempt in range(3)], [0.5, 1.0, 2.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
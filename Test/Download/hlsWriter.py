@@ -0,0 +1,95 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+
+# Import
+import shutil
+import tempfile
+import unittest
+from StreamingCommunity.Lib.Downloader.HLS.writer import SegmentWriter
+
+
+class TestSegmentWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_folder, "0.ts")
+        self.reported = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_folder, ignore_errors=True)
+
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_close_truncates_preallocated_space(self):
+        writer = SegmentWriter(self.path)
+        writer.open(expected_size=1 << 20)
+        writer.add(0, b"a" * 100)
+        writer.add(1, b"b" * 50)
+        writer.close()
+
+        # The estimate was too large, the file keeps only the data
+        self.assertEqual(os.path.getsize(self.path), 150)
+        self.assertEqual(self.read(), b"a" * 100 + b"b" * 50)
+
+    def test_resume_truncates_trailing_data(self):
+        with open(self.path, 'wb') as f:
+            f.write(b"a" * 100 + b"garbage")
+
+        writer = SegmentWriter(self.path, offset=100)
+        writer.open()
+        writer.add(1, b"b" * 20)
+        writer.close()
+
+        self.assertEqual(self.read(), b"a" * 100 + b"b" * 20)
+
+    def test_write_combining(self):
+        writer = SegmentWriter(self.path, combine_bytes=100, on_written=self.reported.extend)
+        writer.open()
+        for index in range(4):
+            writer.add(index, bytes([index]) * 40)
+
+        # The first three segments reached the batch size, the fourth waits
+        self.assertEqual(writer.writes, 1)
+        self.assertEqual(self.reported, [(0, 0, 40), (1, 40, 40), (2, 80, 40)])
+
+        writer.close()
+        self.assertEqual(writer.writes, 2)
+        self.assertEqual(self.reported[-1], (3, 120, 40))
+        self.assertEqual(self.read(), b"".join(bytes([index]) * 40 for index in range(4)))
+
+    def test_every_segment_written_without_combining(self):
+        writer = SegmentWriter(self.path, on_written=self.reported.extend)
+        writer.open()
+        writer.add(0, memoryview(b"xyz")[1:])
+        writer.add(1, bytearray(b"w"))
+        writer.close()
+
+        self.assertEqual(writer.writes, 2)
+        self.assertEqual(self.reported, [(0, 0, 2), (1, 2, 1)])
+        self.assertEqual(self.read(), b"yzw")
+
+    def test_preallocated_reports_after_sync(self):
+        writer = SegmentWriter(self.path, on_written=self.reported.extend)
+        writer.open(expected_size=1000)
+        if not writer.preallocated:
+            writer.close()
+            self.skipTest("posix_fallocate not available")
+
+        writer.add(0, b"a" * 10)
+        self.assertEqual(self.reported, [])
+
+        writer.sync()
+        self.assertEqual(self.reported, [(0, 0, 10)])
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+
+# Import
+import unittest
+from StreamingCommunity.Lib.M3U8 import M3U8_Parser
+
+
+BASE_URL = "https://cdn.example.com/hls/1080p/playlist.m3u8?token=abc"
+
+MEDIA_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:6
+#EXT-X-MEDIA-SEQUENCE:120
+#EXT-X-PLAYLIST-TYPE:VOD
+# A comment
+
+#EXTINF:6.006,Title of the first segment
+seg-120.ts?token=abc
+#EXT-X-DISCONTINUITY
+#EXT-X-PROGRAM-DATE-TIME:2024-01-01T00:00:00.000Z
+#EXTINF:5.5,
+/absolute/seg-121.ts
+#EXTINF:4,
+https://mirror.example.com/seg-122.ts
+#EXT-X-ENDLIST
+"""
+
+LIVE_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:4
+#EXT-X-MEDIA-SEQUENCE:5000
+#EXT-X-PLAYLIST-TYPE:EVENT
+#EXTINF:4.0,
+live-5000.ts
+#EXTINF:4.0,
+live-5001.ts
+"""
+
+BYTERANGE_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:4
+#EXT-X-TARGETDURATION:4
+#EXT-X-MAP:URI="init.mp4",BYTERANGE="720@0"
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:1000@720
+video.ts
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:2000
+video.ts
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:500@0
+other.ts
+#EXTINF:2.0,
+#EXT-X-BYTERANGE:300
+other.ts
+#EXT-X-ENDLIST
+"""
+
+KEY_ROTATION_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:4
+#EXT-X-MEDIA-SEQUENCE:0
+#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.com/key/0?token=abc",IV=0x00000000000000000000000000000001
+#EXTINF:4.0,
+seg-0.ts
+#EXTINF:4.0,
+seg-1.ts
+#EXT-X-KEY:METHOD=AES-128,URI="key/1"
+#EXTINF:4.0,
+seg-2.ts
+#EXT-X-KEY:METHOD=NONE
+#EXTINF:4.0,
+seg-3.ts
+#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.com/key/0?token=abc",IV=0x00000000000000000000000000000001
+#EXTINF:4.0,
+seg-4.ts
+#EXT-X-ENDLIST
+"""
+
+MASTER_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:4
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Italiano",LANGUAGE="ita",DEFAULT=YES,URI="audio/ita/playlist.m3u8"
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="English",LANGUAGE="eng",DEFAULT=NO,URI="audio/eng/playlist.m3u8"
+#EXT-X-MEDIA:TYPE=SUBTITLES,GROUP-ID="subs",NAME="Italiano",LANGUAGE="ita",DEFAULT=NO,URI="subs/ita/playlist.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2",AUDIO="audio",SUBTITLES="subs"
+video/360p/playlist.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080,CODECS="avc1.640028,mp4a.40.2",AUDIO="audio",SUBTITLES="subs"
+video/1080p/playlist.m3u8
+"""
+
+
+def snapshot(parser: M3U8_Parser) -> dict:
+    """Attributes the downloader reads from a parsed playlist."""
+    playlist = parser.playlist
+    return {
+        'is_master': parser.is_master_playlist,
+        'media_sequence': parser.media_sequence,
+        'target_duration': parser.target_duration,
+        'is_endlist': parser.is_endlist,
+        'playlist_type': parser.playlist_type,
+        'duration': round(parser.duration, 6),
+        'key_list': parser.key_list,
+        'keys': parser.keys,
+        'video_playlist': parser.video_playlist,
+        'audio_playlist': parser.audio_playlist,
+        'subtitle_playlist': parser.subtitle_playlist,
+        'subtitle': parser.subtitle,
+        'urls': list(playlist),
+        'durations': list(playlist.durations),
+        'range_offsets': list(playlist.range_offsets),
+        'range_lengths': list(playlist.range_lengths),
+        'key_indexes': list(playlist.key_indexes),
+        'codecs': parser.codec.codecs if parser.codec else None
+    }
+
+
+class TestM3U8Parser(unittest.TestCase):
+    def parse_both(self, content: str):
+        """Parse `content` with the line parser and with the m3u8 library."""
+        fast, slow = M3U8_Parser(), M3U8_Parser()
+        fast.parse_data(BASE_URL, content)
+        slow.parse_data_m3u8(BASE_URL, content)
+        return fast, slow
+
+    def assertSameParse(self, content: str) -> M3U8_Parser:
+        fast, slow = self.parse_both(content)
+        fast_snapshot, slow_snapshot = snapshot(fast), snapshot(slow)
+
+        for key in slow_snapshot:
+            self.assertEqual(fast_snapshot[key], slow_snapshot[key], key)
+        return fast
+
+    def test_media_playlist_tags(self):
+        parser = self.assertSameParse(MEDIA_PLAYLIST)
+
+        self.assertEqual(parser.media_sequence, 120)
+        self.assertTrue(parser.is_endlist)
+        self.assertFalse(parser.is_live)
+        self.assertEqual(list(parser.playlist), [
+            "https://cdn.example.com/hls/1080p/seg-120.ts?token=abc",
+            "https://cdn.example.com/absolute/seg-121.ts",
+            "https://mirror.example.com/seg-122.ts"
+        ])
+
+    def test_crlf_line_endings(self):
+        self.assertSameParse(MEDIA_PLAYLIST.replace("\n", "\r\n"))
+
+    def test_live_playlist(self):
+        parser = self.assertSameParse(LIVE_PLAYLIST)
+
+        self.assertFalse(parser.is_endlist)
+        self.assertTrue(parser.is_live)
+
+    def test_byterange(self):
+        parser = self.assertSameParse(BYTERANGE_PLAYLIST)
+
+        # Without an offset a range continues the previous one of the same resource
+        self.assertEqual(
+            [parser.playlist.byte_range(i) for i in range(len(parser.playlist))],
+            [(720, 1000), (1720, 2000), (0, 500), (500, 300)]
+        )
+
+    def test_key_rotation(self):
+        parser = self.assertSameParse(KEY_ROTATION_PLAYLIST)
+
+        # The first key comes back after METHOD=NONE and is stored once
+        key_indexes = [parser.playlist.key_index(i) for i in range(len(parser.playlist))]
+        self.assertIsNone(key_indexes[3])
+        self.assertEqual(key_indexes[0], key_indexes[1])
+        self.assertEqual(key_indexes[0], key_indexes[4])
+        self.assertNotEqual(key_indexes[1], key_indexes[2])
+
+    def test_master_playlist(self):
+        parser = self.assertSameParse(MASTER_PLAYLIST)
+
+        self.assertTrue(parser.is_master_playlist)
+        self.assertEqual(len(parser.video_playlist), 2)
+        self.assertEqual([audio['language'] for audio in parser.audio_playlist], ["ita", "eng"])
+
+
+if __name__ == '__main__':
+    unittest.main()
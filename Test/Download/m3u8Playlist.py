@@ -0,0 +1,64 @@
+# 18.10.26
+
+# Fix import
+import sys
+import os
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(src_path)
+
+
+
+# Import
+import unittest
+from urllib.parse import urljoin
+from StreamingCommunity.Lib.M3U8 import CompiledPlaylist
+
+
+BASE_URL = "https://cdn.example.com/hls/1080p/playlist.m3u8?token=abc&expires=1760000000"
+
+
+class TestCompiledPlaylist(unittest.TestCase):
+    def setUp(self):
+        self.playlist = CompiledPlaylist(BASE_URL)
+
+    def test_resolve(self):
+        cases = [
+            ("seg-0.ts", "https://cdn.example.com/hls/1080p/seg-0.ts"),
+            ("seg-0.ts?token=xyz", "https://cdn.example.com/hls/1080p/seg-0.ts?token=xyz"),
+            ("sub/seg-0.ts", "https://cdn.example.com/hls/1080p/sub/seg-0.ts"),
+            ("/other/seg-0.ts", "https://cdn.example.com/other/seg-0.ts"),
+            ("../720p/seg-0.ts", "https://cdn.example.com/hls/720p/seg-0.ts"),
+            ("./seg-0.ts", "https://cdn.example.com/hls/1080p/seg-0.ts"),
+            ("//mirror.example.com/seg-0.ts", "https://mirror.example.com/seg-0.ts"),
+            ("http://mirror.example.com/seg-0.ts", "http://mirror.example.com/seg-0.ts"),
+        ]
+
+        # The query of the playlist is not inherited, otherwise the result is the one of urljoin
+        base = BASE_URL.split("?")[0]
+        for path, expected in cases:
+            self.assertEqual(self.playlist.resolve(path), expected, path)
+            self.assertEqual(self.playlist.resolve(path), urljoin(base, path), path)
+
+    def test_segments(self):
+        self.playlist.append("seg-0.ts", 4.0)
+        self.playlist.append("video.ts", 2.5, byte_range=(1000, 500), key_index=1)
+
+        self.assertEqual(len(self.playlist), 2)
+        self.assertEqual(self.playlist[0], "https://cdn.example.com/hls/1080p/seg-0.ts")
+        self.assertEqual(list(self.playlist), [self.playlist.url(0), self.playlist.url(1)])
+        self.assertAlmostEqual(self.playlist.duration, 6.5)
+
+        self.assertIsNone(self.playlist.byte_range(0))
+        self.assertIsNone(self.playlist.key_index(0))
+        self.assertEqual(self.playlist.byte_range(1), (1000, 500))
+        self.assertEqual(self.playlist.key_index(1), 1)
+
+    def test_zero_length_range_and_first_key(self):
+        self.playlist.append("video.ts", 1.0, byte_range=(0, 0), key_index=0)
+
+        self.assertEqual(self.playlist.byte_range(0), (0, 0))
+        self.assertEqual(self.playlist.key_index(0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()